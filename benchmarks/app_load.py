@@ -0,0 +1,271 @@
+"""Multi-user load test and capacity report for the dashboard.
+
+Replays N concurrent sessions of `bibliometrics_1/main.py` through Streamlit's
+AppTest, all in one process so they share caches, rate limiters and the HTTP
+client exactly as sessions of one server do. Every backend is served by
+`benchmarks.mock_services`. Sessions rotate through three scenarios:
+
+    - query:        execute a Scopus query from the sidebar
+    - upload_csv:   upload a publication spreadsheet
+    - upload_docx:  upload a DOCX reference list (CrossRef + Scopus per DOI)
+
+after which each session makes `--interactions` further reruns (moving the
+co-author slider), as a user exploring the report would.
+
+Reports:
+    - rerun latency percentiles per step (first paint, load, poll, interaction)
+      and the time from submitting a load job to its result reaching the session
+    - memory: DataFrames held in each session's st.session_state, the shared
+      dataset registry the sessions' handles point into, and process peak RSS
+      growth per session
+    - cache effectiveness: per-stage hit rates from the perf recorder, the
+      st.cache_data footprint, and requests that reached the backends
+
+Usage:
+    python -m benchmarks.app_load --sessions 8 --rows 200 --output capacity.json
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.mock_services import MOCK_API_KEY, SERVICES, MockServices, ServiceProfile, write_pybliometrics_config
+from benchmarks.synthetic import make_docx, make_publications
+
+BASE_DIR = Path(__file__).parent.parent.absolute()
+APP_FILE = Path(BASE_DIR, "bibliometrics_1", "main.py")
+SCENARIOS = ("query", "upload_csv", "upload_docx")
+QUIET_LOGGERS = (
+    "streamlit.runtime.caching.cache_data_api",
+    "streamlit.deprecation_util",
+)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux (bytes on macOS)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def session_state_mb(at):
+    """Deep size of the DataFrames a session keeps in st.session_state."""
+    total = 0
+    for value in at.session_state.values():
+        if isinstance(value, pd.DataFrame):
+            total += int(value.memory_usage(deep=True).sum())
+    return total / 2**20
+
+
+def shared_datasets_mb():
+    """Size of the tables in the process-wide dataset registry."""
+    from bibliometrics_1.datasets import get_dataset_registry
+
+    return float(get_dataset_registry().stats()["mb"].sum())
+
+
+def run_session(session, scenario, cli, openai_api_base, record):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(APP_FILE), default_timeout=cli.timeout)
+    at.secrets["SCOPUS_API_KEY"] = MOCK_API_KEY
+    at.secrets["OPENAI_API_KEY"] = MOCK_API_KEY
+    at.secrets["OPENAI_API_BASE"] = openai_api_base
+
+    def rerun(step, action=None):
+        start = time.perf_counter()
+        (action() if action else at).run()
+        elapsed = time.perf_counter() - start
+        record(session, scenario, step, elapsed, [str(e.value) for e in at.exception])
+
+    rerun("first_paint")
+    if scenario == "query":
+        at.session_state["scopus_query"] = f'TITLE-ABS-KEY("load session {session}")'
+        rerun("load", lambda: at.button(key="execute_scopus").click())
+    else:
+        rerun("select_upload", lambda: at.sidebar.radio[0].set_value("Upload Spreadsheet"))
+        if scenario == "upload_csv":
+            seed = 0 if cli.shared_report else session
+            content = make_publications(cli.rows, seed=seed).to_csv(index=False).encode("utf-8")
+            upload = (f"publications_{session}.csv", content, "text/csv")
+        else:
+            content = make_docx(cli.dois, seed=session)
+            upload = (f"references_{session}.docx", content,
+                      "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+        rerun("load", lambda: at.file_uploader[0].set_value(upload))
+
+    # Loads run as background jobs; poll as the progress fragment would until the result lands
+    start = time.perf_counter()
+    while at.session_state["job_id"] is not None:
+        time.sleep(cli.poll)
+        rerun("poll")
+    record(session, scenario, "job", time.perf_counter() - start, [])
+
+    for i in range(cli.interactions):
+        if at.slider:
+            rerun("interaction", lambda: at.slider[0].set_value(1 + (i % 10)))
+        else:
+            rerun("interaction")
+    # Measured while this session still holds its handle; the registry frees unreferenced tables
+    return session_state_mb(at), shared_datasets_mb()
+
+
+def summarize(samples):
+    values = np.asarray(samples, dtype=float)
+    return {
+        "count": int(values.size),
+        "p50_s": float(np.percentile(values, 50)),
+        "p90_s": float(np.percentile(values, 90)),
+        "p99_s": float(np.percentile(values, 99)),
+        "max_s": float(values.max()),
+    }
+
+
+def cache_report():
+    from streamlit.runtime.caching import cache_data_api
+
+    from bibliometrics_1.perf import get_recorder
+
+    stats = get_recorder().snapshot()
+    stages = {}
+    for stage, row in stats.iterrows():
+        if row["cache_hits"] + row["cache_misses"] > 0:
+            stages[stage] = {
+                "hits": int(row["cache_hits"]),
+                "misses": int(row["cache_misses"]),
+                "hit_rate": None if pd.isna(row["cache_hit_rate"]) else round(float(row["cache_hit_rate"]), 3),
+            }
+    footprint = defaultdict(int)
+    stats = cache_data_api.get_data_cache_stats_provider().get_stats()
+    if isinstance(stats, dict):  # newer Streamlit groups stats by family
+        stats = [stat for family in stats.values() for stat in family]
+    for stat in stats:
+        footprint[stat.cache_name] += stat.byte_length
+    return {"stages": stages, "cache_data_mb": {name: size / 2**20 for name, size in footprint.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--ramp", type=float, default=0.5, help="seconds between session starts")
+    parser.add_argument("--interactions", type=int, default=3, help="reruns after the data is loaded")
+    parser.add_argument("--rows", type=int, default=200, help="rows per uploaded spreadsheet")
+    parser.add_argument("--shared-report", action="store_true",
+                        help="every spreadsheet session uploads the same report, as analysts of one division would")
+    parser.add_argument("--dois", type=int, default=10, help="DOIs per uploaded DOCX")
+    parser.add_argument("--scopus-results", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.08, help="median backend latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=600.0, help="AppTest timeout per rerun (s)")
+    parser.add_argument("--poll", type=float, default=0.5, help="seconds between reruns while a load job runs")
+    parser.add_argument("--output", type=Path, help="write the report as JSON to this path")
+    cli = parser.parse_args()
+
+    # Bare-mode and deprecation warnings repeat on every rerun; filters survive config.config's dictConfig
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).addFilter(lambda record: False)
+    # AppTest itself warns when created or given session state on a driver thread; job threads must not
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda record: not record.threadName.startswith("session-")
+    )
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    from config import config
+    config.setup_logging().setLevel(logging.WARNING)  # the app logs every stage summary at INFO on each rerun
+
+    profiles = {
+        name: ServiceProfile(latency=cli.latency, error_rate=cli.error_rate, rate_limit=limit)
+        for name, limit in zip(SERVICES, (9.0, 6.0, 50.0, 10.0))
+    }
+    latencies = defaultdict(list)
+    errors = []
+    state_mb = {}
+    shared_mb = []
+    lock = threading.Lock()
+
+    def record(session, scenario, step, elapsed, exceptions):
+        with lock:
+            latencies[step].append(elapsed)
+            latencies[f"{scenario}:{step}"].append(elapsed)
+            errors.extend(f"session {session} {step}: {message}" for message in exceptions)
+
+    def worker(session):
+        scenario = SCENARIOS[session % len(SCENARIOS)]
+        try:
+            mb, registry_mb = run_session(session, scenario, cli, openai_api_base, record)
+        except Exception as e:  # a crashed session is a finding, not a reason to stop the run
+            with lock:
+                errors.append(f"session {session}: {e!r}")
+            return
+        with lock:
+            state_mb[session] = mb
+            shared_mb.append(registry_mb)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The app writes ./.config/pybliometrics.cfg; pre-seed it so its caches stay in work_dir
+        os.chdir(work_dir)
+        config_path = write_pybliometrics_config(Path(work_dir, ".config", "pybliometrics.cfg"), Path(work_dir, "cache"))
+        try:
+            with MockServices(profiles=profiles, scopus_results=cli.scopus_results) as services:
+                with services.patch(config_path=config_path) as openai_api_base:
+                    rss_before = peak_rss_mb()
+                    start = time.perf_counter()
+                    threads = []
+                    for session in range(cli.sessions):
+                        thread = threading.Thread(target=worker, args=(session,), name=f"session-{session}")
+                        thread.start()
+                        threads.append(thread)
+                        time.sleep(cli.ramp)
+                    for thread in threads:
+                        thread.join()
+                    elapsed = time.perf_counter() - start
+                    rss_after = peak_rss_mb()
+                    caches = cache_report()
+                served = services.summary()
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "config": {key: value for key, value in vars(cli).items() if key != "output"},
+        "wall_s": elapsed,
+        "reruns": {step: summarize(samples) for step, samples in sorted(latencies.items())},
+        "memory": {
+            "session_state_mb": {str(session): round(mb, 3) for session, mb in sorted(state_mb.items())},
+            "session_state_mb_mean": float(np.mean(list(state_mb.values()))) if state_mb else None,
+            "shared_datasets_mb_max": max(shared_mb) if shared_mb else None,
+            "peak_rss_mb": rss_after,
+            "peak_rss_growth_mb_per_session": (rss_after - rss_before) / max(cli.sessions, 1),
+        },
+        "caches": caches,
+        "served": served,
+        "errors": errors,
+    }
+
+    print(f"{cli.sessions} sessions in {elapsed:.1f}s")
+    for step, stats in report["reruns"].items():
+        if ":" not in step:
+            print(f"  {step:14s} n={stats['count']:3d}  p50 {stats['p50_s']:.2f}s  p90 {stats['p90_s']:.2f}s  "
+                  f"p99 {stats['p99_s']:.2f}s  max {stats['max_s']:.2f}s")
+    memory = report["memory"]
+    if memory["session_state_mb_mean"] is not None:
+        print(f"  session_state  {memory['session_state_mb_mean']:.2f} MB/session; "
+              f"shared datasets {memory['shared_datasets_mb_max']:.2f} MB; peak RSS {memory['peak_rss_mb']:.0f} MB "
+              f"(+{memory['peak_rss_growth_mb_per_session']:.1f} MB/session)")
+    for stage, stats in caches["stages"].items():
+        print(f"  cache {stage:24s} hit rate {stats['hit_rate']}  ({stats['hits']} hits, {stats['misses']} misses)")
+    print(f"  served: {json.dumps(served)}")
+    if errors:
+        print(f"  {len(errors)} error(s), first: {errors[0]}")
+    if cli.output:
+        cli.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
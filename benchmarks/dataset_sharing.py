@@ -0,0 +1,104 @@
+"""Dataset-sharing benchmark: per-session DataFrame copies vs. registry handles.
+
+Simulates `--sessions` analysts who loaded the same division report. The legacy
+path is what each session did before the dataset registry: keep its own copy
+of the loaded frame in st.session_state and, on every rerun, re-enrich, reformat
+and sort it twice (kept here only as a baseline). With the registry every
+session holds a handle to one shared table, and the prepared table and its SNIP
+order are derived once per process.
+
+Reports the memory held for all sessions and the mean cost of a rerun.
+SerialTitle is replaced by the hot-path stand-in, so no API keys are needed.
+
+Usage:
+    python -m benchmarks.dataset_sharing --sessions 30 --rows 10000 --output dataset_sharing.json
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.hot_paths import _enriched, _stubbed_apis
+
+
+def legacy_rerun(df):
+    """The per-rerun pipeline of AdvancedMetricsApp before the dataset registry."""
+    from bibliometrics_1.data import DataProcessor, PublicationWindow
+
+    def reformat(df):
+        df = DataProcessor.enrich_with_snip(df)
+        desired_column_order = ["SNIP", "title", "Year", "Month", "author_names"]
+        df = df[desired_column_order + [col for col in df.columns if col not in desired_column_order]]
+        df["MonthYear"] = df["Month"].astype(str) + "-" + df["Year"].astype(str)
+        df["MonthYear"] = df["MonthYear"].str.replace(r"\.0", "", regex=True)
+        df["MonthYear"] = pd.to_datetime(df["MonthYear"], format='%m-%Y', errors='coerce')
+        df["Year"] = pd.to_numeric(df["Year"], errors='coerce')
+        df['Year'] = df['Year'].astype('category')
+        return df
+
+    df = PublicationWindow(reformat(df)).df  # enrich_and_process_data
+    return reformat(df).sort_values(by="SNIP", ascending=False)  # display_publications_with_snip
+
+
+def registry_rerun(dataset):
+    """The per-rerun pipeline of AdvancedMetricsApp over a dataset handle."""
+    from bibliometrics_1.data import PublicationWindow
+    from bibliometrics_1.main import AdvancedMetricsApp
+
+    publications = dataset.derive("publications", AdvancedMetricsApp.prepare_publications)
+    PublicationWindow(publications.to_pandas())
+    return publications.view(sort_by="SNIP", ascending=False).to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=10_000, help="publications in the shared report")
+    parser.add_argument("--reruns", type=int, default=3, help="reruns per session")
+    parser.add_argument("--output", type=Path, help="write results as JSON to this path")
+    cli = parser.parse_args()
+
+    from bibliometrics_1.datasets import DatasetRegistry
+
+    report = _enriched(cli.rows)
+    with _stubbed_apis():
+        # Every session's load job produced its own frame of the same rows
+        sessions = [report.copy() for _ in range(cli.sessions)]
+        legacy_mb = sum(int(df.memory_usage(deep=True).sum()) for df in sessions) / 2**20
+        start = time.perf_counter()
+        for _ in range(cli.reruns):
+            for df in sessions:
+                legacy_rerun(df)
+        legacy_s = (time.perf_counter() - start) / (cli.reruns * cli.sessions)
+
+        registry = DatasetRegistry()
+        handles = [registry.put(df) for df in sessions]
+        del sessions
+        start = time.perf_counter()
+        for _ in range(cli.reruns):
+            for dataset in handles:
+                registry_rerun(dataset)
+        registry_s = (time.perf_counter() - start) / (cli.reruns * cli.sessions)
+        stats = registry.stats()
+
+    result = {
+        "sessions": cli.sessions,
+        "rows": cli.rows,
+        "datasets": len(stats),
+        "legacy_mb": legacy_mb,
+        "registry_mb": float(stats["mb"].sum()),
+        "legacy_rerun_s": legacy_s,
+        "registry_rerun_s": registry_s,
+    }
+    print(f"{cli.sessions} sessions x {cli.rows:,} rows")
+    print(f"  memory  legacy {result['legacy_mb']:.1f} MB  registry {result['registry_mb']:.1f} MB "
+          f"({result['datasets']} shared tables)")
+    print(f"  rerun   legacy {legacy_s * 1e3:.1f} ms  registry {registry_s * 1e3:.1f} ms")
+    if cli.output:
+        cli.output.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Deduplication benchmark: runtime scaling and pairwise accuracy on known duplicates.
+
+Runs `find_duplicates` on synthetic multi-source publications
+(`synthetic.make_duplicated_publications`) at increasing sizes and reports
+seconds per 1k records, the fitted scaling exponent (time ~ rows^k; k near 1
+is linear) and pairwise precision/recall against the known duplicates.
+
+Usage:
+    python -m benchmarks.dedup_scaling --scales 10000 50000 100000 250000 500000
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_duplicated_publications
+from bibliometrics_1.dedup import find_duplicates
+
+
+def _pairs(*labels):
+    sizes = pd.DataFrame({i: label for i, label in enumerate(labels)}).value_counts().to_numpy()
+    return int((sizes * (sizes - 1) // 2).sum())
+
+
+def pairwise_accuracy(labels, truth):
+    """Precision and recall over pairs of rows placed in the same cluster."""
+    true_positive = _pairs(labels, truth)
+    predicted, actual = _pairs(labels), _pairs(truth)
+    return {
+        "precision": true_positive / predicted if predicted else 1.0,
+        "recall": true_positive / actual if actual else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10_000, 50_000, 100_000, 250_000, 500_000],
+                        help="total records (distinct publications plus duplicates)")
+    parser.add_argument("--duplicate-share", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="write results as JSON to this path")
+    cli = parser.parse_args()
+
+    results = []
+    for records in cli.scales:
+        df, truth = make_duplicated_publications(int(records / (1 + cli.duplicate_share)), cli.duplicate_share)
+        timings = []
+        for _ in range(cli.repeat):
+            start = time.perf_counter()
+            labels = find_duplicates(df)
+            timings.append(time.perf_counter() - start)
+        result = {"records": len(df), "seconds": min(timings), **pairwise_accuracy(labels, truth)}
+        results.append(result)
+        print(f"{result['records']:>8,} records  {result['seconds']:7.2f}s  "
+              f"{1000 * result['seconds'] / result['records']:.3f}s/1k  "
+              f"precision {result['precision']:.4f}  recall {result['recall']:.4f}")
+
+    if len(results) > 1:
+        exponent = np.polyfit(np.log([r["records"] for r in results]), np.log([r["seconds"] for r in results]), 1)[0]
+        print(f"scaling exponent {exponent:.2f} (1.0 = linear)")
+    else:
+        exponent = None
+    if cli.output:
+        cli.output.write_text(json.dumps({"config": vars(cli) | {"output": None}, "results": results,
+                                          "scaling_exponent": exponent}, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""Hot-path benchmark suite over synthetic publication data.
+
+Times the dashboard's data, network, evaluation and plotting paths at several
+scales. Every external call is replaced by a local stand-in: SerialTitle returns
+a deterministic SNIP list and the Elsevier rate limiter is bypassed. SNIP
+enrichment is timed both through the API and through an offline journal index
+built from a matching synthetic source list. Streamlit
+runs in bare mode, so the Plotter builders construct and serialize their figures
+without a browser. `st.cache_data` caches are cleared before every repeat, so
+the numbers are cold-path costs.
+
+Results are written as JSON (one file per commit by default) and can be compared
+against an earlier run:
+
+Usage:
+    python -m benchmarks.hot_paths --scales 1000 10000 100000
+    python -m benchmarks.hot_paths --compare benchmarks/results/<old-commit>.json
+"""
+import argparse
+import atexit
+import json
+import logging
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from benchmarks.synthetic import PassthroughQuota, StubSerialTitle, make_docx, make_publications, make_source_list
+
+BASE_DIR = Path(__file__).parent.parent.absolute()
+RESULTS_DIR = Path(BASE_DIR, "benchmarks", "results")
+
+# Figure builders lay out and draw the whole network, so they run at capped sizes
+MAX_PLOT_ROWS = 10_000
+
+
+def _processed(rows, seed=0):
+    from bibliometrics_1.data import DataProcessor
+
+    DataProcessor.process_data.clear()
+    return DataProcessor.process_data(make_publications(rows, seed=seed))
+
+
+def _enriched(rows):
+    from bibliometrics_1.data import DataProcessor
+
+    df = _processed(rows)
+    with _stubbed_apis():
+        return DataProcessor.enrich_with_snip(df)
+
+
+@contextmanager
+def _stubbed_apis(journal_index=None):
+    # An index built on this machine must not turn the API benchmark into an index lookup
+    with mock.patch("pybliometrics.scopus.SerialTitle", StubSerialTitle), \
+            mock.patch("bibliometrics_1.utils.get_quota", lambda api: PassthroughQuota()), \
+            mock.patch("bibliometrics_1.data.get_journal_index", lambda: journal_index):
+        yield
+
+
+def bench_process_data(rows):
+    from bibliometrics_1.data import DataProcessor
+
+    raw = make_publications(rows)
+
+    def setup():
+        DataProcessor.process_data.clear()
+        return (raw.copy(),)
+
+    return setup, DataProcessor.process_data
+
+
+def bench_aggregate_counts(rows):
+    from bibliometrics_1.data import DataProcessor
+
+    df = _processed(rows)
+
+    def setup():
+        DataProcessor.aggregate_counts.clear()
+        return (df,)
+
+    return setup, DataProcessor.aggregate_counts
+
+
+def bench_enrich_with_snip(rows):
+    from bibliometrics_1.data import DataProcessor
+    from bibliometrics_1.utils import SNIPManager
+
+    df = _processed(rows)
+
+    def setup():
+        SNIPManager.snip_cache.clear()
+        return (df.copy(),)
+
+    def run(frame):
+        with _stubbed_apis():
+            return DataProcessor.enrich_with_snip(frame)
+
+    return setup, run
+
+
+def bench_enrich_with_snip_index(rows):
+    from bibliometrics_1.data import DataProcessor
+    from bibliometrics_1.journal_index import build_index
+    from bibliometrics_1.utils import SNIPManager
+
+    df = _processed(rows)
+    index_dir = Path(tempfile.mkdtemp(prefix="journal_index_"))
+    atexit.register(shutil.rmtree, index_dir, True)
+    make_source_list().to_csv(Path(index_dir, "source_list.csv"), index=False)
+    journal_index = build_index([Path(index_dir, "source_list.csv")], index_dir=Path(index_dir, "index"))
+
+    def setup():
+        SNIPManager.snip_cache.clear()
+        return (df.copy(),)
+
+    def run(frame):
+        with _stubbed_apis(journal_index):
+            return DataProcessor.enrich_with_snip(frame)
+
+    return setup, run
+
+
+def bench_build_coauthor_network(rows):
+    from bibliometrics_1.utils import NetworkBuilder
+
+    df = make_publications(rows)
+    return (lambda: (df,)), NetworkBuilder.build_coauthor_network
+
+
+def bench_filter_network(rows):
+    from bibliometrics_1.plotter import Plotter
+    from bibliometrics_1.utils import NetworkBuilder
+
+    network = NetworkBuilder.build_coauthor_network(make_publications(rows))
+    plotter = Plotter()
+    return (lambda: (network,)), plotter.filter_network
+
+
+def bench_filter_adjacency(rows):
+    from bibliometrics_1.network_analytics import coauthor_adjacency, filter_adjacency
+
+    adjacency, names = coauthor_adjacency(make_publications(rows))
+    return (lambda: (adjacency, names, 4)), filter_adjacency
+
+
+def bench_author_indicators(rows):
+    from bibliometrics_1.indicators import AuthorIndicators
+
+    df = _enriched(rows)
+    return (lambda: (df,)), AuthorIndicators
+
+
+def bench_author_indicators_update(rows):
+    import pandas as pd
+
+    from bibliometrics_1.indicators import AuthorIndicators
+
+    # An upload of 1% more papers added to the loaded publications
+    df = _enriched(rows)
+    added = df.sample(frac=0.01, random_state=0)
+    engine = AuthorIndicators(df.drop(index=added.index))
+    return (lambda: (pd.concat([df.drop(index=added.index), added]),)), engine.updated
+
+
+def bench_coauthor_adjacency(rows):
+    from bibliometrics_1.network_analytics import coauthor_adjacency
+
+    df = make_publications(rows)
+    return (lambda: (df,)), coauthor_adjacency
+
+
+def bench_network_analytics(rows):
+    from bibliometrics_1.network_analytics import NetworkAnalytics, coauthor_adjacency
+
+    # At the dashboard's default threshold of 4 collaborations
+    adjacency, names = coauthor_adjacency(make_publications(rows))
+    return (lambda: (adjacency, names, 4)), NetworkAnalytics
+
+
+def bench_extract_dois_from_docx(rows):
+    from bibliometrics_1.data import DataProcessor
+
+    content = make_docx(rows)
+    return (lambda: (BytesIO(content),)), DataProcessor.extract_dois_from_docx
+
+
+def bench_get_slice_metrics(rows):
+    from bibliometrics_1.evaluate import get_slice_metrics, get_slices
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "text": ["short text"] * (rows // 2) + ["a much longer text about a synthetic topic " * 3] * (rows - rows // 2),
+        "tag": rng.choice([f"tag{i}" for i in range(20)], size=rows),
+    })
+    y_true = rng.integers(0, 10, size=rows)
+    y_pred = np.where(rng.random(rows) < 0.8, y_true, rng.integers(0, 10, size=rows))
+    slices = get_slices(df)
+    return (lambda: (y_true, y_pred, slices)), get_slice_metrics
+
+
+def _plot_bench(method):
+    def bench(rows):
+        from bibliometrics_1.plotter import Plotter
+
+        df = _enriched(min(rows, MAX_PLOT_ROWS))
+        plotter = Plotter()
+        plotter.set_window(df)
+        return (lambda: ()), getattr(plotter, method)
+    return bench
+
+
+BENCHMARKS = {
+    "data.process_data": bench_process_data,
+    "data.aggregate_counts": bench_aggregate_counts,
+    "data.enrich_with_snip": bench_enrich_with_snip,
+    "data.enrich_with_snip_index": bench_enrich_with_snip_index,
+    "data.extract_dois_from_docx": bench_extract_dois_from_docx,
+    "utils.build_coauthor_network": bench_build_coauthor_network,
+    "indicators.author_indicators": bench_author_indicators,
+    "indicators.author_indicators_update": bench_author_indicators_update,
+    "plotter.filter_network": bench_filter_network,
+    "network_analytics.coauthor_adjacency": bench_coauthor_adjacency,
+    "network_analytics.filter_adjacency": bench_filter_adjacency,
+    "network_analytics.network_analytics": bench_network_analytics,
+    "evaluate.get_slice_metrics": bench_get_slice_metrics,
+    "plotter.render_line_graph": _plot_bench("render_line_graph"),
+    "plotter.render_violin_plot": _plot_bench("render_violin_plot"),
+    "plotter.render_coauthor_network": _plot_bench("render_coauthor_network"),
+}
+
+# docx generation is slow and real reference lists are short
+SCALE_CAPS = {"data.extract_dois_from_docx": 10_000}
+
+
+def time_benchmark(factory, rows, repeat):
+    setup, fn = factory(rows)
+    fn(*setup())  # warm up imports and lazy state
+    timings = []
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return {"min_s": min(timings), "median_s": statistics.median(timings), "repeat": repeat}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline, threshold):
+    """Print per-benchmark ratios to `baseline`; returns the names slower by more than `threshold`."""
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            continue
+        ratio = current["min_s"] / previous["min_s"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:55s} {previous['min_s']:9.4f}s -> {current['min_s']:9.4f}s  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", help="benchmark names (prefix match)")
+    parser.add_argument("--output", type=Path, help="defaults to benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", type=Path, help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown reported as a regression")
+    cli = parser.parse_args()
+    # Bare mode warns about the missing script context on every st.* call; a filter
+    # (unlike `disabled`) survives the dictConfig in config.config
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(lambda record: False)
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {"scales": cli.scales, "repeat": cli.repeat},
+        "benchmarks": {},
+    }
+    for name, factory in BENCHMARKS.items():
+        if cli.only and not any(name.startswith(prefix) for prefix in cli.only):
+            continue
+        for rows in cli.scales:
+            if rows > SCALE_CAPS.get(name, rows):
+                continue
+            key = f"{name}[rows={rows}]"
+            results["benchmarks"][key] = time_benchmark(factory, rows, cli.repeat)
+            print(f"{key:55s} min {results['benchmarks'][key]['min_s']:.4f}s", flush=True)
+
+    output = cli.output or Path(RESULTS_DIR, f"{commit}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+    if cli.compare:
+        regressions = compare(results, json.loads(cli.compare.read_text()), cli.threshold)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} benchmark(s) regressed by more than {cli.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
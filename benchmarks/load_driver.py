@@ -0,0 +1,139 @@
+"""End-to-end load driver: the dashboard's real fetch paths against the mock services.
+
+Each simulated session runs, per iteration:
+    - convert_query:        QueryConverter.convert_query (chat completions)
+    - scopus_search:        DataProcessor.fetch_scopus_data (paginated Scopus Search)
+    - enrich_with_snip:     process_data + enrich_with_snip (SerialTitle)
+    - fetch_data_for_dois:  CrossRefManager.fetch_data_for_dois (chat + Scopus + CrossRef per DOI)
+
+Sessions run concurrently in threads of one process, sharing the process-wide
+HTTP client, rate limiters and caches exactly as Streamlit sessions do. Queries
+and DOIs are unique per iteration, so st.cache_data and the pybliometrics file
+cache never answer for the network. Reports throughput, latency percentiles per
+operation, and what the mock services served (including 429s and 5xx).
+
+Usage:
+    python -m benchmarks.load_driver --sessions 4 --iterations 3 --latency 0.08 --error-rate 0.02
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.mock_services import SERVICES, MockServices, ServiceProfile
+
+OPENAI_HEADERS = {"Authorization": "Bearer mock-key", "Content-Type": "application/json"}
+
+
+def percentiles(samples):
+    values = np.asarray(samples, dtype=float)
+    return {
+        "count": int(values.size),
+        "p50_s": float(np.percentile(values, 50)),
+        "p95_s": float(np.percentile(values, 95)),
+        "p99_s": float(np.percentile(values, 99)),
+        "max_s": float(values.max()),
+    }
+
+
+def run_session(session, iterations, num_dois, openai_api_base, latencies, failures, lock):
+    from bibliometrics_1.data import CrossRefManager, DataProcessor
+    from bibliometrics_1.predict import QueryConverter
+
+    def timed_op(name, fn):
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            with lock:
+                failures[name] += 1
+            return None
+        with lock:
+            latencies[name].append(time.perf_counter() - start)
+        return result
+
+    for iteration in range(iterations):
+        tag = f"s{session}i{iteration}"
+        query = timed_op("convert_query", lambda: QueryConverter.convert_query(
+            f"load test {tag} 2019-2023", "generic", OPENAI_HEADERS, openai_api_base
+        ))
+        df = timed_op("scopus_search", lambda: DataProcessor.fetch_scopus_data(query or f'TITLE("{tag}")'))
+        if df is not None and not df.empty:
+            timed_op("enrich_with_snip", lambda: DataProcessor.enrich_with_snip(DataProcessor.process_data(df)))
+        dois = [f"10.5555/load.{tag}.{i}" for i in range(num_dois)]
+        timed_op("fetch_data_for_dois", lambda: CrossRefManager.fetch_data_for_dois(
+            dois, OPENAI_HEADERS, openai_api_base
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--dois", type=int, default=5, help="DOIs per fetch_data_for_dois call")
+    parser.add_argument("--scopus-results", type=int, default=100, help="results per Scopus query")
+    parser.add_argument("--latency", type=float, default=0.08, help="median latency of every service (s)")
+    parser.add_argument("--jitter", type=float, default=0.5, help="log-normal sigma of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 answers")
+    parser.add_argument("--rate-limit", type=float, nargs="*", default=None, metavar="RPS",
+                        help="server-side limits for scopus, serial_title, crossref, openai (req/s)")
+    parser.add_argument("--output", type=Path, help="write results as JSON to this path")
+    cli = parser.parse_args()
+
+    # Bare-mode Streamlit warns on every st.* call; a filter survives config.config's dictConfig
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(lambda record: False)
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per request otherwise
+
+    rate_limits = dict(zip(SERVICES, cli.rate_limit or [9.0, 6.0, 50.0, 10.0]))
+    profiles = {
+        name: ServiceProfile(latency=cli.latency, jitter=cli.jitter, error_rate=cli.error_rate,
+                             rate_limit=rate_limits.get(name))
+        for name in SERVICES
+    }
+    latencies = defaultdict(list)
+    failures = defaultdict(int)
+    lock = threading.Lock()
+
+    with MockServices(profiles=profiles, scopus_results=cli.scopus_results) as services:
+        with services.patch() as openai_api_base:
+            start = time.perf_counter()
+            threads = [
+                threading.Thread(
+                    target=run_session,
+                    args=(session, cli.iterations, cli.dois, openai_api_base, latencies, failures, lock),
+                )
+                for session in range(cli.sessions)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        served = services.summary()
+
+    operations = sum(len(samples) for samples in latencies.values())
+    results = {
+        "config": {key: value for key, value in vars(cli).items() if key != "output"},
+        "wall_s": elapsed,
+        "throughput_ops_per_s": operations / elapsed,
+        "operations": {name: percentiles(samples) for name, samples in latencies.items()},
+        "failures": dict(failures),
+        "served": served,
+    }
+    print(f"{cli.sessions} sessions x {cli.iterations} iterations in {elapsed:.1f}s "
+          f"({results['throughput_ops_per_s']:.2f} ops/s)")
+    for name, stats in results["operations"].items():
+        print(f"  {name:22s} n={stats['count']:4d}  p50 {stats['p50_s']:.3f}s  "
+              f"p95 {stats['p95_s']:.3f}s  p99 {stats['p99_s']:.3f}s  failures {failures.get(name, 0)}")
+    print(f"  served: {json.dumps(served)}")
+    if cli.output:
+        cli.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Logging benchmark: synchronous root handlers vs. the queued logging backend.
+
+Several threads log INFO records, as enrichment jobs and training loops do, and
+the time each `logger.info` call blocks its caller is recorded. The synchronous
+setup is the previous `config.config` behaviour: the Rich console and rotating
+file handlers of `logging_config` attached directly to the root logger (kept
+here only as a baseline). The queued setup is `config.setup_logging`. Both write
+to a temporary directory; console output goes to /dev/null.
+
+Usage:
+    python -m benchmarks.logging_overhead --threads 8 --calls 2000 --output logging_overhead.json
+"""
+import argparse
+import contextlib
+import json
+import logging
+import logging.config
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from config import config
+
+
+def temp_logging_config(logs_dir):
+    """`config.logging_config` with its files moved to `logs_dir`."""
+    handlers = {name: dict(handler) for name, handler in config.logging_config["handlers"].items()}
+    for handler in handlers.values():
+        if "filename" in handler:
+            handler["filename"] = Path(logs_dir, Path(handler["filename"]).name)
+    return dict(config.logging_config, handlers=handlers)
+
+
+def sync_logging(logs_dir):
+    from rich.logging import RichHandler
+
+    logging.config.dictConfig(temp_logging_config(logs_dir))
+    logger = logging.getLogger()
+    logger.handlers[0] = RichHandler(markup=True)
+    return logger, lambda: None
+
+
+def queued_logging(logs_dir):
+    with mock.patch.object(config, "logging_config", temp_logging_config(logs_dir)), \
+            mock.patch.object(config, "LOGS_DIR", Path(logs_dir)):
+        logger = config.setup_logging()
+    return logger, config._stop_listener
+
+
+def measure(setup, threads, calls, logs_dir):
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    logger, flush = setup(logs_dir)
+    latencies = np.zeros((threads, calls))
+
+    def work(i):
+        for j in range(calls):
+            start = time.perf_counter()
+            logger.info(f"Retrieved SNIP for ISSN {j:08d} (thread {i})")
+            latencies[i, j] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    logged = time.perf_counter() - start
+    flush()  # the queued backend writes the backlog here
+    written = time.perf_counter() - start
+    return {
+        "caller_p50_us": float(np.percentile(latencies, 50) * 1e6),
+        "caller_p99_us": float(np.percentile(latencies, 99) * 1e6),
+        "caller_max_ms": float(latencies.max() * 1e3),
+        "callers_done_s": logged,
+        "all_written_s": written,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--calls", type=int, default=2000, help="log calls per thread")
+    parser.add_argument("--output", type=Path, help="write results as JSON to this path")
+    cli = parser.parse_args()
+
+    results = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+            tempfile.TemporaryDirectory() as logs_dir:
+        results["sync"] = measure(sync_logging, cli.threads, cli.calls, Path(logs_dir, "sync"))
+        results["queued"] = measure(queued_logging, cli.threads, cli.calls, Path(logs_dir, "queued"))
+
+    for name, stats in results.items():
+        print(f"{name:7s} per call p50 {stats['caller_p50_us']:.0f} us  p99 {stats['caller_p99_us']:.0f} us  "
+              f"max {stats['caller_max_ms']:.1f} ms; callers done {stats['callers_done_s']:.2f}s, "
+              f"all written {stats['all_written_s']:.2f}s")
+    if cli.output:
+        cli.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+"""Local stand-ins for the Scopus, SerialTitle, CrossRef and OpenAI APIs.
+
+One threaded HTTP server answers all four APIs with deterministic, realistic
+payloads, so the real client code (pybliometrics, the shared httpx client) runs
+end to end without API keys or quota:
+
+    - GET  /content/search/scopus            Scopus Search, cursor and start pagination
+    - GET  /content/serial/title/issn/<issn>  SerialTitle with a SNIPList
+    - GET  /works, /works/<doi>              CrossRef works
+    - POST /v1/chat/completions              chat completions that echo a Scopus query
+    - GET  /bytes/<n>[?chunked=1]            n bytes, for response-size limits
+
+Each service has its own `ServiceProfile`: log-normal latency, a 5xx error rate,
+and a token-bucket rate limit answered with 429, Retry-After and the Elsevier
+X-RateLimit-* headers. The server also counts accepted connections, requests in
+flight (and their peak) and request arrival times, so client pooling and limits
+can be checked (see `tests/test_http_client.py`).
+
+Usage:
+    with MockServices(profiles={"scopus": ServiceProfile(latency=0.2)}) as services:
+        with services.patch():
+            DataProcessor.fetch_scopus_data('TITLE("graphene")')
+"""
+import json
+import math
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+SERVICES = ("scopus", "serial_title", "crossref", "openai")
+MOCK_API_KEY = "mock-key"
+SCOPUS_MAX_COUNT = 25  # entries per page for the COMPLETE view
+DOI_RE = re.compile(r'DOI\("?([^")]+)"?\)', re.IGNORECASE)
+
+
+@dataclass
+class ServiceProfile:
+    """
+    Behaviour of one mocked API.
+
+    Attributes:
+        latency (float): median response time in seconds.
+        jitter (float): sigma of the log-normal latency; 0 gives a constant latency.
+        error_rate (float): probability of answering 503.
+        rate_limit (float): requests per second before answering 429; None for no limit.
+        quota (int): weekly quota reported in X-RateLimit-Remaining.
+    """
+    latency: float = 0.05
+    jitter: float = 0.5
+    error_rate: float = 0.0
+    rate_limit: float = None
+    quota: int = 20000
+
+
+@dataclass
+class _ServiceState:
+    profile: ServiceProfile
+    tokens: float = 0.0
+    updated: float = field(default_factory=time.monotonic)
+    remaining: int = 0
+
+
+def _seed(text):
+    return zlib.crc32(str(text).encode("utf-8"))
+
+
+def scopus_entry(query, position):
+    """One deterministic Scopus Search entry (COMPLETE view) for `query`."""
+    rng = np.random.default_rng(_seed(f"{query}:{position}"))
+    match = DOI_RE.search(query)
+    doi = match.group(1) if match else f"10.{1000 + _seed(query) % 9000}/mock.{position}"
+    issn = f"{int(rng.integers(0, 2000)):07d}X"
+    year = int(rng.integers(2015, 2025))
+    authors = [
+        {
+            "authid": str(5000000 + int(author)),
+            "surname": f"Author{int(author)}",
+            "given-name": "A.",
+            "afid": [{"$": str(60000000 + int(author) % 50)}],
+        }
+        for author in rng.choice(400, size=int(rng.integers(1, 9)), replace=False)
+    ]
+    return {
+        "eid": f"2-s2.0-{85000000000 + _seed(doi) % 10**9}",
+        "prism:doi": doi,
+        "dc:title": f"Mock publication {position} for {query[:40]}",
+        "dc:creator": authors[0]["surname"],
+        "dc:description": "Mock abstract text. " * 10,
+        "prism:publicationName": f"Journal {issn}",
+        "prism:issn": issn,
+        "prism:coverDate": f"{year}-{int(rng.integers(1, 13)):02d}-{int(rng.integers(1, 29)):02d}",
+        "citedby-count": str(int(rng.poisson(8))),
+        "openaccess": "0",
+        "subtype": "ar",
+        "affiliation": [{"affilname": "Mock University", "afid": "60000000", "affiliation-city": "Birmingham",
+                         "affiliation-country": "United States"}],
+        "author": authors,
+        "author-count": {"$": str(len(authors))},
+    }
+
+
+def serial_title_entry(issn):
+    rng = np.random.default_rng(_seed(issn))
+    return {
+        "dc:title": f"Journal {issn}",
+        "prism:issn": issn,
+        "source-id": str(_seed(issn) % 10**8),
+        "SNIPList": {"SNIP": [
+            {"@_fa": "true", "@year": str(year), "$": f"{rng.gamma(2.0, 0.6):.3f}"} for year in range(2011, 2025)
+        ]},
+    }
+
+
+def crossref_work(doi):
+    rng = np.random.default_rng(_seed(doi))
+    year = int(rng.integers(2015, 2025))
+    return {
+        "DOI": doi,
+        "title": [f"Mock CrossRef work {doi}"],
+        "container-title": [f"Journal {int(rng.integers(0, 2000)):07d}X"],
+        "ISSN": [f"{int(rng.integers(0, 2000)):07d}X"],
+        "issued": {"date-parts": [[year, int(rng.integers(1, 13))]]},
+        "author": [{"given": "A.", "family": f"Author{int(a)}"} for a in rng.choice(400, size=3, replace=False)],
+        "is-referenced-by-count": int(rng.poisson(8)),
+    }
+
+
+def chat_completion(prompt):
+    """Answer a query-conversion prompt with a plausible Scopus query."""
+    query = prompt.split("Query:\n\n", 1)[-1].split("\n\n", 1)[0].strip()
+    match = DOI_RE.search(query)
+    content = f'(DOI("{match.group(1)}"))' if match else f'(TITLE-ABS-KEY("{query}"))'
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+    }
+
+
+class MockServices:
+    """
+    Run the mocked APIs on a local port in a background thread.
+
+    Args:
+        profiles (dict, optional): `ServiceProfile` per service name (see SERVICES);
+            missing services use the defaults.
+        scopus_results (int): total results for queries without a DOI clause.
+        seed (int): seed for latency and error draws.
+        host (str): interface to bind.
+        port (int): port to bind; 0 picks a free one.
+    """
+
+    def __init__(self, profiles=None, scopus_results=100, seed=0, host="127.0.0.1", port=0):
+        profiles = profiles or {}
+        self.scopus_results = scopus_results
+        self._services = {
+            name: _ServiceState(profile, remaining=profile.quota)
+            for name, profile in ((name, profiles.get(name, ServiceProfile())) for name in SERVICES)
+        }
+        for state in self._services.values():
+            state.tokens = state.profile.rate_limit or 0.0
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.stats = Counter()  # (service, status) -> requests
+        self.connections = 0  # sockets accepted
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.arrivals = []  # (monotonic time, service) of every request
+        self.server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-services", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def admit(self, service):
+        """
+        Decide how to answer one request.
+
+        Returns:
+            tuple: (status, delay_seconds, headers). Status is 200, 429 or 503.
+        """
+        with self._lock:
+            state = self._services[service]
+            profile = state.profile
+            delay = profile.latency * float(self._rng.lognormal(0.0, profile.jitter)) if profile.jitter else profile.latency
+            headers = {}
+            status = 200
+            if profile.rate_limit:
+                now = time.monotonic()
+                state.tokens = min(profile.rate_limit, state.tokens + (now - state.updated) * profile.rate_limit)
+                state.updated = now
+                if state.tokens < 1.0:
+                    status = 429
+                    # Delay-seconds must be a whole number (RFC 9110); urllib3 rejects "0.098"
+                    headers["Retry-After"] = str(math.ceil((1.0 - state.tokens) / profile.rate_limit))
+                    delay = min(delay, 0.005)
+                else:
+                    state.tokens -= 1.0
+            if status == 200 and self._rng.random() < profile.error_rate:
+                status = 503
+            if status == 200:
+                state.remaining = max(state.remaining - 1, 0)
+            headers["X-RateLimit-Limit"] = str(profile.quota)
+            headers["X-RateLimit-Remaining"] = str(state.remaining)
+            headers["X-RateLimit-Reset"] = str(int(time.time()) + 7 * 86400)
+            self.stats[(service, status)] += 1
+        return status, delay, headers
+
+    @contextmanager
+    def serving(self, service):
+        """
+        Track one request to `service` as in flight while the block runs.
+        """
+        with self._lock:
+            self.arrivals.append((time.monotonic(), service))
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def reset_counters(self):
+        """Zero the connection, in-flight and arrival counters (not the per-status stats)."""
+        with self._lock:
+            self.connections = 0
+            self.peak_in_flight = self.in_flight
+            self.arrivals = []
+
+    def summary(self):
+        """Requests served per service and status, e.g. {"scopus": {"200": 40, "429": 3}}."""
+        with self._lock:
+            summary = {}
+            for (service, status), count in sorted(self.stats.items()):
+                summary.setdefault(service, {})[str(status)] = count
+            return summary
+
+    @contextmanager
+    def patch(self, config_path=None):
+        """
+        Point the dashboard's clients at the mock services for the duration of the block:
+        pybliometrics' URL table (with a throwaway config, written to `config_path` if
+        given, and a throwaway cache), the CrossRef base
+        URL, and a fresh shared HTTP client whose limits for the loopback host are those
+        of the real CrossRef host. Yields the OpenAI base URL to pass to `convert_query`.
+        """
+        import tempfile
+
+        from pybliometrics.utils import constants, startup
+
+        from bibliometrics_1 import data, http_client
+
+        urls = constants.URLS
+        saved_urls = {name: urls[name] for name in ("ScopusSearch", "SerialTitleISSN")}
+        saved_crossref = data.CROSSREF_API_BASE
+        saved_client = http_client._client
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_path = config_path or Path(tmp_dir, "pybliometrics.cfg")
+            write_pybliometrics_config(config_path, Path(tmp_dir, "cache"))
+            startup.init(config_path=config_path)
+            urls["ScopusSearch"] = f"{self.base_url}/content/search/scopus"
+            urls["SerialTitleISSN"] = f"{self.base_url}/content/serial/title/issn/"
+            data.CROSSREF_API_BASE = self.base_url
+            host = urlsplit(self.base_url).hostname
+            http_client._client = http_client.HttpClient(
+                host_limits={host: http_client.HOST_LIMITS["api.crossref.org"]}
+            )
+            try:
+                yield f"{self.base_url}/v1"
+            finally:
+                http_client._client.close()
+                http_client._client = saved_client
+                data.CROSSREF_API_BASE = saved_crossref
+                urls.update(saved_urls)
+
+
+def write_pybliometrics_config(config_path, cache_dir, key=MOCK_API_KEY):
+    """
+    Write a pybliometrics config whose caches all live under `cache_dir`. The app's
+    `ConfigManager` leaves an existing config alone when it already holds the key.
+    """
+    from pybliometrics.utils.constants import DEFAULT_PATHS
+
+    config_path = Path(config_path)
+    config_path.parent.mkdir(parents=True, exist_ok=True)
+    config_path.write_text(
+        "[Directories]\n"
+        + "".join(f"{api} = {Path(cache_dir, api)}\n" for api in DEFAULT_PATHS)
+        + f"[Authentication]\nAPIKey = {key}\n[Requests]\nTimeout = 20\nRetries = 5\n"
+    )
+    return config_path
+
+
+def _make_handler(services):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # keep benchmark output clean
+            pass
+
+        def setup(self):
+            super().setup()
+            with services._lock:
+                services.connections += 1
+
+        def handle(self):
+            try:
+                super().handle()
+            except ConnectionResetError:  # a client closed its kept-alive connection mid-transfer
+                pass
+
+        def _send(self, status, payload, headers):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _answer(self, service, build):
+            with services.serving(service):
+                self._respond(service, build)
+
+        def _respond(self, service, build):
+            status, delay, headers = services.admit(service)
+            time.sleep(delay)
+            if status == 429:
+                self._send(429, {"error-response": {"error-message": "Quota Exceeded"}}, headers)
+            elif status == 503:
+                self._send(503, {"error-response": {"error-message": "Service unavailable"}}, headers)
+            else:
+                payload = build()
+                if payload is None:
+                    self._send(404, {"status": "error", "message": "Resource not found."}, headers)
+                else:
+                    self._send(200, payload, headers)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+            path = unquote(parts.path)
+            if path == "/content/search/scopus":
+                self._answer("scopus", lambda: self._scopus_page(params))
+            elif path.startswith("/content/serial/title/issn/"):
+                issn = path.rsplit("/", 1)[-1]
+                self._answer("serial_title", lambda: {"serial-metadata-response": {"entry": [serial_title_entry(issn)]}})
+            elif path == "/works":
+                self._answer("crossref", lambda: {"status": "ok", "message": {"total-results": 150000000, "items": []}})
+            elif path.startswith("/works/"):
+                doi = path[len("/works/"):]
+                self._answer("crossref", lambda: {"status": "ok", "message": crossref_work(doi)})
+            elif path.startswith("/bytes/"):
+                with services.serving("bytes"):
+                    try:
+                        self._send_bytes(int(path.rsplit("/", 1)[-1]), chunked=params.get("chunked") == "1")
+                    except (BrokenPipeError, ConnectionResetError):  # the client stopped reading at its limit
+                        self.close_connection = True
+            else:
+                self._send(404, {"error": "unknown route"}, {})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if urlsplit(self.path).path == "/v1/chat/completions":
+                prompt = body.get("messages", [{}])[-1].get("content", "")
+                self._answer("openai", lambda: chat_completion(prompt))
+            else:
+                self._send(404, {"error": "unknown route"}, {})
+
+        def _send_bytes(self, size, chunked=False):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            if chunked:  # no Content-Length: the client only finds out while reading
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for start in range(0, size, 1024):
+                    chunk = b"x" * min(1024, size - start)
+                    self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+            else:
+                self.send_header("Content-Length", str(size))
+                self.end_headers()
+                self.wfile.write(b"x" * size)
+
+        def _scopus_page(self, params):
+            query = params.get("query", "")
+            total = 1 if DOI_RE.search(query) else services.scopus_results
+            count = min(int(params.get("count", SCOPUS_MAX_COUNT)), SCOPUS_MAX_COUNT)
+            cursor = params.get("cursor")
+            start = int(params.get("start", 0)) if cursor is None else (0 if cursor == "*" else int(cursor))
+            entries = [scopus_entry(query, i) for i in range(start, min(start + count, total))]
+            results = {
+                "opensearch:totalResults": str(total),
+                "opensearch:startIndex": str(start),
+                "opensearch:itemsPerPage": str(len(entries)),
+                "entry": entries,
+            }
+            if cursor is not None:
+                results["cursor"] = {"@current": cursor, "@next": str(start + count)}
+            return {"search-results": results}
+
+    return Handler
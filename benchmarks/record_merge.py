@@ -0,0 +1,113 @@
+"""Record-merge benchmark: per-row dict coalescing vs. the columnar merge engine.
+
+Both merge one Scopus row and one CrossRef `works` message per DOI, as
+`CrossRefManager.fetch_publications_for_dois` does after fetching. The legacy
+path is the per-row `row_data.get(...) or crossref_data.get(...)` chain the
+engine replaced; it is kept here only as a baseline.
+
+Usage:
+    python -m benchmarks.record_merge --rows 1000 10000 100000
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_publications
+from bibliometrics_1.merge import flatten_crossref, flatten_scopus, merge_sources
+
+
+def make_crossref_records(scopus, seed=0):
+    """CrossRef messages for the DOIs of `scopus`; about a third lack a field the Scopus row has."""
+    rng = np.random.default_rng(seed)
+    records = []
+    for row in scopus.itertuples():
+        authors = [{"given": "A.", "family": name.split(",")[0]} for name in row.author_names.split(";")]
+        year, month, day = (int(part) for part in row.coverDate.split("-"))
+        records.append({
+            "DOI": row.doi,
+            "title": [row.title] if rng.random() > 0.3 else [],
+            "container-title": [row.journal_name],
+            "ISSN": [f"{row.issn[:4]}-{row.issn[4:]}"],
+            "issued": {"date-parts": [[year, month, day]]},
+            "created": {"date-time": f"{row.coverDate}T00:00:00Z"},
+            "author": authors,
+            "is-referenced-by-count": int(row.citedby_count),
+        })
+    return records
+
+
+def legacy_merge(scopus, crossref_records):
+    publication_data = []
+    # The legacy loop built one dict per Scopus row (`scopus_data.iloc[0].to_dict()`)
+    for row_data, crossref_data in zip(scopus.to_dict("records"), crossref_records):
+        row_data.update({
+            "journal_issn": row_data.get("journal_issn") or (
+                crossref_data.get("ISSN", [None])[0] if isinstance(crossref_data.get("ISSN"), list) and crossref_data.get("ISSN") else None
+            ),
+            "publication_date": row_data.get("publication_date") or (
+                crossref_data.get("issued", {}).get("date-parts", [[None]])[0][0] if crossref_data.get("issued") and crossref_data.get("issued").get("date-parts") else None
+            ),
+            "journal_name": row_data.get("journal_name") or (
+                crossref_data.get("container-title", [None])[0] if isinstance(crossref_data.get("container-title"), list) and crossref_data.get("container-title") else None
+            ),
+            "title": row_data.get("title") or (
+                crossref_data.get("title", [None])[0] if isinstance(crossref_data.get("title"), list) and crossref_data.get("title") else None
+            ),
+            "doi": row_data.get("doi") or crossref_data.get("DOI", None),
+            "author_names": row_data.get("author_names") or ", ".join([
+                author.get("given", "") + " " + author.get("family", "")
+                for author in crossref_data.get("author", [])
+            ]) if "author" in crossref_data else None,
+            "citation_count": row_data.get("citation_count") or crossref_data.get("is-referenced-by-count", None),
+            "publication_date": row_data.get("date_published") or crossref_data.get("created", {}).get("date-time", None),
+            "cited_by": crossref_data.get("is-referenced-by-count", None),
+        })
+        publication_data.append(row_data)
+    return pd.DataFrame(publication_data)
+
+
+def engine_merge(scopus, crossref_records):
+    keys = scopus["doi"].tolist()
+    return merge_sources({
+        "scopus": flatten_scopus(scopus, index=keys),
+        "crossref": flatten_crossref(crossref_records, index=keys),
+    })
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="write results as JSON to this path")
+    cli = parser.parse_args()
+
+    results = []
+    for rows in cli.rows:
+        scopus = make_publications(rows)
+        # A third of the Scopus rows miss the journal name, so CrossRef has to fill it
+        scopus.loc[scopus.index % 3 == 0, "journal_name"] = None
+        scopus["publication_date"] = pd.to_datetime(scopus["publication_date"])
+        crossref_records = make_crossref_records(scopus)
+        legacy = best_of(lambda: legacy_merge(scopus, crossref_records), cli.repeat)
+        engine = best_of(lambda: engine_merge(scopus, crossref_records), cli.repeat)
+        results.append({"rows": rows, "legacy_s": legacy, "engine_s": engine, "speedup": legacy / engine})
+        print(f"{rows:>8,} rows  legacy {legacy:.3f}s  engine {engine:.3f}s  ({legacy / engine:.1f}x)")
+    if cli.output:
+        cli.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Slice-metrics benchmark: one-pass bincount vs. one sklearn call per slice.
+
+The per-slice loop is timed on the first `--legacy-slices` slices and
+extrapolated to the full slice count; running it on all 500 slices takes
+several minutes.
+
+Usage:
+    python -m benchmarks.slice_metrics --rows 1000000 --slices 500 --output slice_metrics.json
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.metrics import precision_recall_fscore_support
+
+from bibliometrics_1.evaluate import get_slice_metrics
+
+
+def make_data(rows, num_slices, num_classes, seed=0):
+    """Predictions ~80% correct and overlapping slices covering 0.5-5% of rows each."""
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(0, num_classes, size=rows)
+    y_pred = np.where(rng.random(rows) < 0.8, y_true, rng.integers(0, num_classes, size=rows))
+    dtype = np.dtype([(f"slice_{i}", bool) for i in range(num_slices)])
+    slices = np.zeros(rows, dtype=dtype).view(np.recarray)
+    coverage = rng.uniform(0.005, 0.05, size=num_slices)
+    for i, name in enumerate(dtype.names):
+        slices[name] = rng.random(rows) < coverage[i]
+    return y_true, y_pred, slices
+
+
+def legacy_slice_metrics(y_true, y_pred, slices, names):
+    metrics = {}
+    for slice_name in names:
+        mask = slices[slice_name].astype(bool)
+        if sum(mask):
+            slice_metrics = precision_recall_fscore_support(y_true[mask], y_pred[mask], average="micro")
+            metrics[slice_name] = {
+                "precision": slice_metrics[0],
+                "recall": slice_metrics[1],
+                "f1": slice_metrics[2],
+                "num_samples": len(y_true[mask]),
+            }
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--slices", type=int, default=500)
+    parser.add_argument("--classes", type=int, default=10)
+    parser.add_argument("--legacy-slices", type=int, default=10, help="slices timed for the per-slice loop")
+    parser.add_argument("--output", type=Path, help="write results as JSON to this path")
+    cli = parser.parse_args()
+
+    y_true, y_pred, slices = make_data(cli.rows, cli.slices, cli.classes)
+
+    start = time.perf_counter()
+    metrics = get_slice_metrics(y_true, y_pred, slices)
+    vectorized = time.perf_counter() - start
+
+    names = slices.dtype.names[: cli.legacy_slices]
+    start = time.perf_counter()
+    legacy = legacy_slice_metrics(y_true, y_pred, slices, names)
+    legacy_per_slice = (time.perf_counter() - start) / len(names)
+
+    for name in names:
+        assert np.isclose(legacy[name]["f1"], metrics[name]["f1"]), name
+        assert legacy[name]["num_samples"] == metrics[name]["num_samples"], name
+
+    results = {
+        "config": {key: value for key, value in vars(cli).items() if key != "output"},
+        "vectorized_s": vectorized,
+        "legacy_estimated_s": legacy_per_slice * cli.slices,
+        "speedup": legacy_per_slice * cli.slices / vectorized,
+    }
+    print(
+        f"{cli.rows:,} predictions x {cli.slices} slices: vectorized {vectorized:.2f}s, "
+        f"per-slice loop ~{results['legacy_estimated_s']:.1f}s (x{results['speedup']:.0f})"
+    )
+    if cli.output:
+        cli.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Cold-start benchmark for the dashboard.
+
+Reports, over fresh interpreters:
+    - import time of `bibliometrics_1.main`
+    - time to first paint: a full first script run of the app through
+      Streamlit's AppTest, with dummy API keys so nothing hits the network
+
+Usage:
+    python -m benchmarks.startup --repeat 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent.absolute()
+APP_FILE = Path(BASE_DIR, "bibliometrics_1", "main.py")
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import bibliometrics_1.main
+print(time.perf_counter() - start)
+"""
+
+FIRST_PAINT_SNIPPET = """
+import sys
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=300)
+at.secrets["SCOPUS_API_KEY"] = "benchmark-key"
+at.secrets["OPENAI_API_KEY"] = "benchmark-key"
+at.run()
+elapsed = time.perf_counter() - start
+if at.exception:
+    raise SystemExit(f"App raised: {at.exception}")
+print(elapsed)
+"""
+
+
+def _run_snippet(snippet, *args):
+    """Run `snippet` in a fresh interpreter and return the float it prints last."""
+    # A scratch cwd keeps the app's ./.config/pybliometrics.cfg out of the repo
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, "-c", snippet, *map(str, args)],
+            cwd=cwd,
+            env={**os.environ, "PYTHONPATH": str(BASE_DIR)},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def _summary(samples):
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "samples": samples,
+    }
+
+
+def measure_import_time(repeat=5):
+    return _summary([_run_snippet(IMPORT_SNIPPET) for _ in range(repeat)])
+
+
+def measure_first_paint(repeat=3):
+    return _summary([_run_snippet(FIRST_PAINT_SNIPPET, APP_FILE) for _ in range(repeat)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--output", type=Path, help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = {
+        "import_time": measure_import_time(args.repeat),
+        "first_paint": measure_first_paint(args.repeat),
+    }
+    for name, summary in results.items():
+        print(f"{name:12s} median {summary['median_s']:.3f}s  (min {summary['min_s']:.3f}s, max {summary['max_s']:.3f}s)")
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Synthetic publication data and local stand-ins for the external APIs.
+
+`make_publications` builds a frame shaped like `DataProcessor.fetch_scopus_data`
+output (plus the CrossRef-derived columns), so the dashboard's data paths can be
+timed at any scale without API keys.
+"""
+import zlib
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+
+def make_publications(rows, authors_per_paper=6, num_authors=None, num_issns=500, year_span=10,
+                      end_year=2024, seed=0):
+    """
+    Args:
+        rows (int): number of publications.
+        authors_per_paper (int): mean authors per paper (Poisson, at least 1).
+        num_authors (int, optional): size of the author pool. Defaults to rows // 2.
+            Authors are drawn Zipf-like, so a few prolific authors collaborate often.
+        num_issns (int): distinct journal ISSNs.
+        year_span (int): publication years cover end_year - year_span + 1 .. end_year.
+        end_year (int): latest publication year.
+        seed (int): random seed.
+
+    Returns:
+        pd.DataFrame: one row per publication.
+    """
+    rng = np.random.default_rng(seed)
+    num_authors = num_authors or max(rows // 2, 10)
+
+    author_pool = np.array([f"Author{i}, A." for i in range(num_authors)], dtype=object)
+    weights = 1.0 / np.arange(1, num_authors + 1)
+    weights /= weights.sum()
+    sizes = np.maximum(rng.poisson(authors_per_paper, size=rows), 1)
+    drawn = author_pool[rng.choice(num_authors, size=sizes.sum(), p=weights)]
+    author_names = [";".join(authors) for authors in np.split(drawn, np.cumsum(sizes)[:-1])]
+
+    issn_pool = np.array([f"{i:07d}X" for i in range(num_issns)], dtype=object)
+    issn_index = rng.integers(0, num_issns, size=rows)
+    start = np.datetime64(f"{end_year - year_span + 1}-01-01")
+    days = (np.datetime64(f"{end_year + 1}-01-01") - start).astype(int)
+    cover_dates = start + rng.integers(0, days, size=rows).astype("timedelta64[D]")
+
+    return pd.DataFrame({
+        "eid": [f"2-s2.0-{85000000000 + i}" for i in range(rows)],
+        "doi": [f"10.{1000 + i % 9000}/bench.{i}" for i in range(rows)],
+        "title": [f"Synthetic study {i} of topic {i % 97}" for i in range(rows)],
+        "author_names": author_names,
+        "publicationName": [f"Journal {i}" for i in issn_index],
+        "issn": issn_pool[issn_index],
+        "coverDate": pd.to_datetime(cover_dates).strftime("%Y-%m-%d"),
+        "citedby_count": rng.poisson(8, size=rows),
+        "journal_name": [f"Journal {i}" for i in issn_index],
+        "journal_issn": issn_pool[issn_index],
+        "publication_date": pd.to_datetime(cover_dates).strftime("%Y-%m-%d"),
+    })
+
+
+def make_duplicated_publications(rows, duplicate_share=0.2, vocabulary_size=20000, seed=0):
+    """
+    Publications from several sources with known duplicates, for deduplication.
+
+    Titles are 6-14 words drawn from `vocabulary_size` pseudo-words. A share of
+    rows is repeated as it would arrive from another source: DOI upper-cased,
+    given as a doi.org URL or "doi:" prefix, or missing; title re-cased, with
+    punctuation, or with its last word dropped.
+
+    Args:
+        rows (int): number of distinct publications.
+        duplicate_share (float): duplicates added, as a share of `rows`.
+        vocabulary_size (int): distinct title words.
+        seed (int): random seed.
+
+    Returns:
+        tuple: (df, truth); truth[i] is the distinct publication row i describes.
+    """
+    rng = np.random.default_rng(seed)
+    df = make_publications(rows, seed=seed)
+    vocabulary = np.array([f"w{i:x}" for i in range(vocabulary_size)], dtype=object)
+    lengths = rng.integers(6, 15, size=rows)
+    # Zipf-Mandelbrot word frequencies: common words recur without dominating every title
+    weights = 1.0 / (np.arange(vocabulary_size) + 50)
+    words = vocabulary[rng.choice(vocabulary_size, size=lengths.sum(), p=weights / weights.sum())]
+    df["title"] = [" ".join(title) for title in np.split(words, np.cumsum(lengths)[:-1])]
+
+    num_duplicates = int(rows * duplicate_share)
+    source = rng.integers(0, rows, size=num_duplicates)
+    duplicates = df.iloc[source].copy()
+    doi_variant = rng.integers(0, 4, size=num_duplicates)
+    dois = duplicates["doi"].to_numpy(dtype=object)
+    duplicates["doi"] = np.select(
+        [doi_variant == 0, doi_variant == 1, doi_variant == 2],
+        [np.char.upper(dois.astype(str)), "https://doi.org/" + dois, "doi:" + dois],
+        default=None,
+    )
+    title_variant = rng.integers(0, 4, size=num_duplicates)
+    titles = duplicates["title"].str
+    duplicates["title"] = np.select(
+        [title_variant == 0, title_variant == 1, title_variant == 2],
+        [titles.upper(), titles.replace(" ", ", ", n=1, regex=False) + ".", titles.rsplit(n=1).str[0]],
+        default=titles.title(),
+    )
+    truth = np.concatenate([np.arange(rows), source])
+    order = rng.permutation(rows + num_duplicates)
+    return pd.concat([df, duplicates], ignore_index=True).iloc[order].reset_index(drop=True), truth[order]
+
+
+def make_docx(num_dois, seed=0):
+    """
+    Returns:
+        bytes: a .docx reference list with `num_dois` DOIs (about 5% repeated).
+    """
+    from docx import Document
+
+    rng = np.random.default_rng(seed)
+    document = Document()
+    for i in range(num_dois):
+        doi_id = i if rng.random() > 0.05 else int(rng.integers(0, max(i, 1)))
+        document.add_paragraph(f"Author A, Author B. Synthetic reference {i}. J Bench. doi: 10.{1000 + doi_id % 9000}/bench.{doi_id}.")
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def make_source_list(num_issns=500):
+    """
+    Returns:
+        pd.DataFrame: a wide Scopus source-title list ("<year> SNIP" columns) for the
+        ISSNs `make_publications` draws from, with the SNIPs `StubSerialTitle` reports.
+    """
+    issns = [f"{i:07d}X" for i in range(num_issns)]
+    df = pd.DataFrame({
+        "Source Title": [f"Journal {i}" for i in range(num_issns)],
+        "Print-ISSN": [f"{issn[:4]}-{issn[4:]}" for issn in issns],
+    })
+    snips = np.array([[snip for _, snip in StubSerialTitle(issn).sniplist] for issn in issns])
+    for column, year in enumerate(range(2000, 2025)):
+        df[f"{year} SNIP"] = snips[:, column]
+    return df
+
+
+class StubSerialTitle:
+    """
+    Stand-in for `pybliometrics.scopus.SerialTitle`: a deterministic SNIP list
+    per ISSN, with no network access.
+    """
+
+    def __init__(self, issn, refresh=False, view="ENHANCED"):
+        rng = np.random.default_rng(zlib.crc32(str(issn).encode("utf-8")))
+        self.sniplist = [(year, round(float(rng.gamma(2.0, 0.6)), 3)) for year in range(2000, 2025)]
+
+    def get_key_remaining_quota(self):
+        return None
+
+    def get_key_reset_time(self):
+        return None
+
+
+class PassthroughQuota:
+    """Stand-in for `quota.ElsevierQuota` that calls straight through, without rate limiting."""
+
+    def call(self, fn):
+        return fn()
@@ -0,0 +1,119 @@
+"""Training-loop benchmark: mini-batch `train.fit_model` vs. the previous loop.
+
+The previous loop physically oversampled the sparse TF-IDF matrix
+(`RandomOverSampler`), ran one `fit` epoch at a time with `warm_start`, and
+computed `log_loss` on the full train and validation sets after every epoch.
+It is reproduced here so both can run on the same synthetic data.
+
+Usage:
+    python -m benchmarks.train_loop --rows 100000 --epochs 10 --output train_loop.json
+"""
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from argparse import Namespace
+from pathlib import Path
+
+import mlflow
+import numpy as np
+from scipy import sparse
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import log_loss
+
+from bibliometrics_1.train import fit_model
+
+
+def make_data(rows, features, nnz_per_row, seed=0):
+    """Imbalanced labels and row-normalized sparse features shaped like TF-IDF output."""
+    rng = np.random.default_rng(seed)
+    y = rng.choice(5, size=rows, p=[0.6, 0.2, 0.1, 0.07, 0.03])
+    indptr = np.arange(0, rows * nnz_per_row + 1, nnz_per_row)
+    indices = rng.integers(0, features, size=rows * nnz_per_row)
+    X = sparse.csr_matrix((rng.random(rows * nnz_per_row), indices, indptr), shape=(rows, features))
+    # Give each class a characteristic column so the model has something to learn
+    X = X + sparse.csr_matrix((np.ones(rows), (np.arange(rows), y * 7)), shape=(rows, features))
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1))).ravel()
+    X = sparse.diags(1 / norms) @ X
+    return X.tocsr(), y
+
+
+def make_model(**kwargs):
+    return SGDClassifier(loss="log_loss", penalty="l2", alpha=1e-4, learning_rate="constant", eta0=0.1, **kwargs)
+
+
+def legacy_loop(args, X_train, y_train, X_val, y_val):
+    rng = np.random.default_rng(args.seed)
+    classes, counts = np.unique(y_train, return_counts=True)
+    indices = [np.arange(len(y_train))] + [
+        rng.choice(np.flatnonzero(y_train == c), size=counts.max() - n, replace=True) for c, n in zip(classes, counts)
+    ]
+    over = np.concatenate(indices)
+    X_over, y_over = X_train[over], y_train[over]  # physical copy, as RandomOverSampler made
+    model = make_model(max_iter=1, warm_start=True)
+    for epoch in range(args.num_epochs):
+        model.fit(X_over, y_over)
+        train_loss = log_loss(y_train, model.predict_proba(X_train))
+        val_loss = log_loss(y_val, model.predict_proba(X_val))
+        mlflow.log_metrics({"train_loss": train_loss, "val_loss": val_loss}, step=epoch)
+    y_prob = model.predict_proba(X_val)
+    y_pred = model.predict(X_val)
+    np.quantile([y_prob[i][j] for i, j in enumerate(y_pred)], q=0.25)
+    return model
+
+
+def minibatch_loop(args, X_train, y_train, X_val, y_val):
+    model = fit_model(args, make_model(n_jobs=args.n_jobs), X_train, y_train, X_val, y_val)
+    y_prob = model.predict_proba(X_val)
+    y_pred = y_prob.argmax(axis=1)
+    np.quantile(y_prob[np.arange(len(y_pred)), y_pred], q=0.25)
+    return model
+
+
+def measure(loop, args, *data):
+    tracemalloc.start()
+    start = time.perf_counter()
+    loop(args, *data)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds_per_epoch": elapsed / args.num_epochs, "peak_mb": peak / 2**20}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--features", type=int, default=50_000)
+    parser.add_argument("--nnz-per-row", type=int, default=60)
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32768)
+    parser.add_argument("--output", type=Path, help="write results as JSON to this path")
+    cli = parser.parse_args()
+
+    X, y = make_data(cli.rows, cli.features, cli.nnz_per_row)
+    split = int(0.85 * cli.rows)
+    data = (X[:split], y[:split], X[split:], y[split:])
+    args = Namespace(
+        num_epochs=cli.epochs, batch_size=cli.batch_size, eval_interval=10,
+        eval_sample_size=5000, n_jobs=-1, seed=42,
+    )
+
+    with tempfile.TemporaryDirectory() as tracking_dir:
+        mlflow.set_tracking_uri(f"sqlite:///{Path(tracking_dir, 'mlflow.db')}")
+        mlflow.log_metrics({"warmup": 0.0})  # create the store before anything is timed
+        results = {
+            "config": {key: value for key, value in vars(cli).items() if key != "output"},
+            "legacy": measure(legacy_loop, args, *data),
+            "minibatch": measure(minibatch_loop, args, *data),
+        }
+        mlflow.end_run()
+
+    for name in ("legacy", "minibatch"):
+        print(f"{name:10s} {results[name]['seconds_per_epoch']:.3f}s/epoch  peak {results[name]['peak_mb']:.1f} MB")
+    if cli.output:
+        cli.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
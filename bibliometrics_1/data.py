@@ -1,18 +1,39 @@
 #A place for data manipulation functions
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import datetime
+import functools
+import hashlib
+import json
+import logging
+import os
 from io import BytesIO
 import re
+import shutil
 from urllib.parse import quote
-from docx import Document
 import numpy as np
 import pandas as pd
-import requests
 import streamlit as st
-from pybliometrics.scopus import SerialTitle, ScopusSearch, init, create_config
+from config import config
+from bibliometrics_1.dedup import deduplicate
+from bibliometrics_1.http_client import get_http_client
+from bibliometrics_1.jobs import DONE, FAILED, check_cancelled, get_job_manager, notify, scaled_progress
+from bibliometrics_1.journal_index import get_journal_index
+from bibliometrics_1.merge import flatten_crossref, flatten_scopus, merge_sources
+from bibliometrics_1.perf import get_recorder, timed
 from bibliometrics_1.predict import QueryConverter
+from bibliometrics_1.quota import get_quota
+from bibliometrics_1.singleflight import get_single_flight
 from bibliometrics_1.utils import SNIPManager
 
+logger = logging.getLogger(__name__)
+
+CROSSREF_API_BASE = "https://api.crossref.org"
+CROSSREF_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "application/json"
+}
+
 class CrossRefManager:
     @staticmethod
     def is_crossref_available():
@@ -20,47 +41,62 @@ class CrossRefManager:
         Check if the CrossRef API is functioning.
         """
         try:
-            test_url = "https://api.crossref.org/works/"
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                "Accept": "application/json"
-            }
-            response = requests.get(test_url, headers=headers)
+            # rows=0 keeps the probe cheap; the shared client reuses the pooled connection afterwards
+            response = get_http_client().get(
+                f"{CROSSREF_API_BASE}/works", params={"rows": 0}, headers=CROSSREF_HEADERS
+            )
             return response.status_code == 200
         except Exception:
             return False
     
+    @timed("fetch_crossref_data", cached=True)
     @st.cache_data
     def fetch_crossref_data(doi):
         """
         Query CrossRef for publication data using DOI.
         """
+        get_recorder().add(cache_misses=1)
+        return CrossRefManager.fetch_crossref_record(doi)
+
+    @staticmethod
+    def fetch_crossref_record(doi):
+        """
+        Uncached body of `fetch_crossref_data`, usable from a background job:
+        st.cache_data needs the script run context that job threads lack.
+        Concurrent and cross-process requests are still coalesced by `SingleFlight`.
+
+        Returns:
+            dict: The CrossRef `message` for the DOI, or None.
+        """
         # Correctly referenced static method from CrossRefManager class
         if not CrossRefManager.is_crossref_available():
-            st.warning("CrossRef API is not responding. Some data may be missing.")
+            notify("warning", "CrossRef API is not responding. Some data may be missing.")
             return None
         
         try:
             clean_doi = doi.strip().rstrip('.,;!?')
             encoded_doi = quote(clean_doi)
-            url = f"https://api.crossref.org/works/{encoded_doi}"
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                "Accept": "application/json"
-            }
-            response = requests.get(url, headers=headers)
+            url = f"{CROSSREF_API_BASE}/works/{encoded_doi}"
+            # Sessions asking for the same DOI at the same time share one request
+            response = get_single_flight().do(
+                ("crossref", clean_doi.lower()),
+                lambda: get_http_client().get(url, headers=CROSSREF_HEADERS),
+                cacheable=lambda response: response.status_code in (200, 404),
+            )
             if response.status_code == 200:
                 data = response.json()
                 if "message" in data:
                     return data["message"]
                 else:
-                    st.warning("CrossRef response does not contain 'message' key.")
+                    notify("warning", "CrossRef response does not contain 'message' key.")
             elif response.status_code == 404:
                 pass
             else:
-                st.error(f"CrossRef API error {response.status_code}: {response.text}")
+                notify("error", f"CrossRef API error {response.status_code}: {response.text}")
+                logger.warning(f"CrossRef API error {response.status_code} for DOI {clean_doi}", extra={"sample_key": "crossref_error"})
         except Exception as e:
-            st.error(f"Error querying CrossRef for DOI {clean_doi}: {e}")
+            notify("error", f"Error querying CrossRef for DOI {clean_doi}: {e}")
+            logger.warning(f"Error querying CrossRef for DOI {clean_doi}: {e}", extra={"sample_key": "crossref_error"})
         return None
     
     @staticmethod
@@ -77,14 +113,36 @@ class CrossRefManager:
         Returns:
             pd.DataFrame: A DataFrame containing publication data.
         """
-        total_dois = len(dois)
         progress_bar = st.progress(0)
-        publication_data = []
+        df = CrossRefManager.fetch_publications_for_dois(
+            dois, api_headers, openai_api_base, progress=lambda fraction, message=None: progress_bar.progress(fraction)
+        )
+        progress_bar.empty()
+        return df
+
+    @staticmethod
+    def fetch_publications_for_dois(dois, api_headers, openai_api_base, progress=None, cancelled=None):
+        """
+        Uncached body of `fetch_data_for_dois`, usable from a background job.
+
+        Args:
+            dois (list): List of DOIs to query.
+            api_headers (dict): API headers for the OpenAI API.
+            openai_api_base (str): Base URL for the OpenAI API.
+            progress (callable, optional): Called with the share of DOIs done and a message.
+            cancelled (callable, optional): Checked before each DOI; stops with `JobCancelled`.
+
+        Returns:
+            pd.DataFrame: A DataFrame containing publication data.
+        """
+        total_dois = len(dois)
+        scopus_rows, crossref_records = {}, {}
 
         for index, doi in enumerate(dois, start=1):
+            check_cancelled(cancelled)
             clean_doi = doi.strip()
-            progress_bar.progress(index / total_dois)
-            row_data = {}
+            if progress is not None:
+                progress(index / total_dois, f"Fetching DOI {index} of {total_dois}")
 
             # Convert query using QueryConverter for Scopus data
             converted_query = QueryConverter.convert_query(
@@ -96,7 +154,7 @@ class CrossRefManager:
             if converted_query:
                 scopus_data = DataProcessor.fetch_scopus_data(converted_query)
                 if not scopus_data.empty:
-                    row_data = scopus_data.iloc[0].to_dict()
+                    scopus_rows[clean_doi] = scopus_data.iloc[:1]
 
             # Convert query using QueryConverter for CrossRef data
             crossref_query = QueryConverter.convert_query(
@@ -106,43 +164,44 @@ class CrossRefManager:
                 openai_api_base=openai_api_base
             )
             if crossref_query:
-                crossref_data = CrossRefManager.fetch_crossref_data(clean_doi)
+                crossref_data = CrossRefManager.fetch_crossref_record(clean_doi)
                 if crossref_data:
-                    row_data.update({
-                        "journal_issn": row_data.get("journal_issn") or (
-                            crossref_data.get("ISSN", [None])[0] if isinstance(crossref_data.get("ISSN"), list) and crossref_data.get("ISSN") else None
-                        ),
-                        "publication_date": row_data.get("publication_date") or (
-                            crossref_data.get("issued", {}).get("date-parts", [[None]])[0][0] if crossref_data.get("issued") and crossref_data.get("issued").get("date-parts") else None
-                        ),
-                        "journal_name": row_data.get("journal_name") or (
-                            crossref_data.get("container-title", [None])[0] if isinstance(crossref_data.get("container-title"), list) and crossref_data.get("container-title") else None
-                        ),
-                        "title": row_data.get("title") or (
-                            crossref_data.get("title", [None])[0] if isinstance(crossref_data.get("title"), list) and crossref_data.get("title") else None
-                        ),
-                        "doi": row_data.get("doi") or crossref_data.get("DOI", None),
-                        "author_names": row_data.get("author_names") or ", ".join([
-                            author.get("given", "") + " " + author.get("family", "")
-                            for author in crossref_data.get("author", [])
-                        ]) if "author" in crossref_data else None,
-                        "citation_count": row_data.get("citation_count") or crossref_data.get("is-referenced-by-count", None),
-                        "publication_date": row_data.get("date_published") or crossref_data.get("created", {}).get("date-time", None),
-                        "cited_by": crossref_data.get("is-referenced-by-count", None)  # Ensure the cited_by column is populated
-                    })
-
-            if row_data:
-                publication_data.append(row_data)
-            else:
-                st.warning(f"No results found for DOI: {clean_doi}")
+                    crossref_records[clean_doi] = crossref_data
 
-        progress_bar.empty()
+            if clean_doi not in scopus_rows and clean_doi not in crossref_records:
+                notify("warning", f"No results found for DOI: {clean_doi}")
+                logger.info(f"No results found for DOI: {clean_doi}", extra={"sample_key": "doi_not_found"})
+
+        # One columnar merge for all DOIs; `<field>_source` columns record which source supplied each value
+        publication_data = None
+        if scopus_rows or crossref_records:
+            publication_data = merge_sources({
+                "scopus": flatten_scopus(pd.concat(scopus_rows.values()), index=list(scopus_rows)) if scopus_rows else None,
+                "crossref": flatten_crossref(crossref_records.values(), index=list(crossref_records)) if crossref_records else None,
+            }).reset_index(drop=True)
 
-        if publication_data:
-            return pd.DataFrame(publication_data)
+        if publication_data is not None:
+            return publication_data
         else:
-            st.warning("No publication data found for the provided DOIs.")
+            notify("warning", "No publication data found for the provided DOIs.")
             return pd.DataFrame(columns=["journal_issn", "publication_date", "journal_name", "title", "doi", "author_names", "citation_count", "date_published"])
+
+    @staticmethod
+    def load_dois(dois, api_headers, openai_api_base, progress=None, cancelled=None):
+        """
+        Fetch, process and SNIP-enrich publications for a DOI list; the body of a DOCX upload job.
+
+        Returns:
+            pd.DataFrame: Processed publications with a SNIP column, empty if nothing was found.
+        """
+        raw_df = CrossRefManager.fetch_publications_for_dois(
+            dois, api_headers, openai_api_base, progress=scaled_progress(progress, 0.0, 0.7), cancelled=cancelled
+        )
+        # Scopus and CrossRef records were merged; DOI variants in the list ("10.1000/X", "doi:10.1000/x") collapse here
+        deduplicated = deduplicate(raw_df)
+        if len(deduplicated) < len(raw_df):
+            notify("info", f"{len(raw_df) - len(deduplicated)} duplicate DOIs merged.")
+        return DataProcessor.load_publications(deduplicated, progress=scaled_progress(progress, 0.7, 1.0), cancelled=cancelled)
         
 class DataProcessor:        
     @staticmethod
@@ -159,6 +218,14 @@ class DataProcessor:
     @staticmethod
     @st.cache_data
     def process_data(df):
+        return DataProcessor.add_date_columns(df)
+
+    @staticmethod
+    def add_date_columns(df):
+        """
+        Uncached body of `process_data`, usable from a background job: parse
+        `publication_date` and add `Year`, `Month` and `MonthYear` in place.
+        """
         # Ensure 'publication_date' is in datetime format
         df['publication_date'] = pd.to_datetime(df['publication_date'], errors='coerce')
     
@@ -173,28 +240,63 @@ class DataProcessor:
 
     @staticmethod
     def extract_dois_from_docx(file):
+        from docx import Document  # python-docx is only needed for DOCX uploads
         document = Document(BytesIO(file.read()))
         text = " ".join(para.text.strip() for para in document.paragraphs)
         return list(set(re.findall(r"10\.\d{4,9}/[-._;()/:A-Za-z0-9]+", text)))
         
     
+    @timed("fetch_scopus_data")
     def fetch_scopus_data(query):
+        from pybliometrics.scopus import ScopusSearch
         try:
-            search = ScopusSearch(query)
-            if not search.results:
+            results = get_single_flight().do(
+                ("scopus", query),
+                lambda: get_quota("ScopusSearch").call(lambda: ScopusSearch(query)).results,
+            )
+            if not results:
                 return pd.DataFrame()
-            df = pd.DataFrame(search.results)
+            df = pd.DataFrame(results)
             if 'coverDate' in df.columns:
                 df['publication_date'] = pd.to_datetime(df['coverDate'], errors='coerce')
             if 'publicationName' in df.columns:
                 df['journal_name'] = df['publicationName']
             if 'issn' in df.columns:
                 df['journal_issn'] = df['issn']
+            get_recorder().add(rows=len(df))
             return df
         except Exception as e:
-            st.error(f"Error executing Scopus query: {query}. {str(e)}")
+            notify("error", f"Error executing Scopus query: {query}. {str(e)}")
             return pd.DataFrame()
     
+    @staticmethod
+    def load_scopus_query(query, progress=None, cancelled=None):
+        """
+        Fetch, process and SNIP-enrich a Scopus query; the body of a query job.
+
+        Returns:
+            pd.DataFrame: Processed publications with a SNIP column, empty if nothing was found.
+        """
+        if progress is not None:
+            progress(0.0, "Executing Scopus query...")
+        df = DataProcessor.fetch_scopus_data(query)
+        check_cancelled(cancelled)
+        return DataProcessor.load_publications(df, progress=scaled_progress(progress, 0.2, 1.0), cancelled=cancelled)
+
+    @staticmethod
+    def load_publications(df, progress=None, cancelled=None):
+        """
+        Process and SNIP-enrich loaded publications; the body of a spreadsheet upload job.
+        Rows are kept as uploaded: deduplication only runs where sources are combined.
+
+        Returns:
+            pd.DataFrame: Processed publications with a SNIP column, empty if `df` was.
+        """
+        if df.empty:
+            return df
+        df = DataProcessor.add_date_columns(df)
+        return DataProcessor.enrich_with_snip(df, progress=progress, cancelled=cancelled)
+
     @st.cache_data
     def aggregate_counts(df):
         monthly_counts = df.groupby(['Year', 'Month']).size().reset_index(name='Count')
@@ -202,52 +304,400 @@ class DataProcessor:
         return monthly_counts, yearly_counts
     
     @staticmethod
-    @st.cache_data
-    def enrich_with_snip(df):
+    @timed("enrich_with_snip")
+    def enrich_with_snip(df, progress=None, cancelled=None):
         """
         Enrich the DataFrame with SNIP values using journal ISSN and publication year.
+
+        Not wrapped in st.cache_data: SNIPManager caches per (ISSN, year) and leaves
+        transient API failures uncached, which a whole-frame cache would pin forever.
+        Pairs found in the offline journal index (see `journal_index`) never reach the API.
+
+        Args:
+            df (pd.DataFrame): Publications with `journal_issn` and `Year` columns.
+            progress (callable, optional): Called with the share of (ISSN, year) pairs done and a message.
+            cancelled (callable, optional): Checked before each lookup; stops with `JobCancelled`.
         """
+        get_recorder().add(rows=len(df))
         unique_pairs = df[['journal_issn', 'Year']].drop_duplicates()
-        snip_mapping = {}
-    
-        for _, row in unique_pairs.iterrows():
-            issn = row['journal_issn']
-            year = row['Year']
-            # Use the fully qualified name to call `get_snip`
-            snip_mapping[(issn, year)] = SNIPManager.get_snip(issn, year)
+        journal_index = get_journal_index()
+        if journal_index is not None:
+            snips, found = journal_index.lookup(unique_pairs['journal_issn'], unique_pairs['Year'])
+        else:
+            snips, found = np.full(len(unique_pairs), np.nan), np.zeros(len(unique_pairs), dtype=bool)
+        misses = np.flatnonzero(~found)
+        total_misses = len(misses)
+        # Use the fully qualified name to call `get_snip`
+        for index, row in enumerate(misses, start=1):
+            check_cancelled(cancelled)
+            snips[row] = SNIPManager.get_snip(unique_pairs['journal_issn'].iat[row], unique_pairs['Year'].iat[row])
+            if progress is not None:
+                progress(index / total_misses, f"Retrieving SNIP values ({index} of {total_misses} journals)")
+        unique_pairs['SNIP'] = snips
     
         # Apply SNIP values to the DataFrame
-        df['SNIP'] = df.apply(lambda row: snip_mapping.get((row['journal_issn'], row['Year']), np.nan), axis=1)
+        df['SNIP'] = df[['journal_issn', 'Year']].merge(
+            unique_pairs, how='left', on=['journal_issn', 'Year']
+        )['SNIP'].to_numpy()
         return df
     
+    @staticmethod
+    def snip_pending(df):
+        """
+        Whether a SNIP lookup for one of the (ISSN, year) pairs of `df` failed
+        transiently, so `enrich_with_snip` would retry it.
+        """
+        if not SNIPManager.pending or 'journal_issn' not in df.columns or 'Year' not in df.columns:
+            return False
+        pairs = df[['journal_issn', 'Year']].drop_duplicates()
+        return any(key in SNIPManager.pending for key in zip(pairs['journal_issn'], pairs['Year']))
+
+class PublicationWindow:
+    """
+    Publications sorted once by year, so any year range is a positional slice
+    (`iloc[lo:hi]`) of the sorted frame rather than a boolean-mask copy.
+    """
+    def __init__(self, df, year_column='Year'):
+        # Works for float, int and categorical year columns; unparseable years become NaN and sort last
+        years = np.asarray(df[year_column], dtype=float)
+        if len(years) > 1 and not np.all(years[:-1] <= years[1:]):
+            order = np.argsort(years, kind='stable')
+            df = df.take(order)
+            years = years[order]
+        self.df = df
+        self.years = years
+
+    def window(self, start=None, end=None):
+        """
+        Rows with start <= Year <= end (either bound may be None for open-ended).
+
+        Returns:
+            pd.DataFrame: A slice of the sorted frame; no rows are copied.
+        """
+        lo = 0 if start is None else np.searchsorted(self.years, start, side='left')
+        hi = np.searchsorted(self.years, np.inf if end is None else end, side='right')
+        return self.df.iloc[lo:hi]
+
+    def last_n_years(self, n, current_year):
+        """
+        Rows published from `current_year - n + 1` onwards.
+        """
+        return self.window(start=current_year - n + 1)
+    
+# Training text cleaning (see `preprocess`)
+BRACKETS_RE = re.compile(r"\(([^)]+)\)")  # parenthesised asides, e.g. "(in press)"
+NON_ALNUM_RE = re.compile(r"[^A-Za-z0-9]+")
+TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+
+
+@functools.lru_cache(maxsize=1)
+def _get_stopwords():
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS  # training only; keeps sklearn out of the app
+
+    return frozenset(ENGLISH_STOP_WORDS)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_stemmer():
+    from nltk.stem import PorterStemmer  # only needed when stemming
+
+    return PorterStemmer()
+
+
+@functools.lru_cache(maxsize=None)
+def _stem(word):
+    """
+    Porter stem of one vocabulary word, computed once per word per process.
+    """
+    return _get_stemmer().stem(word)
+
+
+def clean_text(text, lower=True, stem=False, stopwords=None):
+    """
+    Clean one raw text: drop parenthesised asides and punctuation, optionally
+    lowercase and stem, and remove stopwords.
+
+    Args:
+        text (str): raw text.
+        lower (bool, optional): lowercase the text. Defaults to True.
+        stem (bool, optional): Porter-stem each token. Defaults to False.
+        stopwords (frozenset, optional): tokens to drop. Defaults to sklearn's English stopwords.
+
+    Returns:
+        str: cleaned text.
+    """
+    return _clean_texts([text], lower=lower, stem=stem, stopwords=stopwords)[0]
+
+
+def _clean_texts(texts, lower, stem, stopwords=None):
+    """
+    Clean a chunk of texts. Stopword removal and stemming are resolved once per
+    distinct token in the chunk and then applied through a dict lookup.
+    """
+    stopwords = _get_stopwords() if stopwords is None else stopwords
+    tokenized = []
+    vocabulary = set()
+    for text in texts:
+        text = BRACKETS_RE.sub(" ", text or "")
+        if lower:
+            text = text.lower()
+        tokens = TOKEN_RE.findall(NON_ALNUM_RE.sub(" ", text))
+        tokenized.append(tokens)
+        vocabulary.update(tokens)
+
+    mapping = {}
+    for token in vocabulary:
+        if token.lower() in stopwords:
+            mapping[token] = None
+        else:
+            mapping[token] = _stem(token) if stem else token
+    return [" ".join(mapped for mapped in map(mapping.__getitem__, tokens) if mapped) for tokens in tokenized]
+
+
+def preprocess_cache_key(df, lower, stem, min_freq):
+    """
+    Cache key for `preprocess`: its parameters plus a fingerprint of the input rows.
+    """
+    params = {"lower": lower, "stem": stem, "min_freq": min_freq}
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df[["title", "description", "tag"]], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def preprocess(df, lower=True, stem=False, min_freq=75, num_workers=None, chunk_size=50_000, cache_dir=None):
+    """
+    Build the cleaned training frame: `text` (title + description, cleaned with
+    `clean_text`) and `tag`, with tags seen fewer than `min_freq` times mapped to
+    "other". Chunks are cleaned in parallel processes and the result is cached as
+    Parquet, so later runs and Optuna trials with the same parameters skip the work.
+
+    Args:
+        df (pd.DataFrame): raw rows with title, description and tag columns.
+        lower (bool, optional): lowercase the text. Defaults to True.
+        stem (bool, optional): Porter-stem tokens. Defaults to False.
+        min_freq (int, optional): minimum rows for a tag to be kept. Defaults to 75.
+        num_workers (int, optional): worker processes. Defaults to the CPU count.
+        chunk_size (int, optional): rows per worker task. Defaults to 50,000.
+        cache_dir (Path, optional): Parquet cache root. Defaults to config.PREPROCESSED_DIR.
+
+    Returns:
+        pd.DataFrame: preprocessed frame with text and tag columns.
+    """
+    cache_dir = Path(cache_dir or config.PREPROCESSED_DIR)
+    cache_path = Path(cache_dir, f"{preprocess_cache_key(df, lower, stem, min_freq)}.parquet")
+    if cache_path.exists():
+        return pd.read_parquet(cache_path)
+
+    text = (df["title"].fillna("") + " " + df["description"].fillna("")).to_list()
+    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    num_workers = min(num_workers or os.cpu_count() or 1, len(chunks))
+    clean = functools.partial(_clean_texts, lower=lower, stem=stem)
+    if num_workers > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            cleaned = [texts for chunk in executor.map(clean, chunks) for texts in chunk]
+    else:
+        cleaned = [texts for chunk in map(clean, chunks) for texts in chunk]
+
+    # Replace rare tags with one vectorized membership test over the tag counts
+    tags = df["tag"].reset_index(drop=True)
+    counts = tags.value_counts()
+    frequent = counts.index[counts >= min_freq]
+    result = pd.DataFrame({"text": cleaned, "tag": tags.where(tags.isin(frequent), "other")})
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    result.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, cache_path)
+    return result
+
+
+class LabelEncoder:
+    """
+    Encode tags as compact integer ids. Encoding and decoding go through NumPy
+    lookup tables, so whole columns are converted without per-item dict access.
+    """
+    def __init__(self, class_to_index=None):
+        self.class_to_index = class_to_index or {}
+        self._build()
+
+    def _build(self):
+        self.index_to_class = {index: label for label, index in self.class_to_index.items()}
+        self.classes = list(self.class_to_index)
+        self._table = np.array(self.classes, dtype=object)  # index -> class
+        order = np.argsort(np.array(self.classes, dtype=str), kind="stable")
+        self._sorted = np.array(self.classes, dtype=str)[order]  # searchsorted table for encode
+        self._sorted_index = np.fromiter(self.class_to_index.values(), dtype=np.int32, count=len(order))[order]
+
+    def __len__(self):
+        return len(self.class_to_index)
+
+    def __str__(self):
+        return f"<LabelEncoder(num_classes={len(self)})>"
+
+    def fit(self, y):
+        classes = np.unique(np.asarray(y, dtype=str))
+        self.class_to_index = {label: i for i, label in enumerate(classes.tolist())}
+        self._build()
+        return self
+
+    def encode(self, y):
+        """
+        Args:
+            y (array-like): class labels.
+
+        Returns:
+            np.ndarray: int32 class ids.
+        """
+        y = np.asarray(y, dtype=str)
+        positions = np.searchsorted(self._sorted, y).clip(max=max(len(self) - 1, 0))
+        unknown = self._sorted[positions] != y if len(self) else np.ones(len(y), dtype=bool)
+        if unknown.any():
+            raise ValueError(f"Unknown labels: {sorted(set(y[unknown].tolist()))[:5]}")
+        return self._sorted_index[positions]
+
+    def decode(self, y):
+        """
+        Args:
+            y (array-like): class ids.
+
+        Returns:
+            np.ndarray: class labels.
+        """
+        return self._table[np.asarray(y, dtype=np.intp)]
+
+    def save(self, fp):
+        with open(fp, "w") as fh:
+            json.dump({"class_to_index": self.class_to_index}, fh, indent=4, sort_keys=False)
+
+    @classmethod
+    def load(cls, fp):
+        with open(fp) as fh:
+            return cls(**json.load(fh))
+
+
+def get_split_indices(y, train_size=0.7, seed=42):
+    """
+    Stratified train/val/test split of row positions. Within each class, rows are
+    shuffled and the first `train_size` share goes to train; the rest is halved
+    between validation and test.
+
+    Args:
+        y (np.ndarray): encoded labels.
+        train_size (float, optional): share of each class used for training. Defaults to 0.7.
+        seed (int, optional): shuffle seed. Defaults to 42.
+
+    Returns:
+        tuple: (train, val, test) int64 index arrays, each sorted.
+    """
+    y = np.asarray(y)
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(len(y)), y))  # grouped by class, shuffled within it
+    y_sorted = y[order]
+    starts = np.flatnonzero(np.r_[True, y_sorted[1:] != y_sorted[:-1]])
+    sizes = np.diff(np.r_[starts, len(y)])
+    group = np.repeat(np.arange(len(starts)), sizes)
+    rank = np.arange(len(y)) - starts[group]
+    fraction = rank / sizes[group]
+    val_end = train_size + (1 - train_size) / 2
+    train = np.sort(order[fraction < train_size])
+    val = np.sort(order[(fraction >= train_size) & (fraction < val_end)])
+    test = np.sort(order[fraction >= val_end])
+    return train, val, test
+
+
+def get_data_splits(y, train_size=0.7, seed=42, cache_dir=None):
+    """
+    Stratified split indices for `y`, persisted so repeated runs and Optuna
+    trials over the same labels reuse them. Index into your own arrays, e.g.
+    `X[train]`, rather than copying data here.
+
+    Args:
+        y (np.ndarray): encoded labels.
+        train_size (float, optional): share of each class used for training. Defaults to 0.7.
+        seed (int, optional): shuffle seed. Defaults to 42.
+        cache_dir (Path, optional): split store. Defaults to config.SPLITS_DIR.
+
+    Returns:
+        tuple: (train, val, test) index arrays, memory-mapped from disk.
+    """
+    y = np.ascontiguousarray(y)
+    digest = hashlib.sha1(json.dumps({"train_size": train_size, "seed": seed}).encode("utf-8"))
+    digest.update(str(y.dtype).encode("utf-8"))
+    digest.update(y.tobytes())
+    entry = Path(cache_dir or config.SPLITS_DIR, digest.hexdigest())
+    names = ("train", "val", "test")
+    if not entry.exists():
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = entry.with_name(f".{entry.name}.{os.getpid()}.tmp")
+        tmp_dir.mkdir(exist_ok=True)
+        for name, indices in zip(names, get_split_indices(y, train_size=train_size, seed=seed)):
+            np.save(Path(tmp_dir, f"{name}.npy"), indices)
+        try:
+            os.rename(tmp_dir, entry)  # atomic; a concurrent worker may have won the race
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    return tuple(np.load(Path(entry, f"{name}.npy"), mmap_mode="r") for name in names)
+
+
 class MetricsAppBase:
-    def handle_uploaded_file(self, file):
+    def submit_uploaded_file(self, file):
+        """
+        Read an uploaded file and hand fetching and enrichment to a background job.
+
+        Returns:
+            str: The job id, or None if the file could not be used.
+        """
         if not hasattr(file, 'name') or not isinstance(file.name, str):
             st.error("Invalid file uploaded. Please try again.")
-            return pd.DataFrame()
-    
+            return None
+
         filename = file.name.lower()
         try:
             if filename.endswith(('.csv', '.xls', '.xlsx')):
                 df = DataProcessor.load_data(file)
-                processed_df = DataProcessor.process_data(df)
-                st.session_state["scopus_df"] = processed_df  # Persist processed DataFrame
-                return processed_df
+                return get_job_manager().submit("Spreadsheet upload", DataProcessor.load_publications, df)
             elif filename.endswith('.docx'):
                 dois = DataProcessor.extract_dois_from_docx(file)
                 if dois:
-                    raw_df = CrossRefManager.fetch_data_for_dois(dois, self.api_headers, self.openai_api_base)
-                    processed_df = DataProcessor.process_data(raw_df)
-                    st.session_state["scopus_df"] = processed_df  # Persist processed DataFrame
-                    return processed_df
+                    return get_job_manager().submit(
+                        "DOCX upload", CrossRefManager.load_dois, dois, self.api_headers, self.openai_api_base
+                    )
                 else:
                     st.error("No DOIs found in the uploaded DOCX file!")
             else:
                 st.error("Unsupported file type. Please upload a valid CSV, Excel, or DOCX file.")
         except Exception as e:
             st.error(f"Error processing file: {e}")
-        return pd.DataFrame()
-        
+        return None
+
+    def wait_for_job(self, job_id):
+        """
+        Block until a background job finishes, for apps without a progress fragment.
+
+        Returns:
+            pd.DataFrame: The job's publications, empty if it failed or found none.
+        """
+        jobs = get_job_manager()
+        job = jobs.get(job_id)
+        with st.spinner(f"{job.kind}..."):
+            job.future.result()
+        jobs.pop(job_id)
+        self.display_job_messages(job)
+        if job.status == FAILED:
+            st.error(f"{job.kind} failed: {job.error}")
+        return job.result if job.status == DONE and job.result is not None else pd.DataFrame()
+
+    @staticmethod
+    def display_job_messages(job):
+        """
+        Show the warnings and errors a background job reported through `notify`.
+        """
+        messages = job.snapshot()[3]
+        for level, text in messages:
+            getattr(st, level)(text)
+        if job.dropped_messages:
+            st.warning(f"{job.kind}: {job.dropped_messages} more messages not shown.")
+
 class BasicMetricsApp(MetricsAppBase):
     def __init__(self):
         self.df = pd.DataFrame()
@@ -268,12 +718,16 @@ class BasicMetricsApp(MetricsAppBase):
         # Sidebar: API & Data Input Settings
         st.sidebar.header("API & Data Input Settings")
         data_source = st.sidebar.radio("Select Data Source", ["Scopus Query", "Upload Spreadsheet"])
-        df = pd.DataFrame()
 
         if data_source == "Upload Spreadsheet":
             uploaded_file = st.sidebar.file_uploader("Upload Publications File (CSV, Excel, or DOCX)", type=["csv", "xls", "xlsx", "docx"])
-            if uploaded_file:
-                df = self.handle_uploaded_file(uploaded_file)
+            # Reruns keep the uploaded file; load it once
+            if uploaded_file and st.session_state.get("uploaded_file_id") != uploaded_file.file_id:
+                job_id = self.submit_uploaded_file(uploaded_file)
+                if job_id is not None:
+                    self.df = self.wait_for_job(job_id)
+                    st.session_state["scopus_df"] = self.df  # Persist processed DataFrame
+                    st.session_state["uploaded_file_id"] = uploaded_file.file_id
 
         elif data_source == "Scopus Query":
             st.sidebar.subheader("Enter Search Parameters")
@@ -0,0 +1,266 @@
+#Process-wide dataset registry: immutable Arrow tables shared by every session
+import hashlib
+import threading
+import time
+import weakref
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+
+from bibliometrics_1.perf import get_recorder, timed
+from bibliometrics_1.singleflight import SingleFlight
+
+ARROW_ERRORS = (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError)
+
+# Frames from `Dataset.to_pandas` share the Arrow buffers with every session.
+# Copy-on-write, the default since pandas 3, makes a caller's edits copy the
+# touched columns; turn it on for pandas 2 so the shared data stays unchanged there too.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+
+def _to_arrow(df):
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except ARROW_ERRORS:
+        # Spreadsheet columns mixing numbers and text: store the values as strings
+        df = df.copy(deep=False)
+        for column in df.columns:
+            try:
+                pa.array(df[column], from_pandas=True)
+            except ARROW_ERRORS:
+                df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def fingerprint(table):
+    """
+    Content hash of an Arrow table: its schema and column buffers.
+
+    Equal frames converted by `_to_arrow` hash equal; a differing hash only
+    costs a second copy, never a wrong result, as the key covers every byte.
+    """
+    digest = hashlib.sha1(str(table.schema).encode("utf-8"))
+    digest.update(str(table.num_rows).encode("utf-8"))
+    for column in table.columns:
+        for chunk in column.chunks:
+            for buffer in chunk.buffers():
+                if buffer is not None:
+                    digest.update(buffer)
+    return digest.hexdigest()[:16]
+
+
+class Dataset:
+    """
+    An immutable table shared by every session that loaded the same rows.
+
+    The Arrow table is the only copy of the data: `to_pandas` frames wrap its
+    buffers, and with pandas' copy-on-write (enabled by this module on pandas 2)
+    a caller that modifies its frame copies the touched columns instead of
+    changing the shared ones.
+    """
+
+    def __init__(self, table, key, registry):
+        self.table = table
+        self.key = key
+        self.created = time.time()
+        self._registry = registry
+        self._frame = None
+        self._orders = {}
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def __repr__(self):
+        return f"Dataset({self.key}, {self.table.num_rows} rows x {self.table.num_columns} columns)"
+
+    @property
+    def columns(self):
+        return self.table.column_names
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    def to_pandas(self):
+        """
+        Return a pandas frame over the shared buffers; built once, never copied.
+        """
+        with self._lock:
+            if self._frame is None:
+                # split_blocks keeps one block per column, so numeric columns are not consolidated into a copy
+                self._frame = self.table.to_pandas(split_blocks=True)
+            return self._frame.copy(deep=False)
+
+    def sort_indices(self, by, ascending=True):
+        """
+        Row order sorting the table by column `by` (nulls last); computed once per key.
+
+        Returns:
+            np.ndarray: int64 row positions.
+        """
+        with self._lock:
+            order = self._orders.get((by, ascending))
+        if order is None:
+            order = pc.sort_indices(
+                self.table, sort_keys=[(by, "ascending" if ascending else "descending", "at_end")]
+            ).to_numpy()
+            with self._lock:
+                self._orders[(by, ascending)] = order
+        return order
+
+    def view(self, columns=None, sort_by=None, ascending=True):
+        """
+        A lazy view of the table; nothing is computed until `DatasetView.to_pandas`.
+
+        Args:
+            columns (list, optional): Columns first, in this order; the rest follow. Defaults to the table's order.
+            sort_by (str, optional): Column to sort rows by. Defaults to the table's order.
+            ascending (bool, optional): Sort direction. Defaults to True.
+
+        Returns:
+            DatasetView: The view.
+        """
+        return DatasetView(self, columns, sort_by, ascending)
+
+    @timed("dataset_derive")
+    def derive(self, name, fn, cacheable=None):
+        """
+        Dataset computed from this one by `fn(frame) -> DataFrame`, once per process.
+
+        Sessions asking for the same `name` share the result, and concurrent
+        first requests share one computation. The result lives as long as this dataset.
+
+        Args:
+            name (str): Identifies `fn`; use a different name when `fn` changes.
+            fn (callable): Receives `to_pandas()` and returns a DataFrame.
+            cacheable (callable, optional): Called with the same frame after `fn`;
+                if it returns False the result is not kept and the next call derives
+                again, e.g. while `fn` saw transient API failures. Defaults to keeping it.
+
+        Returns:
+            Dataset: The derived dataset.
+        """
+        with self._lock:
+            derived = self._derived.get(name)
+        hit = derived is not None
+        if not hit:
+            derived = self._registry._flight.do(("derive", self.key, name), lambda: self._derive(name, fn, cacheable))
+        get_recorder().add(cache_hits=int(hit), cache_misses=int(not hit))
+        return derived
+
+    def _derive(self, name, fn, cacheable=None):
+        with self._lock:
+            derived = self._derived.get(name)
+        if derived is None:
+            frame = self.to_pandas()
+            derived = self._registry.put(fn(frame))
+            if cacheable is None or cacheable(frame):
+                with self._lock:
+                    self._derived[name] = derived
+        return derived
+
+
+class DatasetView:
+    """
+    Column order and row order over a `Dataset`, applied when the view is read.
+    """
+
+    def __init__(self, dataset, columns=None, sort_by=None, ascending=True):
+        self.dataset = dataset
+        self.columns = columns
+        self.sort_by = sort_by
+        self.ascending = ascending
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def to_pandas(self):
+        """
+        Materialize the view. Reordering columns shares the base buffers; a sort
+        gathers rows by the dataset's cached sort order.
+
+        Returns:
+            pd.DataFrame: The view's rows, keeping the base table's row labels.
+        """
+        frame = self.dataset.to_pandas()
+        if self.columns is not None:
+            first = [column for column in self.columns if column in frame.columns]
+            frame = frame[first + [column for column in frame.columns if column not in first]]
+        if self.sort_by is not None and self.sort_by in frame.columns:
+            frame = frame.take(self.dataset.sort_indices(self.sort_by, self.ascending))
+        return frame
+
+
+class DatasetRegistry:
+    """
+    Datasets by content fingerprint. Sessions keep `Dataset` handles; loading
+    rows that are already registered returns the existing handle, so identical
+    reports opened by many sessions are held once.
+
+    The registry references datasets weakly: a dataset is freed when no session
+    (and no dataset it was derived from) holds it any more.
+    """
+
+    def __init__(self):
+        self._datasets = weakref.WeakValueDictionary()
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+
+    @timed("dataset_put")
+    def put(self, df):
+        """
+        Register a frame's rows and return the handle to its dataset.
+
+        Args:
+            df (pd.DataFrame): Rows to share; the frame's index is not kept.
+
+        Returns:
+            Dataset: The new or already registered dataset.
+        """
+        if isinstance(df, Dataset):
+            return df
+        table = _to_arrow(df)
+        key = fingerprint(table)
+        with self._lock:
+            dataset = self._datasets.get(key)
+            hit = dataset is not None
+            if not hit:
+                dataset = Dataset(table, key, self)
+                self._datasets[key] = dataset
+        get_recorder().add(rows=len(df), bytes=table.nbytes, cache_hits=int(hit), cache_misses=int(not hit))
+        return dataset
+
+    def get(self, key):
+        """
+        Return the live dataset with fingerprint `key`, or None.
+        """
+        with self._lock:
+            return self._datasets.get(key)
+
+    def stats(self):
+        """
+        Live datasets with their size.
+
+        Returns:
+            pd.DataFrame: One row per dataset: key, rows, columns, MB and age in seconds.
+        """
+        with self._lock:
+            datasets = list(self._datasets.values())
+        now = time.time()
+        return pd.DataFrame(
+            [(d.key, len(d), len(d.columns), d.nbytes / 2**20, now - d.created) for d in datasets],
+            columns=["key", "rows", "columns", "mb", "age_seconds"],
+        )
+
+
+@st.cache_resource(show_spinner=False)
+def get_dataset_registry():
+    """
+    Return the process-wide `DatasetRegistry`, created once per server process.
+    """
+    return DatasetRegistry()
@@ -0,0 +1,269 @@
+#Publication deduplication across sources: DOI normalization, blocking and MinHash LSH
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from bibliometrics_1.perf import get_recorder, timed
+
+DOI_RE = r"(10\.\d{4,9}/\S+)"
+
+
+def normalize_doi(dois):
+    """
+    Normalize DOIs so case and prefix variants ("https://doi.org/10.1/X",
+    "doi:10.1/x", "10.1/x.") compare equal.
+
+    Args:
+        dois (array-like): DOIs or DOI URLs.
+
+    Returns:
+        pd.Series: Lower-case bare DOIs, NaN where no DOI was found.
+    """
+    s = pd.Series(dois, dtype=object)
+    s = s.where(s.notna(), "").astype(str).str.strip().str.lower()
+    return s.str.extract(DOI_RE, expand=False).str.rstrip(".,;)]")
+
+
+def normalize_title(titles):
+    """
+    Lower-case, accent-free titles with punctuation collapsed to single spaces.
+
+    Args:
+        titles (array-like): Publication titles.
+
+    Returns:
+        pd.Series: Normalized titles ("" where missing).
+    """
+    s = pd.Series(titles, dtype=object)
+    s = s.where(s.notna(), "").astype(str)
+    s = s.str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii").str.lower()
+    return s.str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip()
+
+
+def minhash_signatures(titles, num_perm=32, seed=0):
+    """
+    MinHash signatures over the word unigrams and bigrams of each title.
+
+    Shingles are factorized to integers once for the whole column, so the cost
+    is linear in the total number of words.
+
+    Args:
+        titles (pd.Series): Normalized titles (see `normalize_title`).
+        num_perm (int, optional): Signature length. Defaults to 32.
+        seed (int, optional): Seed of the hash permutations. Defaults to 0.
+
+    Returns:
+        tuple: (signatures, has_shingles); a (n, num_perm) uint32 array and a
+            bool mask of the titles that had any words. Rows without words are
+            all-ones and must not be compared.
+    """
+    n = len(titles)
+    words = titles.reset_index(drop=True).str.split().explode()
+    words = words[words.notna() & (words != "")]
+    rows = words.index.to_numpy(dtype=np.int64)
+    tokens, vocabulary = pd.factorize(words.to_numpy())
+    tokens = tokens.astype(np.uint64)
+    vocab_size = np.uint64(max(len(vocabulary), 1))
+    same_row = rows[1:] == rows[:-1]
+    bigrams = vocab_size + tokens[:-1][same_row] * vocab_size + tokens[1:][same_row]
+    shingles = np.concatenate([tokens, bigrams])
+    shingle_rows = np.concatenate([rows, rows[:-1][same_row]])
+    order = np.argsort(shingle_rows, kind="stable")
+    shingles, shingle_rows = shingles[order], shingle_rows[order]
+
+    signatures = np.full((n, num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    has_shingles = np.zeros(n, dtype=bool)
+    if shingles.size == 0:
+        return signatures, has_shingles
+    starts = np.flatnonzero(np.r_[True, shingle_rows[1:] != shingle_rows[:-1]])
+    present = shingle_rows[starts]
+    has_shingles[present] = True
+    # Multiply-shift hashing: the high 32 bits of (a * x + b) mod 2**64, with odd a
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+    b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True)
+    for k in range(num_perm):
+        hashed = ((a[k] * shingles + b[k]) >> np.uint64(32)).astype(np.uint32)
+        signatures[present, k] = np.minimum.reduceat(hashed, starts)
+    return signatures, has_shingles
+
+
+def _hash_columns(columns):
+    # FNV-style mix of integer columns into one uint64 key per row
+    h = np.full(len(columns[0]), 1469598103934665603, dtype=np.uint64)
+    for column in columns:
+        h ^= np.asarray(column).astype(np.uint64)
+        h *= np.uint64(1099511628211)
+    return h
+
+
+def _neighbour_pairs(keys, tiebreak, window):
+    # Rows sharing a key, linked to their next `window` neighbours in sorted order:
+    # O(n) pairs however large a block gets, instead of all pairs within it.
+    order = np.lexsort((tiebreak, keys))
+    sorted_keys = keys[order]
+    left, right = [], []
+    for offset in range(1, window + 1):
+        same = sorted_keys[offset:] == sorted_keys[:-offset]
+        left.append(order[:-offset][same])
+        right.append(order[offset:][same])
+    return np.concatenate(left), np.concatenate(right)
+
+
+def _split_conflicts(labels, doi_codes, left, right, strength, conflicted):
+    # Union-find over the links of the conflicted clusters, strongest first, that
+    # never joins two sets carrying different DOIs. Rows sharing a DOI link first.
+    inside = np.isin(labels[left], conflicted)
+    order = np.argsort(-strength[inside], kind="stable")
+    parent, doi = {}, {}
+
+    def find(i):
+        root = i
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while i != root:  # path compression
+            parent[i], i = root, parent[i]
+        return root
+
+    for i, j in zip(left[inside][order].tolist(), right[inside][order].tolist()):
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j:
+            continue
+        doi_i, doi_j = doi.get(root_i, doi_codes[root_i]), doi.get(root_j, doi_codes[root_j])
+        if doi_i >= 0 and doi_j >= 0 and doi_i != doi_j:
+            continue
+        parent[root_j] = root_i
+        doi[root_i] = max(doi_i, doi_j)
+
+    rows = np.flatnonzero(np.isin(labels, conflicted))
+    labels = labels.copy()
+    labels[rows] = len(labels) + np.array([find(i) for i in rows.tolist()], dtype=labels.dtype)
+    return pd.factorize(labels)[0]
+
+
+@timed("find_duplicates")
+def find_duplicates(df, doi_column="doi", title_column="title", year_column="Year", threshold=0.8,
+                    num_perm=32, bands=8, prefix_length=24, window=2, seed=0):
+    """
+    Cluster rows that describe the same publication.
+
+    1. Rows with the same normalized DOI are duplicates.
+    2. Candidate pairs come from blocks of the same publication year that share
+       a normalized title prefix or one LSH band of the title's MinHash signature.
+       Within a block each row is compared with its `window` nearest neighbours
+       in sorted order, so the number of comparisons grows linearly with rows.
+    3. Candidates whose estimated title Jaccard similarity reaches `threshold`
+       are duplicates, unless both rows carry different DOIs.
+    4. Clusters are the connected duplicate pairs. A cluster that still holds
+       different DOIs, linked through near-duplicates without one, is split:
+       its pairs are joined most similar first, never across two DOIs.
+
+    Args:
+        df (pd.DataFrame): Publications; missing columns disable the matching stage that needs them.
+        threshold (float, optional): Minimum estimated Jaccard similarity. Defaults to 0.8.
+        num_perm (int, optional): MinHash signature length. Defaults to 32.
+        bands (int, optional): LSH bands; num_perm must be a multiple. Defaults to 8.
+        prefix_length (int, optional): Characters of the normalized title used for blocking. Defaults to 24.
+        window (int, optional): Sorted neighbours compared within a block. Defaults to 2.
+        seed (int, optional): MinHash seed. Defaults to 0.
+
+    Returns:
+        np.ndarray: Cluster label per row; duplicates share a label.
+    """
+    n = len(df)
+    get_recorder().add(rows=n)
+    if n < 2:
+        return np.arange(n)
+    left, right = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    strength = [np.empty(0)]  # title similarity of each pair; 2 for a shared DOI
+
+    if doi_column in df.columns:
+        doi_codes = pd.factorize(normalize_doi(df[doi_column].to_numpy()))[0].astype(np.int64)
+        has_doi = doi_codes >= 0
+        rows = np.flatnonzero(has_doi)
+        pair_left, pair_right = _neighbour_pairs(doi_codes[rows], rows, 1)
+        left.append(rows[pair_left])
+        right.append(rows[pair_right])
+        strength.append(np.full(pair_left.size, 2.0))
+    else:
+        doi_codes = np.full(n, -1, dtype=np.int64)
+
+    if title_column in df.columns:
+        titles = normalize_title(df[title_column].to_numpy())
+        signatures, has_title = minhash_signatures(titles, num_perm=num_perm, seed=seed)
+        if year_column in df.columns:
+            years = pd.to_numeric(pd.Series(df[year_column].to_numpy(), dtype=object), errors="coerce")
+            years = years.fillna(-1).to_numpy(dtype=np.int64)
+        else:
+            years = np.full(n, -1, dtype=np.int64)
+        rows = np.flatnonzero(has_title)
+        prefixes = pd.factorize(titles.str[:prefix_length].to_numpy()[rows])[0]
+        band_size = num_perm // bands
+        band_keys = [
+            _hash_columns([np.full(rows.size, band), years[rows]] + [signatures[rows, c] for c in range(band * band_size, (band + 1) * band_size)])
+            for band in range(bands)
+        ]
+        blocks = [_hash_columns([years[rows], prefixes])] + band_keys
+        for i, keys in enumerate(blocks):
+            # Order each block by another band, so near-duplicates end up adjacent
+            pair_left, pair_right = _neighbour_pairs(keys, band_keys[i % bands], window)
+            pair_left, pair_right = rows[pair_left], rows[pair_right]
+            similarity = (signatures[pair_left] == signatures[pair_right]).mean(axis=1)
+            compatible = (doi_codes[pair_left] < 0) | (doi_codes[pair_right] < 0) | (doi_codes[pair_left] == doi_codes[pair_right])
+            keep = (similarity >= threshold) & compatible
+            left.append(pair_left[keep])
+            right.append(pair_right[keep])
+            strength.append(similarity[keep])
+
+    left, right = np.concatenate(left), np.concatenate(right)
+    graph = sparse.coo_matrix((np.ones(left.size, dtype=np.int8), (left, right)), shape=(n, n))
+    labels = connected_components(graph, directed=False)[1]
+
+    # A row without a DOI can bridge rows with different DOIs (A: x ~ B ~ C: y)
+    with_doi = doi_codes >= 0
+    dois = pd.DataFrame({"label": labels[with_doi], "doi": doi_codes[with_doi]}).drop_duplicates()
+    conflicted = dois["label"][dois["label"].duplicated()].unique()
+    if conflicted.size:
+        labels = _split_conflicts(labels, doi_codes, left, right, np.concatenate(strength), conflicted)
+    return labels
+
+
+@timed("deduplicate")
+def deduplicate(df, **kwargs):
+    """
+    Collapse duplicate publications to one row each (see `find_duplicates`).
+
+    The first row of each cluster is kept, in the original order; its missing
+    fields are filled from the other rows of the cluster.
+
+    Args:
+        df (pd.DataFrame): Publications, e.g. several sources concatenated.
+        **kwargs: Passed to `find_duplicates`.
+
+    Returns:
+        pd.DataFrame: Deduplicated publications.
+    """
+    labels = find_duplicates(df, **kwargs)
+    positions = np.arange(len(df))
+    first = pd.Series(positions).groupby(labels).transform("min").to_numpy()
+    keep = first == positions
+    duplicated = np.bincount(labels, minlength=labels.max() + 1 if len(labels) else 0)[labels] > 1
+    get_recorder().add(rows=int((~keep).sum()))
+    if keep.all():
+        return df
+    result = df[keep].copy()
+    merge = keep & duplicated
+    if merge.any():
+        frame = df.reset_index(drop=True)
+        # First non-null value of every column per cluster
+        filled = frame[duplicated].groupby(labels[duplicated], sort=False).first().loc[labels[merge]]
+        targets = np.flatnonzero(merge[keep])
+        for j, column in enumerate(result.columns):
+            missing = result.iloc[targets, j].isna().to_numpy()
+            if missing.any() and column in filled.columns:
+                values = filled[column].to_numpy()[missing]
+                present = pd.notna(values)
+                if present.any():
+                    result.iloc[targets[missing][present], j] = values[present]
+    return result
@@ -3,8 +3,42 @@ from typing import Dict, List
 
 import numpy as np
 import pandas as pd
+from numpy.lib.recfunctions import structured_to_unstructured
 from sklearn.metrics import precision_recall_fscore_support
 
+# Columns of a prediction frame that get one slice per value (see get_slices)
+SLICE_COLUMNS = ("journal_name", "Year", "department")
+SHORT_TEXT_WORDS = 8
+
+def slice_confusion_counts(
+    y_true: np.ndarray, y_pred: np.ndarray, membership: np.ndarray, num_classes: int, chunk_size: int = 100_000
+) -> np.ndarray:
+    """Confusion counts for every slice in one pass.
+
+    Each (sample, slice) membership contributes one count at flat position
+    slice * K^2 + true * K + pred, so a single bincount yields all slices'
+    confusion matrices. Rows are processed in chunks to bound memory.
+
+    Args:
+        y_true (np.ndarray): true labels encoded as 0..K-1.
+        y_pred (np.ndarray): predicted labels encoded as 0..K-1.
+        membership (np.ndarray): boolean (num_samples, num_slices) matrix.
+        num_classes (int): K.
+        chunk_size (int, optional): rows per chunk. Defaults to 100_000.
+
+    Returns:
+        np.ndarray: (num_slices, K, K) counts, indexed [slice, true, pred].
+    """
+    num_slices = membership.shape[1]
+    cells = num_classes * num_classes
+    pair = y_true.astype(np.int64) * num_classes + y_pred
+    counts = np.zeros(num_slices * cells, dtype=np.int64)
+    for start in range(0, membership.shape[0], chunk_size):
+        rows, cols = np.nonzero(membership[start : start + chunk_size])
+        counts += np.bincount(cols * cells + pair[start + rows], minlength=num_slices * cells)
+    return counts.reshape(num_slices, num_classes, num_classes)
+
+
 def get_slice_metrics(y_true: np.ndarray, y_pred: np.ndarray, slices: np.recarray) -> Dict:
     """Generate metrics for slices of data.
 
@@ -16,22 +50,65 @@ def get_slice_metrics(y_true: np.ndarray, y_pred: np.ndarray, slices: np.recarra
     Returns:
         Dict: slice metrics.
     """
+    y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+    # Labels as 0..K-1 codes so they can address the confusion tensor
+    classes, codes = np.unique(np.concatenate([y_true, y_pred]), return_inverse=True)
+    codes = codes.reshape(-1)
+    y_true, y_pred = codes[: len(y_true)], codes[len(y_true) :]
+    membership = structured_to_unstructured(np.asarray(slices), dtype=bool)  # view when fields are 1-byte
+    counts = slice_confusion_counts(y_true, y_pred, membership, num_classes=len(classes))
+
+    # Micro-averaged over classes, as precision_recall_fscore_support(average="micro")
+    num_samples = counts.sum(axis=(1, 2))
+    tp = np.trace(counts, axis1=1, axis2=2)
+    fp = counts.sum(axis=1).sum(axis=1) - tp  # predicted totals minus hits
+    fn = counts.sum(axis=2).sum(axis=1) - tp  # true totals minus hits
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.nan_to_num(tp / (tp + fp))
+        recall = np.nan_to_num(tp / (tp + fn))
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+
     metrics = {}
-    for slice_name in slices.dtype.names:
-        mask = slices[slice_name].astype(bool)
-        if sum(mask):
-            slice_metrics = precision_recall_fscore_support(
-                y_true[mask], y_pred[mask], average="micro"
-            )
+    for i, slice_name in enumerate(slices.dtype.names):
+        if num_samples[i]:
             metrics[slice_name] = {}
-            metrics[slice_name]["precision"] = slice_metrics[0]
-            metrics[slice_name]["recall"] = slice_metrics[1]
-            metrics[slice_name]["f1"] = slice_metrics[2]
-            metrics[slice_name]["num_samples"] = len(y_true[mask])
+            metrics[slice_name]["precision"] = precision[i]
+            metrics[slice_name]["recall"] = recall[i]
+            metrics[slice_name]["f1"] = f1[i]
+            metrics[slice_name]["num_samples"] = int(num_samples[i])
 
     return metrics
 
 
+def get_slices(df: pd.DataFrame, columns: List = SLICE_COLUMNS, max_values: int = 100) -> np.recarray:
+    """Boolean slices over a prediction frame.
+
+    Args:
+        df (pd.DataFrame): frame aligned with the predictions.
+        columns (List, optional): categorical columns to slice by (one slice per
+            value, most frequent first). Defaults to SLICE_COLUMNS.
+        max_values (int, optional): maximum slices per column. Defaults to 100.
+
+    Returns:
+        np.recarray: one boolean field per slice.
+    """
+    fields, names = [], []
+    if "text" in df.columns:
+        fields.append(df["text"].str.split().str.len().fillna(0).to_numpy() < SHORT_TEXT_WORDS)
+        names.append("short_text")
+    for column in columns:
+        if column not in df.columns:
+            continue
+        codes, uniques = pd.factorize(df[column])
+        order = np.argsort(-np.bincount(codes[codes >= 0], minlength=len(uniques)), kind="stable")[:max_values]
+        membership = codes[:, None] == order[None, :]  # one vectorized comparison per column
+        fields.extend(membership.T)
+        names.extend(f"{column}={uniques[code]}" for code in order)
+    if not fields:
+        fields, names = [np.ones(len(df), dtype=bool)], ["all"]
+    return np.rec.fromarrays(fields, names=names)
+
+
 def get_metrics(
     y_true: np.ndarray, y_pred: np.ndarray, classes: List, df: pd.DataFrame = None
 ) -> Dict:
@@ -64,4 +141,10 @@ def get_metrics(
             "recall": class_metrics[1][i],
             "f1": class_metrics[2][i],
             "num_samples": np.float64(class_metrics[3][i]),
-        }
\ No newline at end of file
+        }
+
+    # Slice metrics
+    if df is not None:
+        metrics["slices"] = get_slice_metrics(y_true=y_true, y_pred=y_pred, slices=get_slices(df))
+
+    return metrics
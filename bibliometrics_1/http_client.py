@@ -0,0 +1,226 @@
+#Shared HTTP client for every outbound call (CrossRef, OpenAI, availability checks)
+# Synchronous on purpose: calls come from Streamlit script threads and JobManager
+# pool threads, none of which run an event loop, so the pool, limits and retries
+# are shared between threads rather than coroutines.
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import httpx
+
+from bibliometrics_1.perf import get_recorder
+
+try:  # HTTP/2 needs the optional `h2` package
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024  # 5 MB
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Methods safe to send twice. Other methods (POST) are only retried where the server
+# cannot have acted on them: a 429, or a connection that was never established.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"}
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Per-host limits: requests per second, burst size and concurrent connections.
+# Hosts not listed here fall back to the "default" entry.
+HOST_LIMITS = {
+    "api.crossref.org": {"rate": 10.0, "burst": 10, "concurrency": 5},
+    "api.openai.com": {"rate": 5.0, "burst": 5, "concurrency": 4},
+    "default": {"rate": 5.0, "burst": 5, "concurrency": 4},
+}
+
+
+class ResponseTooLarge(httpx.HTTPError):
+    """Raised when a response body exceeds the configured size limit."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket. `acquire` blocks until a token is available."""
+
+    def __init__(self, rate, burst):
+        if burst < 1:
+            raise ValueError(f"Token bucket burst must be at least 1, got {burst}.")
+        self.rate = self._check_rate(rate)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _check_rate(rate):
+        if not rate > 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}.")
+        return float(rate)
+
+    def set_rate(self, rate):
+        rate = self._check_rate(rate)
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1.0):
+        if tokens > self.capacity:  # the bucket never holds that many
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of {self.capacity:g}.")
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HttpClient:
+    """
+    Pooled HTTP client with per-host rate limits, concurrency caps, timeouts,
+    retries with jittered exponential backoff and response-size limits.
+    5xx responses are retried for idempotent methods only (see `request`).
+    One instance is shared by the whole process (see `get_http_client`).
+    """
+
+    def __init__(self, host_limits=None, timeout=DEFAULT_TIMEOUT, max_bytes=DEFAULT_MAX_BYTES,
+                 max_retries=3, backoff_base=0.5, backoff_cap=8.0, http2=HTTP2_AVAILABLE):
+        self.host_limits = dict(HOST_LIMITS, **(host_limits or {}))
+        self.max_bytes = max_bytes
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        max_connections = sum(limits["concurrency"] for limits in self.host_limits.values())
+        self.client = httpx.Client(
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            follow_redirects=True,
+        )
+        self._buckets = {}
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _host_controls(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                limits = self.host_limits.get(host, self.host_limits["default"])
+                self._buckets[host] = TokenBucket(limits["rate"], limits["burst"])
+                self._semaphores[host] = threading.BoundedSemaphore(limits["concurrency"])
+            return self._buckets[host], self._semaphores[host]
+
+    def _backoff(self, attempt, retry_after=None):
+        """
+        Full-jitter exponential backoff, never shorter than a server-provided Retry-After.
+        """
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        time.sleep(delay)
+
+    @staticmethod
+    def _retry_after(response):
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+
+    def _read_limited(self, response, max_bytes):
+        """
+        Read a streamed response into memory, aborting once `max_bytes` is exceeded.
+        """
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise ResponseTooLarge(f"Response from {response.url} declares {declared} bytes (limit {max_bytes}).")
+        body = bytearray()
+        for chunk in response.iter_bytes():
+            body.extend(chunk)
+            if len(body) > max_bytes:
+                raise ResponseTooLarge(f"Response from {response.url} exceeded {max_bytes} bytes.")
+        # The body is already decoded, so drop the transfer headers that describe the raw stream
+        headers = [
+            (key, value) for key, value in response.headers.multi_items()
+            if key.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        ]
+        return httpx.Response(
+            response.status_code,
+            headers=headers,
+            content=bytes(body),
+            request=response.request,
+            extensions=response.extensions,
+        )
+
+    def request(self, method, url, max_bytes=None, retry=None, **kwargs):
+        """
+        Send a request through the shared pool.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Absolute URL.
+            max_bytes (int, optional): Override of the response-size limit.
+            retry (bool, optional): Retry 5xx responses and transport errors. Defaults
+                to True for idempotent methods; 429s and failed connects are always retried.
+            **kwargs: Passed through to `httpx.Client.stream` (headers, json, params, timeout...).
+
+        Returns:
+            httpx.Response: The fully read response. Non-retryable HTTP errors are returned, not raised.
+
+        Raises:
+            httpx.HTTPError: On transport failures once retries are exhausted, or oversize bodies.
+        """
+        max_bytes = max_bytes or self.max_bytes
+        retry = method.upper() in IDEMPOTENT_METHODS if retry is None else retry
+        bucket, semaphore = self._host_controls(urlsplit(url).hostname)
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            try:
+                with semaphore:
+                    with self.client.stream(method, url, **kwargs) as response:
+                        result = self._read_limited(response, max_bytes)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries or not (retry or isinstance(e, UNSENT_ERRORS)):
+                    raise
+                self._backoff(attempt)
+                continue
+            # Attributed to whichever pipeline stage is making the request
+            get_recorder().add(bytes=len(result.content))
+            retryable = result.status_code == 429 or (retry and result.status_code in RETRY_STATUS_CODES)
+            if retryable and attempt < self.max_retries:
+                self._backoff(attempt, self._retry_after(result))
+                continue
+            return result
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.client.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    Return the process-wide `HttpClient`, creating it on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,307 @@
+#Author-level indicators: h-index, citations, SNIP and collaboration counts per author
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+from scipy import sparse
+
+from bibliometrics_1.perf import get_recorder, timed
+from bibliometrics_1.singleflight import SingleFlight
+from bibliometrics_1.utils import NetworkBuilder
+
+INDICATOR_COLUMNS = [
+    "author", "papers", "citations", "h_index", "mean_snip", "coauthors", "collaborations", "first_year", "last_year"
+]
+# Columns a paper's key is computed from; a paper whose values change counts as removed and re-added
+KEY_COLUMNS = ("author_names", "citedby_count", "SNIP", "Year")
+
+
+def paper_keys(df):
+    """
+    Content key per row, unique even for identical rows (their occurrence is part of the key).
+
+    Returns:
+        np.ndarray: uint64 keys.
+    """
+    columns = [column for column in KEY_COLUMNS if column in df.columns]
+    if not columns:
+        return np.arange(len(df), dtype=np.uint64)
+    keys = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    occurrence = pd.Series(keys).groupby(keys, sort=False).cumcount().to_numpy(dtype=np.uint64)
+    return keys ^ (occurrence * np.uint64(0x9E3779B97F4A7C15))
+
+
+def split_authors(author_names, names=None):
+    """
+    Explode ";"-separated author lists into integer (paper, author) pairs.
+
+    Names are normalized with `NetworkBuilder.normalize_name`, once per distinct
+    spelling, so "Smith, Jane" and "Jane Smith" are one author as in the coauthor network.
+
+    Args:
+        author_names (array-like): One author list per paper.
+        names (pd.Index, optional): Known authors; their codes are kept and new names appended.
+
+    Returns:
+        tuple: (paper, author, names); int64 pair arrays, one pair per author of a
+            paper, and the pd.Index of author names the codes refer to.
+    """
+    names = pd.Index([], dtype=object) if names is None else names
+    values = [value if isinstance(value, str) else None for value in author_names]
+    lists = pc.split_pattern(pa.array(values, type=pa.large_string()), ";")
+    tokens = pc.utf8_trim_whitespace(pc.list_flatten(lists))
+    keep = pc.fill_null(pc.not_equal(tokens, ""), False)
+    papers = pc.list_parent_indices(lists).filter(keep).to_numpy().astype(np.int64)
+    tokens = tokens.filter(keep).dictionary_encode()
+    if len(tokens) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), names
+    normalized = pd.Index([NetworkBuilder.normalize_name(name) for name in tokens.dictionary.to_pylist()], dtype=object)
+    new_names = normalized[names.get_indexer(normalized) < 0].unique()
+    if len(new_names):
+        names = names.append(new_names)
+    authors = names.get_indexer(normalized)[tokens.indices.to_numpy()].astype(np.int64)
+    # A name listed twice on one paper counts once
+    first = ~pd.Series(papers * len(names) + authors).duplicated().to_numpy()
+    return papers[first], authors[first], names
+
+
+class AuthorIndicators:
+    """
+    Indicators for every author of a set of papers, over all years or a year window.
+
+    `author_names` is exploded once into an author x paper index; indicators are
+    sorted NumPy group operations over it:
+
+        - papers, citations (sum of `citedby_count`) and h-index
+        - mean_snip over the author's papers with a SNIP value
+        - coauthors (distinct) and collaborations (coauthor slots summed over papers)
+        - first_year and last_year
+
+    Engines are immutable once built; `updated` returns a new engine for a
+    larger set of papers, re-indexing only the added papers.
+    """
+
+    def __init__(self, df=None):
+        self.names = pd.Index([], dtype=object)
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.citations = np.empty(0, dtype=np.float64)
+        self.snip = np.empty(0, dtype=np.float64)
+        self.year = np.empty(0, dtype=np.float64)
+        self.pair_paper = np.empty(0, dtype=np.int64)
+        self.pair_author = np.empty(0, dtype=np.int64)
+        self._totals = self._empty()
+        self._windows = {}
+        self._lock = threading.Lock()
+        if df is not None and len(df):
+            self._append(df, paper_keys(df))
+            self._totals = self._compute()
+
+    def __len__(self):
+        return len(self.keys)
+
+    @staticmethod
+    def _empty():
+        return pd.DataFrame(columns=INDICATOR_COLUMNS[1:], index=pd.Index([], dtype=np.int64))
+
+    def _append(self, df, keys):
+        get_recorder().add(rows=len(df))
+        offset = len(self.keys)
+        paper, author, self.names = split_authors(df["author_names"] if "author_names" in df.columns else [], self.names)
+        column = lambda name: (pd.to_numeric(pd.Series(np.asarray(df[name], dtype=object)), errors="coerce")
+                               .to_numpy(dtype=np.float64) if name in df.columns else np.full(len(df), np.nan))
+        self.keys = np.concatenate([self.keys, keys])
+        self.citations = np.concatenate([self.citations, np.nan_to_num(column("citedby_count"), nan=0.0)])
+        self.snip = np.concatenate([self.snip, column("SNIP")])
+        self.year = np.concatenate([self.year, column("Year")])
+        self.pair_paper = np.concatenate([self.pair_paper, paper + offset])
+        self.pair_author = np.concatenate([self.pair_author, author])
+        return author
+
+    def _compute(self, pair_mask=None, authors=None):
+        # Indicators per author code over the pairs selected by pair_mask, for `authors` only (default: all)
+        paper, author = self.pair_paper, self.pair_author
+        if pair_mask is not None:
+            paper, author = paper[pair_mask], author[pair_mask]
+        team = np.bincount(paper, minlength=len(self.keys))  # authors per paper
+        matrix_paper, matrix_author = paper, author
+        if authors is not None:
+            selected = np.isin(author, authors)
+            paper, author = paper[selected], author[selected]
+            # Their coauthors can only come from their own papers
+            on_paper = np.zeros(len(self.keys), dtype=bool)
+            on_paper[paper] = True
+            shared_pairs = on_paper[matrix_paper]
+            matrix_paper, matrix_author = matrix_paper[shared_pairs], matrix_author[shared_pairs]
+        if author.size == 0:
+            return self._empty()
+
+        # Sort by author, then by citations descending: the rank within each run gives the h-index
+        citations = self.citations[paper]
+        order = np.lexsort((-citations, author))
+        paper, author, citations = paper[order], author[order], citations[order]
+        starts = np.flatnonzero(np.r_[True, author[1:] != author[:-1]])
+        counts = np.diff(np.r_[starts, author.size])
+        rank = np.arange(author.size) - np.repeat(starts, counts) + 1
+        snip = self.snip[paper]
+        has_snip = ~np.isnan(snip)
+        snip_count = np.add.reduceat(has_snip.astype(np.int64), starts)
+        snip_sum = np.add.reduceat(np.where(has_snip, snip, 0.0), starts)
+        year = self.year[paper]
+
+        # Distinct coauthors: nonzeros per row of A @ A.T, A the author x paper incidence matrix
+        present = author[starts]
+        incidence = sparse.csr_matrix(
+            (np.ones(matrix_paper.size, dtype=np.int32), (matrix_author, matrix_paper)),
+            shape=(len(self.names), len(self.keys)),
+        )
+        shared = incidence[present] @ incidence.T
+        return pd.DataFrame({
+            "papers": counts,
+            "citations": np.add.reduceat(citations, starts).astype(np.int64),
+            "h_index": np.add.reduceat((citations >= rank).astype(np.int64), starts),
+            "mean_snip": np.divide(snip_sum, snip_count, out=np.full(starts.size, np.nan), where=snip_count > 0),
+            "coauthors": np.diff(shared.indptr) - 1,
+            "collaborations": np.add.reduceat(team[paper] - 1, starts),
+            "first_year": np.fmin.reduceat(year, starts),
+            "last_year": np.fmax.reduceat(year, starts),
+        }, index=pd.Index(present, dtype=np.int64))
+
+    @timed("author_indicators_update")
+    def updated(self, df):
+        """
+        Engine for `df`, re-indexing only the papers this engine has not seen.
+
+        Only the authors of added papers are recomputed; their coauthors on those
+        papers are among them. If papers were removed or changed, the engine is rebuilt.
+
+        Args:
+            df (pd.DataFrame): The new set of papers, in any row order.
+
+        Returns:
+            AuthorIndicators: The engine for `df` (self if nothing was added).
+        """
+        keys = paper_keys(df)
+        if not np.isin(self.keys, keys).all():
+            return AuthorIndicators(df)
+        added = ~np.isin(keys, self.keys)
+        if not added.any():
+            return self
+        engine = AuthorIndicators()
+        engine.names, engine.keys = self.names, self.keys
+        engine.citations, engine.snip, engine.year = self.citations, self.snip, self.year
+        engine.pair_paper, engine.pair_author = self.pair_paper, self.pair_author
+        affected = np.unique(engine._append(df[added], keys[added]))
+        totals = self._totals.drop(index=affected, errors="ignore")
+        engine._totals = pd.concat([totals, engine._compute(authors=affected)]).sort_index()
+        return engine
+
+    def indicators(self, start=None, end=None, min_papers=1):
+        """
+        Indicators of every author with at least `min_papers` papers from `start` to `end`.
+
+        All-years indicators are kept up to date by `updated`; each year window is
+        computed once per engine.
+
+        Args:
+            start (int, optional): First publication year (inclusive). Defaults to the earliest.
+            end (int, optional): Last publication year (inclusive). Defaults to the latest.
+            min_papers (int, optional): Defaults to 1.
+
+        Returns:
+            pd.DataFrame: One row per author, highest h-index (then citations, papers) first.
+        """
+        if start is None and end is None:
+            table = self._totals
+        else:
+            with self._lock:
+                table = self._windows.get((start, end))
+            if table is None:
+                year = self.year[self.pair_paper]
+                in_window = np.ones(year.size, dtype=bool)
+                if start is not None:
+                    in_window &= year >= start
+                if end is not None:
+                    in_window &= year <= end
+                table = self._compute(pair_mask=in_window)
+                with self._lock:
+                    self._windows[(start, end)] = table
+        table = table[table["papers"] >= min_papers]
+        result = table.assign(author=self.names[table.index.to_numpy()]).reset_index(drop=True)[INDICATOR_COLUMNS]
+        return result.sort_values(
+            ["h_index", "citations", "papers", "author"], ascending=[False, False, False, True], ignore_index=True
+        )
+
+    def sliding(self, width, min_papers=1):
+        """
+        Indicators over sliding windows of `width` years, one window ending in each year.
+
+        Returns:
+            pd.DataFrame: `indicators` of each window with its `window_start` and `window_end`.
+        """
+        years = self.year[~np.isnan(self.year)]
+        if years.size == 0:
+            return pd.DataFrame(columns=["window_start", "window_end"] + INDICATOR_COLUMNS)
+        frames = []
+        for end in range(int(years.min()), int(years.max()) + 1):
+            frame = self.indicators(start=end - width + 1, end=end, min_papers=min_papers)
+            frames.append(frame.assign(window_start=end - width + 1, window_end=end))
+        return pd.concat(frames, ignore_index=True)[["window_start", "window_end"] + INDICATOR_COLUMNS]
+
+
+class IndicatorsCache:
+    """
+    `AuthorIndicators` engines by dataset fingerprint (see `datasets.Dataset.key`),
+    least recently used first out.
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._engines = OrderedDict()
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+
+    @timed("author_indicators")
+    def get(self, dataset, previous=None):
+        """
+        The engine for `dataset`, built once per fingerprint.
+
+        Args:
+            dataset (Dataset): Publications with `author_names`, `citedby_count`, `SNIP` and `Year`.
+            previous (str, optional): Key of a dataset `dataset` extends, e.g. the
+                publications before an upload was added; its engine is updated
+                incrementally instead of rebuilding.
+
+        Returns:
+            AuthorIndicators: The engine.
+        """
+        with self._lock:
+            engine = self._engines.get(dataset.key)
+            if engine is not None:
+                self._engines.move_to_end(dataset.key)
+            base = self._engines.get(previous) if previous is not None else None
+        get_recorder().add(cache_hits=int(engine is not None), cache_misses=int(engine is None))
+        if engine is not None:
+            return engine
+
+        def build():
+            df = dataset.to_pandas()
+            return base.updated(df) if base is not None else AuthorIndicators(df)
+
+        engine = self._flight.do(("author_indicators", dataset.key), build)
+        with self._lock:
+            self._engines[dataset.key] = engine
+            while len(self._engines) > self.max_entries:
+                self._engines.popitem(last=False)
+        return engine
+
+
+@st.cache_resource(show_spinner=False)
+def get_indicators_cache():
+    """
+    Return the process-wide `IndicatorsCache`, created once per server process.
+    """
+    return IndicatorsCache()
@@ -0,0 +1,219 @@
+#Background jobs: long fetches and enrichment run off the Streamlit script thread
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+MAX_MESSAGES = 50  # per job; a long DOI list can warn once per DOI
+
+# The job running on the current worker thread, for `notify`
+_current = threading.local()
+
+
+class JobCancelled(Exception):
+    """Raised by a job function that found its job cancelled."""
+
+
+def check_cancelled(cancelled):
+    """
+    Raise `JobCancelled` if the optional `cancelled` callback says so.
+    """
+    if cancelled is not None and cancelled():
+        raise JobCancelled()
+
+
+def scaled_progress(progress, start, end):
+    """
+    Map a step's own 0..1 progress onto [start, end] of the job's progress.
+
+    Args:
+        progress (callable): The job's progress callback, or None.
+        start (float): Job progress when the step begins.
+        end (float): Job progress when the step ends.
+
+    Returns:
+        callable: A progress callback for the step, or None.
+    """
+    if progress is None:
+        return None
+    return lambda fraction, message=None: progress(start + (end - start) * fraction, message)
+
+
+def notify(level, text):
+    """
+    Show a warning or error to the user. Job threads have no Streamlit script
+    context, so inside a job the message is kept on the job and shown by the
+    session that polls it; on the script thread it is shown directly.
+
+    Args:
+        level (str): "info", "warning" or "error".
+        text (str): The message.
+    """
+    job = getattr(_current, "job", None)
+    if job is None:
+        getattr(st, level)(text)
+    else:
+        job.notify(level, text)
+
+
+class Job:
+    """
+    One submitted unit of work. The job function reports through `progress` and
+    `notify` and polls `cancelled` between steps; everything else is read by the
+    script thread. Fields written by both threads change under the job's lock.
+    """
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.progress_fraction = 0.0
+        self.message = ""
+        self.messages = []  # (level, text) for the user, oldest first
+        self.dropped_messages = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def progress(self, fraction, message=None):
+        """
+        Report progress (0..1) and optionally what the job is doing.
+        """
+        with self._lock:
+            self.progress_fraction = min(max(float(fraction), 0.0), 1.0)
+            if message is not None:
+                self.message = message
+
+    def notify(self, level, text):
+        """
+        Keep a message for the user; beyond `MAX_MESSAGES` only a count is kept.
+        """
+        with self._lock:
+            if len(self.messages) < MAX_MESSAGES:
+                self.messages.append((level, text))
+            else:
+                self.dropped_messages += 1
+
+    def snapshot(self):
+        """
+        Return a consistent (status, progress_fraction, message, messages) tuple.
+        """
+        with self._lock:
+            return self.status, self.progress_fraction, self.message, list(self.messages)
+
+    def _finish(self, status, result=None, error=None):
+        with self._lock:
+            if status == DONE:
+                self.progress_fraction = 1.0
+            self.result = result
+            self.error = error
+            self.finished = time.time()
+            self.status = status
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def done(self):
+        return self.status in FINISHED
+
+
+class JobManager:
+    """
+    Thread pool shared by every session in the process. Threads (not processes)
+    so jobs share the SNIP cache, rate limiters and HTTP client with the app.
+    """
+
+    def __init__(self, max_workers=4, keep_seconds=3600):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bibliometrics-job")
+        self.keep_seconds = keep_seconds
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """
+        Run `fn(*args, progress=..., cancelled=..., **kwargs)` in the background.
+
+        Args:
+            kind (str): Label shown with the job's progress, e.g. "Scopus query".
+            fn (callable): Job function; must accept `progress` and `cancelled` keywords.
+
+        Returns:
+            str: The job id.
+        """
+        self._prune()
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+        job.future = self.executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled():
+            job._finish(CANCELLED)
+            return
+        with job._lock:
+            job.status = RUNNING
+        _current.job = job
+        try:
+            job._finish(DONE, result=fn(*args, progress=job.progress, cancelled=job.cancelled, **kwargs))
+        except JobCancelled:
+            job._finish(CANCELLED)
+        except Exception as e:
+            logger.exception(f"Background job {job.kind} ({job.id}) failed")
+            job._finish(FAILED, error=e)
+        finally:
+            _current.job = None
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Request cancellation. A queued job never starts; a running job stops the
+        next time it checks `cancelled`.
+        """
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():
+            job._finish(CANCELLED)
+        return True
+
+    def pop(self, job_id):
+        """
+        Remove a finished job and return it, e.g. once its result was delivered.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.done:
+                return self._jobs.pop(job_id)
+        return None
+
+    def _prune(self):
+        # Results a session never collected (closed tab) are dropped after keep_seconds
+        cutoff = time.time() - self.keep_seconds
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished < cutoff]:
+                del self._jobs[job_id]
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_manager():
+    """
+    Return the process-wide `JobManager`, created once per server process.
+    """
+    return JobManager()
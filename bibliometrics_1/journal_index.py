@@ -0,0 +1,286 @@
+#Offline journal metrics: SNIP per (ISSN, year) compiled from Elsevier's bulk source lists
+"""
+Compile Scopus source-title lists (or CiteScore exports) into a memory-mapped
+index and look SNIP values up without the SerialTitle API:
+
+    python -m bibliometrics_1.journal_index ext_list_2024.xlsx
+    python -m bibliometrics_1.journal_index CiteScore_2023.xlsx --year 2023 --merge
+
+The index is two sorted arrays, `keys` (ISSN as an integer * 10000 + year) and
+`snip`, stored as .npy under a versioned directory; a `CURRENT` file names the
+live version, and the version before it is kept until the next rebuild, so
+rebuilding never disturbs a running app.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import config
+from bibliometrics_1.perf import get_recorder, timed
+
+logger = logging.getLogger(__name__)
+
+# Set to use an index outside config.JOURNAL_INDEX_DIR
+INDEX_DIR_ENV = "BIBLIOMETRICS_JOURNAL_INDEX"
+YEAR_KEY = 10_000  # key = issn_int * YEAR_KEY + year
+WIDE_SNIP_RE = re.compile(r"(?:snip\D*(\d{4})|(\d{4})\D*snip)", re.IGNORECASE)
+
+
+def issn_to_int(issns):
+    """
+    Normalize ISSNs ("0028-0836", "00280836", "1573-040x 0011-3215", 280836) to integers.
+
+    The seven leading digits and the check character (X = 10) give a unique
+    integer below 1.1e8. Only the first ISSN of a multi-valued cell is used.
+
+    Args:
+        issns (array-like): ISSNs as strings or numbers.
+
+    Returns:
+        np.ndarray: int64 codes, -1 where the value is not an ISSN.
+    """
+    s = pd.Series(issns, dtype=object)
+    s = s.where(s.notna(), "").astype(str).str.strip().str.upper()
+    s = s.str.split(n=1).str[0].fillna("").str.replace("-", "", regex=False)
+    # Spreadsheets store all-digit ISSNs as numbers and drop leading zeros ("280836.0")
+    s = s.str.replace(r"\.0$", "", regex=True)
+    s = s.where(~s.str.fullmatch(r"\d{1,7}"), s.str.zfill(8))
+    parts = s.str.extract(r"^(\d{7})([\dX])$")
+    valid = parts[0].notna().to_numpy()
+    codes = np.full(len(s), -1, dtype=np.int64)
+    if valid.any():
+        digits = parts.loc[valid, 0].astype(np.int64).to_numpy()
+        check = parts.loc[valid, 1].replace("X", "10").astype(np.int64).to_numpy()
+        codes[valid] = digits * 11 + check
+    return codes
+
+
+def _years(years):
+    years = pd.to_numeric(pd.Series(years, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+    return np.where(np.isfinite(years), years, -1).astype(np.int64)
+
+
+def _column(columns, *names):
+    lowered = {str(column).strip().lower(): column for column in columns}
+    for name in names:
+        if name in lowered:
+            return lowered[name]
+    return None
+
+
+def read_source_list(path, year=None):
+    """
+    Read one bulk source list into (issn, year, snip) records.
+
+    Understands the two layouts Elsevier publishes: wide source-title lists with
+    one "<year> SNIP" column per year, and long exports with a "SNIP" column and
+    either a "Year" column or one year per file (pass `year`). Every column with
+    "ISSN" in its name (print and electronic) is indexed.
+
+    Args:
+        path (Path): .csv, .xls or .xlsx file; every sheet of a workbook is read.
+        year (int, optional): Year of the SNIP column for single-year exports.
+
+    Returns:
+        pd.DataFrame: Columns `issn` (int64 code), `year` and `snip`.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        sheets = [pd.read_csv(path, dtype=str)]
+    else:
+        sheets = list(pd.read_excel(path, sheet_name=None, dtype=str).values())
+
+    records = []
+    for sheet in sheets:
+        issn_columns = [column for column in sheet.columns if "issn" in str(column).lower()]
+        if not issn_columns:
+            continue
+        snip_columns = {}
+        for column in sheet.columns:
+            match = WIDE_SNIP_RE.search(str(column))
+            if match:
+                snip_columns[column] = int(match.group(1) or match.group(2))
+        snip_column = _column(sheet.columns, "snip")
+        if snip_column is not None:
+            year_column = _column(sheet.columns, "year", "citescore year")
+            if year_column is not None:
+                snip_columns[snip_column] = _years(sheet[year_column])
+            elif year is not None:
+                snip_columns[snip_column] = year
+        for column, years in snip_columns.items():
+            snip = pd.to_numeric(sheet[column].str.replace(",", ".", regex=False), errors="coerce").to_numpy()
+            for issn_column in issn_columns:
+                records.append(pd.DataFrame({
+                    "issn": issn_to_int(sheet[issn_column]),
+                    "year": np.broadcast_to(np.asarray(years, dtype=np.int64), snip.shape),
+                    "snip": snip,
+                }))
+    if not records:
+        raise ValueError(f"{path}: no ISSN and SNIP columns found (pass --year for single-year exports)")
+    return pd.concat(records, ignore_index=True)
+
+
+def build_index(paths, year=None, index_dir=None, merge=False):
+    """
+    Compile source lists into a new index version and make it current.
+
+    Later files win where they disagree on an (ISSN, year), as do new files
+    over the existing index when merging.
+
+    Args:
+        paths (list): Source lists, oldest first.
+        year (int, optional): Year for single-year exports, see `read_source_list`.
+        index_dir (Path, optional): Defaults to $BIBLIOMETRICS_JOURNAL_INDEX or config.JOURNAL_INDEX_DIR.
+        merge (bool, optional): Keep entries of the current index. Defaults to False.
+
+    Returns:
+        JournalIndex: The new index.
+    """
+    index_dir = _index_dir(index_dir)
+    frames = []
+    current = get_journal_index(index_dir) if merge else None
+    if current is not None:
+        keys = np.asarray(current.keys)
+        frames.append(pd.DataFrame({"issn": keys // YEAR_KEY, "year": keys % YEAR_KEY, "snip": np.asarray(current.snip)}))
+    sources = list(current.meta["sources"]) if current is not None else []
+    for path in paths:
+        frames.append(read_source_list(path, year=year))
+        sources.append(Path(path).name)
+    records = pd.concat(frames, ignore_index=True)
+    valid = (records["issn"] >= 0) & (records["year"] > 0) & (records["year"] < YEAR_KEY) & records["snip"].notna()
+    records = records[valid.to_numpy()]
+    keys = records["issn"].to_numpy(dtype=np.int64) * YEAR_KEY + records["year"].to_numpy(dtype=np.int64)
+    # Stable sort then keep the last of each run: later sources override earlier ones
+    order = np.argsort(keys, kind="stable")
+    keys, snip = keys[order], records["snip"].to_numpy(dtype=np.float64)[order]
+    last = np.append(keys[1:] != keys[:-1], True)
+    keys, snip = keys[last], snip[last]
+
+    digest = hashlib.sha1(keys.tobytes())
+    digest.update(snip.tobytes())
+    version = digest.hexdigest()[:16]
+    entry = Path(index_dir, version)
+    if not entry.exists():
+        index_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(index_dir, f".{version}.{os.getpid()}.tmp")
+        tmp_dir.mkdir(exist_ok=True)
+        np.save(Path(tmp_dir, "keys.npy"), keys)
+        np.save(Path(tmp_dir, "snip.npy"), snip)
+        meta = {"sources": sources, "entries": int(keys.size), "journals": int(np.unique(keys // YEAR_KEY).size),
+                "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        Path(tmp_dir, "meta.json").write_text(json.dumps(meta, indent=2))
+        try:
+            os.rename(tmp_dir, entry)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    try:
+        previous = Path(index_dir, "CURRENT").read_text().strip()
+    except OSError:
+        previous = None
+    tmp_current = Path(index_dir, f".CURRENT.{os.getpid()}.tmp")
+    tmp_current.write_text(version)
+    os.replace(tmp_current, Path(index_dir, "CURRENT"))
+    # Keep the previous version: a reader may have read the old CURRENT and not
+    # opened its files yet. Readers keep their mmaps of older versions alive after the unlink.
+    for old in index_dir.iterdir():
+        if old.is_dir() and old.name not in (version, previous) and not old.name.startswith("."):
+            shutil.rmtree(old, ignore_errors=True)
+    return get_journal_index(index_dir)
+
+
+class JournalIndex:
+    """
+    Read-only, memory-mapped SNIP index; see `build_index`.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.keys = np.load(Path(self.path, "keys.npy"), mmap_mode="r")
+        self.snip = np.load(Path(self.path, "snip.npy"), mmap_mode="r")
+        self.meta = json.loads(Path(self.path, "meta.json").read_text())
+
+    def __len__(self):
+        return len(self.keys)
+
+    @timed("journal_index")
+    def lookup(self, issns, years):
+        """
+        SNIP for each (ISSN, year). Only exact (ISSN, year) entries are found: a
+        year the index does not list, e.g. one newer than its last build, is a
+        miss, so enrichment asks the API (whose `fetch_snip` falls back to the
+        journal's latest SNIP only after the API has been asked).
+
+        Args:
+            issns (array-like): ISSNs in any format `issn_to_int` accepts.
+            years (array-like): Publication years.
+
+        Returns:
+            tuple: (snip, found) arrays; snip is NaN where found is False.
+        """
+        issn = issn_to_int(issns)
+        year = _years(years)
+        snip = np.full(issn.size, np.nan)
+        found = np.zeros(issn.size, dtype=bool)
+        valid = (issn >= 0) & (year > 0) & (year < YEAR_KEY)
+        if len(self.keys) and valid.any():
+            issn, year = issn[valid], year[valid]
+            last = len(self.keys) - 1
+            query = issn * YEAR_KEY + year
+            pos = np.minimum(np.searchsorted(self.keys, query), last)
+            exact = self.keys[pos] == query
+            snip[valid] = np.where(exact, self.snip[pos], np.nan)
+            found[valid] = exact
+        get_recorder().add(rows=int(found.size), cache_hits=int(found.sum()), cache_misses=int(found.size - found.sum()))
+        return snip, found
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _index_dir(index_dir=None):
+    return Path(index_dir or os.environ.get(INDEX_DIR_ENV) or config.JOURNAL_INDEX_DIR)
+
+
+def get_journal_index(index_dir=None):
+    """
+    Return the current `JournalIndex`, or None if none has been built. Picks up
+    a rebuilt index on the next call without restarting the app.
+    """
+    global _index
+    index_dir = _index_dir(index_dir)
+    try:
+        version = Path(index_dir, "CURRENT").read_text().strip()
+    except OSError:
+        return None
+    with _index_lock:
+        if _index is None or _index.path != Path(index_dir, version):
+            _index = JournalIndex(Path(index_dir, version))
+        return _index
+
+
+def main():
+    config.setup_logging()
+    parser = argparse.ArgumentParser(description="Compile Scopus source lists into the offline SNIP index.")
+    parser.add_argument("paths", type=Path, nargs="+", help="source lists (.csv, .xls, .xlsx), oldest first")
+    parser.add_argument("--year", type=int, help="year of the SNIP column in single-year exports")
+    parser.add_argument("--index-dir", type=Path, help=f"defaults to ${INDEX_DIR_ENV} or config.JOURNAL_INDEX_DIR")
+    parser.add_argument("--merge", action="store_true", help="keep the entries of the current index")
+    args = parser.parse_args()
+    index = build_index(args.paths, year=args.year, index_dir=args.index_dir, merge=args.merge)
+    logger.info(f"Journal index {index.path}: {index.meta['entries']:,} (ISSN, year) entries "
+                f"for {index.meta['journals']:,} ISSNs from {', '.join(index.meta['sources'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
 import datetime
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import streamlit as st
-import pygwalker as pyg
-from bibliometrics_1.data import DataProcessor, MetricsAppBase
+from config import config
+from bibliometrics_1.data import DataProcessor, MetricsAppBase, PublicationWindow
+from bibliometrics_1.datasets import get_dataset_registry
+from bibliometrics_1.dedup import deduplicate
+from bibliometrics_1.indicators import get_indicators_cache
+from bibliometrics_1.jobs import CANCELLED, DONE, get_job_manager
+from bibliometrics_1.perf import get_recorder
 from bibliometrics_1.plotter import Plotter
 from bibliometrics_1.predict import QueryConverter
+from bibliometrics_1.quota import quota_status
 from bibliometrics_1.utils import ConfigManager
 
 
@@ -25,13 +32,17 @@ class AdvancedMetricsApp(MetricsAppBase):
         self.plotter = Plotter()
         # Initialize session state variables
         st.session_state.setdefault("scopus_query", "")
-        st.session_state.setdefault("scopus_df", pd.DataFrame())
+        st.session_state.setdefault("dataset", None)  # handle into the shared dataset registry
         st.session_state.setdefault("pygwalker_html", "")
         st.session_state.setdefault("input_query", "")
+        st.session_state.setdefault("job_id", None)
+        st.session_state.setdefault("uploaded_file_id", None)
+        st.session_state.setdefault("indicators_dataset", None)  # key of the dataset last shown in Author Indicators
 
     
     @st.cache_data
     def generate_pygwalker_html(df):
+        import pygwalker as pyg
         return pyg.walk(df[["title", "Year", "MonthYear", "SNIP", "citedby_count"]], return_html=True)
     
     def display_scopus_data(self):
@@ -39,6 +50,7 @@ class AdvancedMetricsApp(MetricsAppBase):
         # Option to toggle PyGWalker Viewer
         if st.button("Show PyGWalker Viewer"):
             try:
+                import pygwalker as pyg  # ~2s import; only paid when the viewer is opened
                 # Generate PyGWalker visualization
                 walker_html = pyg.walk(
                     self.df[["title", "Year", "MonthYear", "SNIP", "citedby_count"]],
@@ -49,31 +61,52 @@ class AdvancedMetricsApp(MetricsAppBase):
                 st.error(f"Error generating PyGWalker visualization: {e}")
 
 
+    @staticmethod
+    def prepare_publications(df):
+        """
+        Enrich publications with SNIP values, reformat columns and sort them by year.
+        """
+        df = DataProcessor.enrich_with_snip(df)
+
+        desired_column_order = ["SNIP", "title", "Year", "Month", "author_names"]
+        other_columns = [col for col in df.columns if col not in desired_column_order]
+        final_column_order = desired_column_order + other_columns
+        df = df[final_column_order]
+
+        # Format MonthYear and Year columns; `assign` returns a new frame, so the
+        # dataset's shared frame is never written to
+        month_year = (df["Month"].astype(str) + "-" + df["Year"].astype(str)).str.replace(r"\.0", "", regex=True)
+        df = df.assign(
+            MonthYear=pd.to_datetime(month_year, format='%m-%Y', errors='coerce'),
+            Year=pd.to_numeric(df["Year"], errors='coerce').astype('category'),
+        )
+        return PublicationWindow(df).df
+
     def enrich_and_process_data(self):
         """
         Enrich the DataFrame with SNIP values, reformat columns, and prepare the data.
+
+        The prepared table is derived from the session's dataset once per process
+        and shared with every other session that loaded the same publications.
+        While SNIP lookups are pending a retry it is derived again on each rerun.
         """
         if self.df.empty:
             st.info("No data available to process. Please upload a file or execute a query.")
             return  # Early exit if DataFrame is empty
 
         with st.spinner("Retrieving SNIP values from Elsevier..."):
-            self.df = DataProcessor.enrich_with_snip(self.df)
-
-        desired_column_order = ["SNIP", "title", "Year", "Month", "author_names"]
-        other_columns = [col for col in self.df.columns if col not in desired_column_order]
-        final_column_order = desired_column_order + other_columns
-        self.df = self.df[final_column_order]
-
-        # Format MonthYear and Year columns
-        self.df["MonthYear"] = self.df["Month"].astype(str) + "-" + self.df["Year"].astype(str)
-        self.df["MonthYear"] = self.df["MonthYear"].str.replace(r"\.0", "", regex=True)
-        self.df["MonthYear"] = pd.to_datetime(self.df["MonthYear"], format='%m-%Y', errors='coerce')
-        self.df["Year"] = pd.to_numeric(self.df["Year"], errors='coerce')
-        self.df['Year'] = self.df['Year'].astype('category')
+            # Kept only once no SNIP lookup is waiting for a retry, so rate-limit and server failures are not frozen into the shared table
+            self.publications_dataset = self.dataset.derive(
+                "publications", AdvancedMetricsApp.prepare_publications,
+                cacheable=lambda df: not DataProcessor.snip_pending(df),
+            )
+        self.df = self.publications_dataset.to_pandas()
 
-        # Filter data for the last 5 years
-        self.df_last_5_years = self.df[self.df['Year'].astype(float) >= (self.current_year - 4)]
+        # Sorted by year; the last-5-years window is then a slice shared with the plotter
+        self.publications = PublicationWindow(self.df)
+        self.df = self.publications.df
+        self.df_last_5_years = self.publications.last_n_years(5, self.current_year)
+        self.plotter.set_window(self.df_last_5_years)
 
     def display_publications_with_snip(self):
         """
@@ -82,27 +115,8 @@ class AdvancedMetricsApp(MetricsAppBase):
         if hasattr(self, 'df') and not self.df.empty:
             st.header("Publications with Impact Factor (SNIP)")
     
-            # Retrieve SNIP values and enrich the DataFrame
-            with st.spinner("Retrieving SNIP values from Elsevier..."):
-                self.df = DataProcessor.enrich_with_snip(self.df)
-    
-            # Reorder columns based on preferences
-            desired_column_order = ["SNIP", "title", "Year", "Month", "author_names"]
-            other_columns = [col for col in self.df.columns if col not in desired_column_order]
-            final_column_order = desired_column_order + other_columns
-            self.df = self.df[final_column_order]
-    
-            # Format MonthYear and Year columns
-            self.df["MonthYear"] = self.df["Month"].astype(str) + "-" + self.df["Year"].astype(str)
-            self.df["MonthYear"] = self.df["MonthYear"].str.replace(r"\.0", "", regex=True)
-            self.df["MonthYear"] = pd.to_datetime(self.df["MonthYear"], format='%m-%Y', errors='coerce')
-            self.df["Year"] = pd.to_numeric(self.df["Year"], errors='coerce')
-            self.df['Year'] = self.df['Year'].astype('category')
-            
-            self.df = self.df.sort_values(by="SNIP", ascending=False)
-    
-            # Display the enriched DataFrame
-            st.write(self.df)
+            # Enriched and formatted in `prepare_publications`; the SNIP order is cached with the shared table
+            st.write(self.publications_dataset.view(sort_by="SNIP", ascending=False).to_pandas())
         else:
             st.warning("No publications to display. Please load or generate data first.")
 
@@ -115,10 +129,14 @@ class AdvancedMetricsApp(MetricsAppBase):
         """)
     
         self.display_sidebar()
+        self.collect_job()
+        if st.session_state["job_id"] is not None:
+            self.display_job_progress()
     
-        # Reinitialize DataFrame from session state
-        if "scopus_df" in st.session_state and not st.session_state["scopus_df"].empty:
-            self.df = st.session_state["scopus_df"]
+        # Reinitialize DataFrame from the session's dataset handle (a view, not a copy)
+        if st.session_state["dataset"] is not None:
+            self.dataset = st.session_state["dataset"]
+            self.df = self.dataset.to_pandas()
     
         if self.df.empty:
             st.info("Please upload a publication file or execute a Scopus query from the sidebar.")
@@ -129,7 +147,112 @@ class AdvancedMetricsApp(MetricsAppBase):
             self.plotter.render_line_graph()
             self.plotter.render_violin_plot()
             self.plotter.render_coauthor_network()
+            self.display_author_indicators()
 
+        self.display_performance()
+
+    def display_author_indicators(self):
+        """
+        Per-author h-index, citations, mean SNIP and collaboration counts over a window of publication years.
+        """
+        # After "Add to current publications" the previous engine is extended instead of rebuilt
+        engine = get_indicators_cache().get(self.publications_dataset, previous=st.session_state["indicators_dataset"])
+        st.session_state["indicators_dataset"] = self.publications_dataset.key
+
+        st.header("Author Indicators")
+        years = self.publications.years[~np.isnan(self.publications.years)]
+        if years.size == 0 or len(engine) == 0:
+            st.warning("No author data available for computing author indicators.")
+            return
+        first, last = int(years.min()), int(years.max())
+        start, end = first, last
+        if first < last:
+            start, end = st.slider(
+                "Publication years", first, last, (max(first, min(last, self.current_year - 4)), last),
+                key="indicator_years"
+            )
+        st.dataframe(engine.indicators(start, end), hide_index=True)
+
+    def cancel_job(self):
+        """
+        Cancel this session's background job, if any; a new load replaces it.
+        """
+        if st.session_state["job_id"] is not None:
+            get_job_manager().cancel(st.session_state["job_id"])
+            st.session_state["job_id"] = None
+
+    def start_job(self, kind, fn, *args):
+        """
+        Run `fn` in the background for this session, cancelling the job it replaces.
+        """
+        self.cancel_job()
+        st.session_state["job_id"] = get_job_manager().submit(kind, fn, *args)
+
+    def collect_job(self):
+        """
+        Deliver a finished background job into st.session_state and report how it ended.
+        """
+        job_id = st.session_state["job_id"]
+        if job_id is None:
+            return
+        jobs = get_job_manager()
+        job = jobs.pop(job_id)
+        if job is None:
+            if jobs.get(job_id) is None:  # pruned, or st.cache_resource was cleared
+                st.session_state["job_id"] = None
+            return
+        st.session_state["job_id"] = None
+        self.display_job_messages(job)
+        registry = get_dataset_registry()
+        current = st.session_state["dataset"]
+        if job.status == DONE:
+            if job.result is None or job.result.empty:
+                st.warning(f"{job.kind}: no publication data found. Please refine your query or check the file.")
+            elif st.session_state.get("combine_sources") and current is not None:
+                combined = pd.concat([current.to_pandas(), job.result], ignore_index=True)
+                deduplicated = deduplicate(combined)
+                st.session_state["dataset"] = registry.put(deduplicated)
+                merged = len(combined) - len(deduplicated)
+                st.success(f"{job.kind} finished: {len(job.result)} publications added ({merged} duplicates merged).")
+            else:
+                st.session_state["dataset"] = registry.put(job.result)  # Sessions keep only the handle
+                st.success(f"{job.kind} finished: {len(job.result)} publications loaded.")
+        elif job.status == CANCELLED:
+            st.info(f"{job.kind} cancelled.")
+        else:
+            st.error(f"{job.kind} failed: {job.error}")
+
+    @st.fragment(run_every=1.0)
+    def display_job_progress(self):
+        """
+        Poll the session's background job; only this fragment reruns until it finishes.
+        """
+        job = get_job_manager().get(st.session_state["job_id"])
+        if job is None or job.done:
+            st.rerun()  # full rerun, which collects the result
+        status, fraction, message, _ = job.snapshot()
+        st.progress(fraction, text=f"{job.kind}: {message or status}")
+        if st.button("Cancel", key="cancel_job"):
+            get_job_manager().cancel(job.id)
+        self.display_job_messages(job)
+
+    def display_performance(self):
+        """
+        Collapsible per-stage timings and counters for the whole server process.
+        """
+        recorder = get_recorder()
+        with st.expander("Performance", expanded=False):
+            stats = recorder.snapshot()
+            if stats.empty:
+                st.write("No pipeline stages have run yet.")
+            else:
+                st.dataframe(stats)
+            datasets = get_dataset_registry().stats()
+            st.write(f"Shared datasets: {len(datasets)} ({datasets['mb'].sum():.1f} MB for all sessions)")
+            if st.button("Reset performance counters (all sessions)", key="reset_perf",
+                         help="The counters are shared by every session of this server process."):
+                recorder.reset()
+        recorder.export()
 
     def display_sidebar(self):
         """
@@ -137,20 +260,19 @@ class AdvancedMetricsApp(MetricsAppBase):
         """
         st.sidebar.header("API & Data Input Settings")
         data_source = st.sidebar.radio("Select Data Source", ["Scopus Query", "Upload Spreadsheet"])
+        st.sidebar.checkbox(
+            "Add to current publications", key="combine_sources",
+            help="Merge the next query or upload into the loaded publications, dropping duplicates."
+        )
         self.df = pd.DataFrame()  # Avoid reinitializing unless necessary
     
         if data_source == "Upload Spreadsheet":
             uploaded_file = st.sidebar.file_uploader("Upload Publications File (CSV, Excel, or DOCX)", type=["csv", "xls", "xlsx", "docx"])
-            if uploaded_file:
-                if hasattr(self, 'handle_uploaded_file'):
-                    self.df = self.handle_uploaded_file(uploaded_file)
-                    if self.df.empty:
-                        st.warning("No valid data found in the uploaded file.")
-                    else:
-                        st.session_state["scopus_df"] = self.df  # Persist DataFrame to session state
-                        st.success("File uploaded and processed successfully!")
-                else:
-                    st.error("The 'handle_uploaded_file' method is not defined in this class.")
+            # The uploader keeps its file across reruns; only a new file starts a job
+            if uploaded_file and uploaded_file.file_id != st.session_state["uploaded_file_id"]:
+                st.session_state["uploaded_file_id"] = uploaded_file.file_id
+                self.cancel_job()
+                st.session_state["job_id"] = self.submit_uploaded_file(uploaded_file)
     
         elif data_source == "Scopus Query":
             st.sidebar.subheader("Enter Search Parameters")
@@ -184,17 +306,30 @@ class AdvancedMetricsApp(MetricsAppBase):
             )
     
             if st.sidebar.button("Execute Query", key="execute_scopus"):
-                with st.spinner("Executing Scopus query..."):
-                    self.df = DataProcessor.fetch_scopus_data(st.session_state.scopus_query)
-                    if self.df.empty:
-                        st.warning("No data found for the Scopus query. Please refine your query.")
-                    else:
-                        self.df = DataProcessor.process_data(self.df)
-                        st.session_state.scopus_df = self.df  # Persist DataFrame to session state
+                self.start_job("Scopus query", DataProcessor.load_scopus_query, st.session_state.scopus_query)
+
+        self.display_quota()
+
+    def display_quota(self):
+        """
+        Show the remaining weekly Elsevier quota shared by all sessions.
+        """
+        with st.sidebar.expander("Elsevier API Quota", expanded=False):
+            for api, status in quota_status().items():
+                if status["remaining"] is None:
+                    st.write(f"**{api}**: no requests made yet")
+                    continue
+                st.write(f"**{api}**: {status['remaining']:,} of {status['weekly']:,} requests left this week")
+                st.progress(min(1.0, status["remaining"] / status["weekly"]))
+                if status["reset_at"] is not None:
+                    st.caption(f"Resets {status['reset_at']:%Y-%m-%d %H:%M}")
+                if status["throttled"]:
+                    st.caption(f"Throttled {status['throttled']} times; current rate {status['rate']} req/s")
 
 # =============================================================================
 # Run the App
 # =============================================================================
 if __name__ == "__main__":
+    config.setup_logging()
     app = AdvancedMetricsApp()
     app.run()
@@ -0,0 +1,175 @@
+#Multi-source record merge: typed per-source frames coalesced by a field-priority table
+import numpy as np
+import pandas as pd
+
+from bibliometrics_1.perf import get_recorder, timed
+
+def crossref_author_names(frame):
+    """
+    "Given Family, Given Family" from the raw CrossRef `author` lists of `frame`.
+    """
+    return frame["author"].map(
+        lambda authors: ", ".join(f"{a.get('given', '')} {a.get('family', '')}".strip() for a in authors)
+        if isinstance(authors, list) and authors else None
+    )
+
+
+# Output field -> (source, column) candidates, highest priority first. Columns
+# refer to the flattened frames (`flatten_scopus`, `flatten_crossref`); a callable
+# is evaluated only on the rows no earlier candidate filled.
+FIELD_PRIORITY = {
+    "doi": [("scopus", "doi"), ("crossref", "doi")],
+    "title": [("scopus", "title"), ("crossref", "title")],
+    "journal_name": [("scopus", "journal_name"), ("crossref", "journal_name")],
+    "journal_issn": [("scopus", "journal_issn"), ("crossref", "journal_issn")],
+    "publication_date": [("scopus", "publication_date"), ("crossref", "issued"), ("crossref", "created")],
+    "author_names": [("scopus", "author_names"), ("crossref", crossref_author_names)],
+    "citation_count": [("scopus", "citedby_count"), ("crossref", "citation_count")],
+    "citedby_count": [("scopus", "citedby_count"), ("crossref", "citation_count")],
+    "cited_by": [("crossref", "citation_count")],
+}
+
+
+def _first(values):
+    # First element of list-valued cells (CrossRef wraps titles, ISSNs... in lists)
+    return [value[0] if isinstance(value, list) and value else None for value in values]
+
+
+def _counts(values):
+    return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype("Int64")
+
+
+def _dates(values):
+    dates = pd.to_datetime(values, errors="coerce", utc=True, format="ISO8601")
+    return dates.dt.tz_localize(None) if isinstance(dates, pd.Series) else dates.tz_localize(None)
+
+
+def flatten_scopus(df, index=None):
+    """
+    Typed columns of Scopus Search results (as returned by `DataProcessor.fetch_scopus_data`).
+
+    All columns are kept; the ones the merge reads are typed.
+
+    Args:
+        df (pd.DataFrame): Scopus results, one row per record.
+        index (list, optional): Key per row, e.g. the DOI that was queried.
+
+    Returns:
+        pd.DataFrame: The results with `publication_date` as datetime and `citedby_count` as Int64.
+    """
+    df = df.copy()
+    if index is not None:
+        df.index = pd.Index(index)
+    for column in ("doi", "title", "journal_name", "journal_issn", "author_names"):
+        if column not in df.columns:
+            df[column] = None
+    df["publication_date"] = _dates(df["publication_date"]) if "publication_date" in df.columns else pd.NaT
+    df["citedby_count"] = _counts(df["citedby_count"]).array if "citedby_count" in df.columns else pd.NA
+    return df
+
+
+def flatten_crossref(records, index=None):
+    """
+    Flatten CrossRef `works` messages into one typed row each.
+
+    Args:
+        records (list): CrossRef `message` dicts.
+        index (list, optional): Key per record, e.g. the DOI that was queried.
+
+    Returns:
+        pd.DataFrame: Columns doi, title, journal_name, journal_issn, issued,
+            created, author (raw lists, see `crossref_author_names`) and citation_count.
+    """
+    records = list(records)
+    field = lambda key: [record.get(key) for record in records]
+    # date-parts are [[year, month, day]] with month and day optional
+    parts = [((issued.get("date-parts") or [[None]])[0] or [None]) if isinstance(issued, dict) else [None]
+             for issued in field("issued")]
+    parts = np.array([(list(p) + [1, 1])[:3] if p[0] else [np.nan] * 3 for p in parts], dtype=float).reshape(-1, 3)
+    created = [created.get("date-time") if isinstance(created, dict) else None for created in field("created")]
+    issn = pd.Series(_first(field("ISSN")), dtype=object)
+    df = pd.DataFrame({
+        "doi": pd.Series(field("DOI"), dtype=object),
+        "title": pd.Series(_first(field("title")), dtype=object),
+        "journal_name": pd.Series(_first(field("container-title")), dtype=object),
+        "journal_issn": issn.where(issn.isna(), issn.astype(str).str.replace("-", "", regex=False)),
+        "issued": pd.to_datetime(pd.DataFrame(parts, columns=["year", "month", "day"]), errors="coerce"),
+        "created": _dates(created) if records else pd.Series(dtype="datetime64[ns]"),
+        "author": pd.Series(field("author"), dtype=object),
+        "citation_count": _counts(field("is-referenced-by-count")),
+    })
+    if index is not None:
+        df.index = pd.Index(index)
+    return df
+
+
+@timed("merge_sources")
+def merge_sources(sources, priority=FIELD_PRIORITY, provenance=True):
+    """
+    Coalesce per-source frames into one row per key.
+
+    Rows are aligned on the frames' index. Each output field takes the first
+    non-null candidate in `priority` order, one vectorized `fillna` per
+    candidate. Columns of the first source that no field covers are passed through.
+    Each source's keys must be unique.
+
+    Args:
+        sources (dict): Source name -> flattened frame, in pass-through order.
+        priority (dict, optional): Field -> [(source, column), ...]. Defaults to FIELD_PRIORITY.
+        provenance (bool, optional): Add a `<field>_source` column naming the
+            source that supplied each value. Defaults to True.
+
+    Returns:
+        pd.DataFrame: Merged records indexed by key, in first-seen order.
+    """
+    frames = [frame for frame in sources.values() if frame is not None]
+    if not frames:
+        return pd.DataFrame(columns=list(priority))
+    index = frames[0].index.append([frame.index for frame in frames[1:]]).drop_duplicates()
+    get_recorder().add(rows=len(index))
+    # Align every source to the merged keys once; columns are then taken by position
+    indexers = {
+        name: None if frame.index.equals(index) else frame.index.get_indexer(index)
+        for name, frame in sources.items() if frame is not None
+    }
+
+    def aligned(name, values):
+        indexer = indexers[name]
+        if indexer is not None:
+            values = pd.api.extensions.take(values.array, indexer, allow_fill=True)
+        return pd.Series(values, index=index)
+
+    names = list(sources)
+    first = sources[names[0]]
+    if first is None:
+        merged = pd.DataFrame(index=index)
+    else:
+        merged = first.copy() if indexers[names[0]] is None else first.reindex(index)
+    for field, candidates in priority.items():
+        value = None
+        source = np.full(len(index), -1, dtype=np.int8)
+        for name, column in candidates:
+            frame = sources.get(name)
+            if frame is None:
+                continue
+            if callable(column):
+                indexer = indexers[name]
+                needed = np.ones(len(index), dtype=bool) if value is None else value.isna().to_numpy()
+                positions = np.flatnonzero(needed) if indexer is None else indexer[needed]
+                rows = index[needed] if indexer is None else index[needed][positions >= 0]
+                candidate = pd.Series(column(frame.iloc[positions[positions >= 0]]).to_numpy(), index=rows).reindex(index)
+            elif column in frame.columns:
+                candidate = aligned(name, frame[column])
+            else:
+                continue
+            fills = candidate.notna().to_numpy()
+            if value is None:
+                value = candidate
+            else:
+                fills = fills & value.isna().to_numpy()
+                value = value.fillna(candidate)
+            source[fills] = names.index(name)
+        merged[field] = value.to_numpy() if value is not None else None
+        if provenance:
+            merged[f"{field}_source"] = pd.Categorical.from_codes(source, categories=names)
+    return merged
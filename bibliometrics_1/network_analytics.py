@@ -0,0 +1,331 @@
+#Co-author network analytics: degree, strength, sampled betweenness and communities on the sparse adjacency
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from scipy import sparse
+
+from bibliometrics_1.indicators import split_authors
+from bibliometrics_1.perf import get_recorder, timed
+from bibliometrics_1.singleflight import SingleFlight
+
+ANALYTICS_COLUMNS = ["author", "degree", "strength", "betweenness", "community", "community_size"]
+# Betweenness is estimated from this many BFS sources; exact for graphs with fewer authors
+BETWEENNESS_SAMPLES = 256
+# Sources per BFS batch: each batch holds a few (authors x batch) float arrays
+BETWEENNESS_BATCH = 64
+
+
+@timed("coauthor_adjacency")
+def coauthor_adjacency(df):
+    """
+    Weighted co-author adjacency of the papers in `df`.
+
+    Authors are split and normalized as in `indicators.split_authors`, so the
+    authors match the coauthor network and the Author Indicators table.
+
+    Args:
+        df (pd.DataFrame): Papers with an 'author_names' column.
+
+    Returns:
+        tuple: (adjacency, names); a symmetric scipy.sparse.csr_matrix whose
+            entries count the papers two authors share, and the pd.Index of author names.
+    """
+    author_names = df["author_names"] if "author_names" in df.columns else []
+    paper, author, names = split_authors(author_names)
+    get_recorder().add(rows=len(df))
+    incidence = sparse.csr_matrix(
+        (np.ones(paper.size, dtype=np.int32), (author, paper)), shape=(len(names), len(author_names))
+    )
+    adjacency = (incidence @ incidence.T).tocsr()
+    adjacency.setdiag(0)  # every author is on its own papers, so the diagonal is already stored
+    adjacency.eliminate_zeros()
+    adjacency.sort_indices()
+    return adjacency, names
+
+
+def graph_fingerprint(adjacency, names):
+    """
+    Content hash of an adjacency and its author names.
+    """
+    digest = hashlib.sha1("\x1f".join(map(str, names)).encode("utf-8"))
+    for array in (adjacency.indptr, adjacency.indices, adjacency.data):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def filter_adjacency(adjacency, names, min_collaborations=1):
+    """
+    Keep the edges with weight >= `min_collaborations` and the authors they connect.
+
+    Returns:
+        tuple: (adjacency, names) of the filtered graph.
+    """
+    coo = adjacency.tocoo()
+    keep = coo.data >= min_collaborations
+    rows, cols, weights = coo.row[keep], coo.col[keep], coo.data[keep]
+    nodes = np.unique(rows)
+    position = np.full(adjacency.shape[0], -1, dtype=np.int64)
+    position[nodes] = np.arange(nodes.size)
+    filtered = sparse.csr_matrix((weights, (position[rows], position[cols])), shape=(nodes.size, nodes.size))
+    filtered.sort_indices()
+    return filtered, names[nodes]
+
+
+def _dependencies(binary, sources):
+    # Brandes' dependency accumulation for a batch of BFS sources, all sources at once:
+    # column j of each (authors x batch) array is the search from sources[j]
+    n, batch = binary.shape[0], len(sources)
+    columns = np.arange(batch)
+    sigma = np.zeros((n, batch))
+    sigma[sources, columns] = 1.0
+    depth = np.full((n, batch), -1, dtype=np.int32)
+    depth[sources, columns] = 0
+    frontier = sigma.copy()
+    level = 0
+    while True:
+        reached = binary @ frontier  # shortest paths into each author through the current level
+        reached[depth >= 0] = 0.0
+        new = reached > 0
+        if not new.any():
+            break
+        level += 1
+        depth[new] = level
+        sigma += reached
+        frontier = reached
+    delta = np.zeros((n, batch))
+    for level in range(level, 0, -1):
+        at_level = depth == level
+        coefficient = np.where(at_level, (1.0 + delta) / np.where(at_level, sigma, 1.0), 0.0)
+        delta += np.where(depth == level - 1, sigma * (binary @ coefficient), 0.0)
+    delta[sources, columns] = 0.0
+    return delta.sum(axis=1)
+
+
+def sampled_betweenness(adjacency, samples=BETWEENNESS_SAMPLES, seed=0, executor=None):
+    """
+    Betweenness centrality (unweighted shortest paths) estimated from `samples` BFS sources.
+
+    Values are normalized as `networkx.betweenness_centrality(G, k=samples)`
+    and are exact when the graph has at most `samples` authors.
+
+    Args:
+        adjacency (scipy.sparse.csr_matrix): Symmetric adjacency.
+        samples (int, optional): BFS sources. Defaults to BETWEENNESS_SAMPLES.
+        seed (int, optional): Seed for choosing the sources. Defaults to 0.
+        executor (Executor, optional): Runs the source batches in parallel. Defaults to serial.
+
+    Returns:
+        np.ndarray: Betweenness per author.
+    """
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    k = min(samples, n)
+    sources = np.arange(n) if k == n else np.sort(np.random.default_rng(seed).choice(n, size=k, replace=False))
+    binary = adjacency.astype(bool).astype(np.float64)
+    batches = np.array_split(sources, -(-k // BETWEENNESS_BATCH))
+    if executor is None:
+        parts = [_dependencies(binary, batch) for batch in batches]
+    else:
+        parts = list(executor.map(lambda batch: _dependencies(binary, batch), batches))
+    betweenness = np.sum(parts, axis=0)
+    if n > 2:
+        betweenness *= n / k / ((n - 1) * (n - 2))
+    return betweenness
+
+
+def _local_moving(graph, total, resolution, rng):
+    # Louvain phase 1: move single nodes to the neighbouring community with the best
+    # modularity gain until no move helps; lists, as this loop is per node
+    n = graph.shape[0]
+    indptr, indices, weights = graph.indptr.tolist(), graph.indices.tolist(), graph.data.tolist()
+    strength = np.asarray(graph.sum(axis=1)).ravel().tolist()
+    labels = list(range(n))
+    tot = list(strength)
+    moved = False
+    improved = True
+    while improved:
+        improved = False
+        for i in rng.permutation(n).tolist():
+            links = {}
+            for j, w in zip(indices[indptr[i]:indptr[i + 1]], weights[indptr[i]:indptr[i + 1]]):
+                if j != i:
+                    links[labels[j]] = links.get(labels[j], 0.0) + w
+            current, k = labels[i], strength[i] * resolution / total
+            tot[current] -= strength[i]
+            best, best_gain = current, links.get(current, 0.0) - tot[current] * k
+            for community, w in links.items():
+                gain = w - tot[community] * k
+                if gain > best_gain + 1e-12:
+                    best, best_gain = community, gain
+            tot[best] += strength[i]
+            if best != current:
+                labels[i] = best
+                improved = moved = True
+    return np.asarray(labels, dtype=np.int64), moved
+
+
+def louvain(adjacency, seed=0, resolution=1.0):
+    """
+    Community labels by the Louvain method (modularity optimization).
+
+    Each level moves single authors between neighbouring communities until no move
+    raises modularity, then merges every community into one node (a sparse
+    P.T @ A @ P) and repeats on the smaller graph.
+
+    Args:
+        adjacency (scipy.sparse.csr_matrix): Symmetric weighted adjacency.
+        seed (int, optional): Seed for the order authors are visited in. Defaults to 0.
+        resolution (float, optional): Larger values give smaller communities. Defaults to 1.0.
+
+    Returns:
+        np.ndarray: Community per author, numbered by size (0 is the largest).
+    """
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    graph = sparse.csr_matrix(adjacency, dtype=np.float64)
+    total = graph.sum()
+    communities = np.arange(n)
+    while total > 0:
+        labels, moved = _local_moving(graph, total, resolution, rng)
+        if not moved:
+            break
+        _, labels = np.unique(labels, return_inverse=True)
+        communities = labels.ravel()[communities]
+        merge = sparse.csr_matrix((np.ones(labels.size), (np.arange(labels.size), labels.ravel())))
+        graph = (merge.T @ graph @ merge).tocsr()
+    _, inverse, counts = np.unique(communities, return_inverse=True, return_counts=True)
+    rank = np.empty(counts.size, dtype=np.int64)
+    rank[np.argsort(-counts, kind="stable")] = np.arange(counts.size)
+    return rank[inverse.ravel()]
+
+
+def modularity(adjacency, communities):
+    """
+    Newman modularity of a partition of a weighted graph.
+    """
+    total = adjacency.sum()
+    if total == 0:
+        return 0.0
+    coo = adjacency.tocoo()
+    inside = coo.data[communities[coo.row] == communities[coo.col]].sum()
+    strength = np.bincount(communities, weights=np.asarray(adjacency.sum(axis=1)).ravel())
+    return float(inside / total - ((strength / total) ** 2).sum())
+
+
+class NetworkAnalytics:
+    """
+    Analytics of a co-author graph filtered to `min_collaborations`:
+
+        - degree (distinct coauthors) and strength (collaborations, i.e. summed edge weights)
+        - betweenness, sampled (see `sampled_betweenness`)
+        - Louvain communities, with their modularity
+
+    Betweenness batches and community detection run as independent tasks on `executor`.
+    """
+
+    @timed("network_analytics_compute")
+    def __init__(self, adjacency, names, min_collaborations=1, samples=BETWEENNESS_SAMPLES, seed=0, executor=None):
+        self.adjacency, self.names = filter_adjacency(adjacency, names, min_collaborations)
+        self.min_collaborations = min_collaborations
+        self.samples = min(samples, len(self.names))
+        get_recorder().add(rows=len(self.names))
+        if executor is None:
+            communities = louvain(self.adjacency, seed)
+        else:
+            communities = executor.submit(louvain, self.adjacency, seed)
+        betweenness = sampled_betweenness(self.adjacency, samples, seed, executor)
+        if executor is not None:
+            communities = communities.result()
+        self.modularity = modularity(self.adjacency, communities)
+        self.communities = int(communities.max()) + 1 if communities.size else 0
+        table = pd.DataFrame({
+            "author": self.names,
+            "degree": np.diff(self.adjacency.indptr),
+            "strength": np.asarray(self.adjacency.sum(axis=1)).ravel().astype(np.int64),
+            "betweenness": betweenness,
+            "community": communities,
+            "community_size": np.bincount(communities)[communities] if communities.size else communities,
+        }, columns=ANALYTICS_COLUMNS)
+        self.table = table.sort_values(
+            ["betweenness", "strength", "author"], ascending=[False, False, True], ignore_index=True
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def graph(self):
+        """
+        The filtered graph as a networkx.Graph with `weight` edge attributes.
+        """
+        import networkx as nx
+
+        upper = sparse.triu(self.adjacency, k=1).tocoo()
+        graph = nx.Graph()
+        graph.add_nodes_from(self.names)
+        graph.add_weighted_edges_from(zip(self.names[upper.row], self.names[upper.col], upper.data.tolist()))
+        return graph
+
+
+class NetworkAnalyticsCache:
+    """
+    `NetworkAnalytics` by (graph fingerprint, min_collaborations), least recently
+    used first out. Builds share one thread pool sized to the machine.
+    """
+
+    def __init__(self, max_entries=32, max_workers=None):
+        self.max_entries = max_entries
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or min(4, os.cpu_count() or 1), thread_name_prefix="bibliometrics-analytics"
+        )
+        self._analytics = OrderedDict()
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+
+    @timed("network_analytics")
+    def get(self, df, min_collaborations=1):
+        """
+        Analytics of the co-author graph of `df`, computed once per graph and threshold.
+
+        Args:
+            df (pd.DataFrame): Papers with an 'author_names' column.
+            min_collaborations (int, optional): Minimum edge weight. Defaults to 1.
+
+        Returns:
+            NetworkAnalytics: The analytics.
+        """
+        adjacency, names = coauthor_adjacency(df)
+        key = (graph_fingerprint(adjacency, names), min_collaborations)
+        with self._lock:
+            analytics = self._analytics.get(key)
+            if analytics is not None:
+                self._analytics.move_to_end(key)
+        get_recorder().add(cache_hits=int(analytics is not None), cache_misses=int(analytics is None))
+        if analytics is not None:
+            return analytics
+
+        analytics = self._flight.do(
+            ("network_analytics",) + key,
+            lambda: NetworkAnalytics(adjacency, names, min_collaborations, executor=self.executor),
+        )
+        with self._lock:
+            self._analytics[key] = analytics
+            while len(self._analytics) > self.max_entries:
+                self._analytics.popitem(last=False)
+        return analytics
+
+
+@st.cache_resource(show_spinner=False)
+def get_network_analytics_cache():
+    """
+    Return the process-wide `NetworkAnalyticsCache`, created once per server process.
+    """
+    return NetworkAnalyticsCache()
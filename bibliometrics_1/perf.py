@@ -0,0 +1,175 @@
+#Per-stage timing and counters for the dashboard pipeline
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# Optional Prometheus text-format export, e.g. for the node_exporter textfile collector
+PROMETHEUS_FILE_ENV = "BIBLIOMETRICS_PROMETHEUS_FILE"
+
+COUNTERS = ("calls", "errors", "wall_seconds", "max_seconds", "cache_hits", "cache_misses", "bytes", "rows")
+
+
+class PerfRecorder:
+    """
+    Process-wide accumulator of per-stage wall time and counters.
+
+    Stages nest per thread; `add` attributes counters (bytes, rows, cache hits...)
+    to the innermost stage running on the calling thread.
+    """
+
+    def __init__(self):
+        self._stats = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        self._cached_stages = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._exported_calls = 0
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def stage(self, name, cached=False):
+        """
+        Time a block as one call of `name`.
+
+        Args:
+            name (str): Stage name.
+            cached (bool): The stage is wrapped in st.cache_data and records a cache
+                miss from inside the cached body, so hits are derived as calls - misses.
+        """
+        stack = self._stack()
+        stack.append(name)
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                stats = self._stats[name]
+                stats["calls"] += 1
+                stats["errors"] += failed
+                stats["wall_seconds"] += elapsed
+                stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+                if cached:
+                    self._cached_stages.add(name)
+            if logger.isEnabledFor(logging.DEBUG):  # skip building the JSON on every stage otherwise
+                logger.debug(json.dumps({"event": "stage", "stage": name, "seconds": round(elapsed, 6), "error": failed}))
+
+    def add(self, stage=None, **counters):
+        """
+        Add counters (cache_hits, cache_misses, bytes, rows) to `stage`, or to the
+        innermost stage active on this thread. Ignored outside any stage.
+        """
+        if stage is None:
+            stack = self._stack()
+            if not stack:
+                return
+            stage = stack[-1]
+        with self._lock:
+            stats = self._stats[stage]
+            for key, value in counters.items():
+                stats[key] += value
+
+    def snapshot(self):
+        """
+        Returns:
+            pd.DataFrame: One row per stage with totals, mean latency and cache hit rate.
+        """
+        with self._lock:
+            rows = [dict(stats, stage=name) for name, stats in self._stats.items()]
+            cached_stages = set(self._cached_stages)
+        if not rows:
+            return pd.DataFrame(columns=("stage",) + COUNTERS)
+        df = pd.DataFrame(rows).set_index("stage").sort_values("wall_seconds", ascending=False)
+        derived = df.index.isin(list(cached_stages))
+        df.loc[derived, "cache_hits"] = df.loc[derived, "calls"] - df.loc[derived, "cache_misses"]
+        df["mean_seconds"] = df["wall_seconds"] / df["calls"].where(df["calls"] > 0)
+        lookups = df["cache_hits"] + df["cache_misses"]
+        df["cache_hit_rate"] = df["cache_hits"] / lookups.where(lookups > 0)
+        return df
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._cached_stages.clear()
+            self._exported_calls = 0
+
+    def to_prometheus(self):
+        """
+        Render the snapshot in the Prometheus text exposition format.
+        """
+        df = self.snapshot()
+        lines = []
+        for column, kind in (
+            ("calls", "counter"), ("errors", "counter"), ("wall_seconds", "counter"),
+            ("max_seconds", "gauge"), ("cache_hits", "counter"), ("cache_misses", "counter"),
+            ("bytes", "counter"), ("rows", "counter"),
+        ):
+            metric = f"bibliometrics_stage_{column}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# TYPE {metric} {kind}")
+            for stage, value in df[column].items():
+                lines.append(f'{metric}{{stage="{stage}"}} {float(value):g}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, prometheus_file=None):
+        """
+        Log the snapshot as one structured record per stage and, if configured,
+        write the Prometheus text file. Does nothing when no new calls were recorded.
+        """
+        df = self.snapshot()
+        total_calls = int(df["calls"].sum()) if not df.empty else 0
+        if total_calls == self._exported_calls:
+            return
+        self._exported_calls = total_calls
+        for stage, stats in df.iterrows():
+            record = {"event": "stage_summary", "stage": stage}
+            record.update({key: (None if pd.isna(value) else round(float(value), 6)) for key, value in stats.items()})
+            logger.info(json.dumps(record))
+        prometheus_file = prometheus_file or os.environ.get(PROMETHEUS_FILE_ENV)
+        if prometheus_file:
+            path = Path(prometheus_file)
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            tmp_path.write_text(self.to_prometheus())
+            os.replace(tmp_path, path)
+
+
+_recorder = PerfRecorder()
+
+
+def get_recorder():
+    """
+    Return the process-wide `PerfRecorder`.
+    """
+    return _recorder
+
+
+def timed(stage, cached=False):
+    """
+    Decorator recording each call of the wrapped function as one call of `stage`.
+    Place it outside st.cache_data so cache hits are counted as calls too.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _recorder.stage(stage, cached=cached):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,22 +1,29 @@
-from pathlib import Path
 from datetime import datetime
-from matplotlib import pyplot as plt
 import pandas as pd
 import streamlit as st
-import plotly.express as px
-import networkx as nx
-from data import DataProcessor
-from utils import NetworkBuilder
+from bibliometrics_1.data import DataProcessor
+from bibliometrics_1.network_analytics import filter_adjacency, get_network_analytics_cache
+from bibliometrics_1.perf import get_recorder, timed
 
 class Plotter:
     def __init__(self):
         self.current_year = datetime.now().year
+        self.df_last_5_years = pd.DataFrame()
+
+    def set_window(self, df_last_5_years):
+        """
+        Use the app's shared last-5-years window (see `PublicationWindow`) for all plots.
+        """
+        self.df_last_5_years = df_last_5_years
         
+    @timed("render_line_graph")
     def render_line_graph(self):
         """
         Render a line graph showing monthly publication trends over the last 5 years.
         """
-        if hasattr(self, 'df_last_5_years') and not self.df_last_5_years.empty:
+        get_recorder().add(rows=len(self.df_last_5_years))
+        if not self.df_last_5_years.empty:
+            import plotly.express as px
             monthly_counts_last_5_years, _ = DataProcessor.aggregate_counts(self.df_last_5_years)
             grouped_counts_last_5_years = monthly_counts_last_5_years.copy()
             grouped_counts_last_5_years['Year'] = grouped_counts_last_5_years['Year'].astype(int)
@@ -52,11 +59,6 @@ class Plotter:
             grouped_counts_last_5_years['Count'] = grouped_counts_last_5_years['Count'].fillna(0)
             grouped_counts_last_5_years['YearMonth'] = grouped_counts_last_5_years['YearMonth'].astype(str)
 
-            # Filter for the last 5 years
-            grouped_counts_last_5_years = grouped_counts_last_5_years[
-                grouped_counts_last_5_years['Year'] >= (self.current_year - 4)
-            ]
-
             # Line Graph for the Last 5 Years
             st.subheader("Publication Trends (Last 5 Years)")
             fig = px.line(
@@ -90,11 +92,14 @@ class Plotter:
         else:
             st.warning("No publication data available for rendering trends over the last 5 years.")
             
+    @timed("render_violin_plot")
     def render_violin_plot(self):
         """
         Render a violin plot showing SNIP distribution by year for the last 5 years.
         """
-        if hasattr(self, 'df_last_5_years') and not self.df_last_5_years.empty:
+        get_recorder().add(rows=len(self.df_last_5_years))
+        if not self.df_last_5_years.empty:
+            import plotly.express as px
             st.header("Violin Plot of SNIP Distribution (Last 5 Years)")
 
             # Create violin plot
@@ -131,6 +136,8 @@ class Plotter:
         """
         Filter the network to include only edges with weight >= min_collaborations.
 
+        Thin wrapper over `network_analytics.filter_adjacency` for callers that hold a networkx graph.
+
         Args:
             network (networkx.Graph): The original coauthor network graph.
             min_collaborations (int): Minimum number of collaborations to keep an edge.
@@ -138,25 +145,38 @@ class Plotter:
         Returns:
             networkx.Graph: A filtered graph with edges meeting the minimum collaboration criteria.
         """
+        import networkx as nx
+        from scipy import sparse
+
+        if network.number_of_nodes() == 0:
+            return nx.Graph()
+        names = pd.Index(list(network.nodes))
+        adjacency = nx.to_scipy_sparse_array(network, nodelist=names, weight="weight", format="csr")
+        adjacency, names = filter_adjacency(adjacency, names, min_collaborations)
+        upper = sparse.triu(adjacency).tocoo()  # keeps self-loops, which the legacy builder can produce
         filtered_network = nx.Graph()
-        for u, v, data in network.edges(data=True):
-            if data.get("weight", 0) >= min_collaborations:
-                filtered_network.add_edge(u, v, weight=data["weight"])
+        filtered_network.add_weighted_edges_from(zip(names[upper.row], names[upper.col], upper.data.tolist()))
         return filtered_network
             
+    @timed("render_coauthor_network")
     def render_coauthor_network(self):
         """
-        Render a coauthor network visualization for the last 5 years.
+        Render a coauthor network visualization for the last 5 years, with a
+        sortable table of each author's degree, strength, betweenness and community.
         """
-        if hasattr(self, 'df_last_5_years') and 'author_names' in self.df_last_5_years.columns:
+        get_recorder().add(rows=len(self.df_last_5_years))
+        if 'author_names' in self.df_last_5_years.columns:
+            import networkx as nx
+            from matplotlib import pyplot as plt
             st.write("### Co-Author Network Visualization (Last 5 Years)")
 
-            # Build the co-author network
-            coauthor_network = NetworkBuilder.build_coauthor_network(self.df_last_5_years)
-
             # Filter by minimum collaborations dynamically using a slider
             min_collaborations = st.slider("Minimum Collaborations to Display", 1, 10, 4)
-            filtered_coauthor_network = self.filter_network(coauthor_network, min_collaborations=min_collaborations)
+
+            # Build the filtered co-author network and its analytics, cached per graph and threshold
+            analytics = get_network_analytics_cache().get(self.df_last_5_years, min_collaborations)
+            filtered_coauthor_network = analytics.graph()
+            graph_column, table_column = st.columns([3, 2])
 
             # Visualize the graph
             fig, ax = plt.subplots(figsize=(12, 10))
@@ -177,6 +197,19 @@ class Plotter:
 
             plt.title("Co-Author Network (Last 5 Years)", fontsize=14)
             plt.axis("off")  # Remove axes
-            st.pyplot(fig)
+            with graph_column:
+                st.pyplot(fig)
+
+            # Key collaborators and clusters
+            with table_column:
+                st.write("#### Network Analytics")
+                st.dataframe(analytics.table, hide_index=True)
+                if len(analytics):
+                    sampled = (f"estimated from {analytics.samples} of {len(analytics)} authors"
+                               if analytics.samples < len(analytics) else "exact")
+                    st.caption(
+                        f"{len(analytics)} authors in {analytics.communities} communities "
+                        f"(modularity {analytics.modularity:.2f}); betweenness {sampled}."
+                    )
         else:
             st.warning("No author data available for building the coauthor network. Please check the input data.")
@@ -1,7 +1,22 @@
+from argparse import Namespace
+from collections import OrderedDict
+import functools
+import hashlib
+import json
+import logging
 from pathlib import Path
 import re
-import streamlit as st
-import requests
+import threading
+import time
+import httpx
+import numpy as np
+from bibliometrics_1.http_client import get_http_client
+from bibliometrics_1.jobs import notify
+from bibliometrics_1.perf import timed
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_NAMES = ("label_encoder", "vectorizer", "model")
 
 class QueryConverter:
     @staticmethod
@@ -22,6 +37,7 @@ class QueryConverter:
         return input_query
 
     @staticmethod
+    @timed("convert_query")
     def convert_query(query, prompt_type, api_headers, openai_api_base):
         """
         Convert a query using a prompt and OpenAI API.
@@ -101,11 +117,160 @@ class QueryConverter:
             "max_tokens": 150
         }
         try:
-            response = requests.post(f"{openai_api_base}/chat/completions", headers=api_headers, json=payload)
+            response = get_http_client().post(
+                f"{openai_api_base}/chat/completions",
+                headers=api_headers,
+                json=payload,
+                timeout=httpx.Timeout(30.0, connect=5.0),
+            )
             response.raise_for_status()  # Raise an error for HTTP codes like 4XX/5XX
             response_data = response.json()
             if "choices" in response_data:
                 return response_data["choices"][0]["message"]["content"].strip().strip("```")
-        except requests.RequestException as e:
-            st.error(f"Error during OpenAI API request: {e}")
+        except httpx.HTTPError as e:
+            notify("error", f"Error during OpenAI API request: {e}")
         return None
+
+
+def custom_predict(y_prob, threshold, index):
+    """
+    Predict the most probable class, falling back to `index` (the "other" class)
+    wherever that class's probability is below `threshold`.
+
+    Args:
+        y_prob (np.ndarray): (n_samples, n_classes) class probabilities.
+        threshold (float): minimum probability to accept the top class.
+        index (int): class index used when the top class is below threshold.
+
+    Returns:
+        np.ndarray: predicted class indices.
+    """
+    y_pred = y_prob.argmax(axis=1)
+    y_pred[y_prob[np.arange(len(y_pred)), y_pred] < threshold] = index
+    return y_pred
+
+
+def save_artifacts(artifacts, run_dir):
+    """
+    Persist the trained artifacts returned by `train.train` for batch inference.
+    Objects are stored uncompressed so their arrays can be memory-mapped on load.
+    """
+    import joblib  # batch inference only
+
+    run_dir = Path(run_dir)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    for name in ARTIFACT_NAMES:
+        joblib.dump(artifacts[name], Path(run_dir, f"{name}.joblib"))
+    Path(run_dir, "args.json").write_text(json.dumps(vars(artifacts["args"]), indent=2, default=str))
+
+
+def load_artifacts(run_dir):
+    """
+    Load artifacts written by `save_artifacts`, memory-mapping their NumPy arrays.
+    """
+    import joblib  # batch inference only
+
+    run_dir = Path(run_dir)
+    artifacts = {name: joblib.load(Path(run_dir, f"{name}.joblib"), mmap_mode="r") for name in ARTIFACT_NAMES}
+    artifacts["args"] = Namespace(**json.loads(Path(run_dir, "args.json").read_text()))
+    return artifacts
+
+
+class Predictor:
+    """
+    Batch scorer for publication texts using trained artifacts.
+
+    Predictions are cached by text hash (LRU, shared by threads), so only unseen
+    texts in a batch are vectorized and scored.
+    """
+    def __init__(self, artifacts, preprocess=None, cache_size=100_000):
+        self.vectorizer = artifacts["vectorizer"]
+        self.model = artifacts["model"]
+        self.label_encoder = artifacts["label_encoder"]
+        self.threshold = artifacts["args"].threshold
+        self.other_index = self.label_encoder.class_to_index["other"]
+        self.preprocess = preprocess
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(text):
+        return hashlib.sha1(text.encode("utf-8")).digest()
+
+    def predict(self, texts):
+        """
+        Score one batch of texts.
+
+        Args:
+            texts (list): raw publication texts.
+
+        Returns:
+            list: predicted tags, aligned with `texts`.
+        """
+        keys = [self._key(text) for text in texts]
+        tags = [None] * len(texts)
+        misses = []
+        with self.lock:
+            for i, key in enumerate(keys):
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    tags[i] = self.cache[key]
+                else:
+                    misses.append(i)
+
+        if misses:
+            batch = [texts[i] for i in misses]
+            if self.preprocess is not None:
+                batch = [self.preprocess(text) for text in batch]
+            y_prob = self.model.predict_proba(self.vectorizer.transform(batch))
+            y_pred = custom_predict(y_prob=y_prob, threshold=self.threshold, index=self.other_index)
+            predicted = self.label_encoder.decode(y_pred)
+            with self.lock:
+                for i, tag in zip(misses, predicted):
+                    tags[i] = tag
+                    self.cache[keys[i]] = tag
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return tags
+
+    def predict_stream(self, texts, batch_size=1024):
+        """
+        Score an iterable of texts in batches, logging throughput when exhausted.
+
+        Args:
+            texts (Iterable[str]): texts to score; consumed lazily.
+            batch_size (int, optional): texts per batch. Defaults to 1024.
+
+        Yields:
+            list: predicted tags for each batch.
+        """
+        start = time.perf_counter()
+        num_docs = 0
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) == batch_size:
+                yield self.predict(batch)
+                num_docs += len(batch)
+                batch = []
+        if batch:
+            yield self.predict(batch)
+            num_docs += len(batch)
+        elapsed = time.perf_counter() - start
+        self.docs_per_second = num_docs / elapsed if elapsed else float("inf")
+        logger.info(f"Scored {num_docs} documents in {elapsed:.2f}s ({self.docs_per_second:,.0f} docs/s)")
+
+
+@functools.lru_cache(maxsize=4)
+def get_predictor(run_dir):
+    """
+    Return a `Predictor` for `run_dir`, loading its artifacts only once per process.
+    Texts are cleaned with the same options the model was trained with.
+    """
+    from bibliometrics_1.data import clean_text  # data imports this module
+
+    artifacts = load_artifacts(run_dir)
+    args = artifacts["args"]
+    preprocess = functools.partial(clean_text, lower=getattr(args, "lower", True), stem=getattr(args, "stem", False))
+    return Predictor(artifacts, preprocess=preprocess)
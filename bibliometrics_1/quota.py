@@ -0,0 +1,142 @@
+#Process-wide rate limiting and quota accounting for the Elsevier (Scopus, SerialTitle) APIs
+import datetime
+import random
+import threading
+import time
+
+from pybliometrics.exception import Scopus429Error, ScopusServerError
+from requests.exceptions import ConnectionError, RetryError, Timeout
+
+from bibliometrics_1.http_client import TokenBucket
+
+# Published Elsevier limits per API key: requests per second and requests per week
+ELSEVIER_LIMITS = {
+    "ScopusSearch": {"rate": 9.0, "weekly": 20000},
+    "SerialTitle": {"rate": 6.0, "weekly": 20000},
+}
+
+
+class QuotaExhausted(Exception):
+    """Raised when the weekly quota is used up and will not reset within the wait budget."""
+
+
+# Failures worth retrying later. Results for these must never be cached as misses.
+# pybliometrics' session retries 5xx through urllib3, so a persistent 5xx surfaces as RetryError.
+TRANSIENT_ERRORS = (Scopus429Error, ScopusServerError, QuotaExhausted, ConnectionError, RetryError, Timeout)
+
+
+class ElsevierQuota:
+    """
+    Token bucket shared by every session in the process for one Elsevier API.
+
+    Calls wait for a token instead of failing. A 429 halves the request rate and
+    queues the call for a jittered retry; each success nudges the rate back up
+    (additive increase, multiplicative decrease). Remaining-quota and reset headers
+    from the last real request are kept for display.
+    """
+
+    def __init__(self, api, rate, weekly, min_rate=0.25, max_wait=120.0):
+        self.api = api
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.max_wait = max_wait
+        self.weekly = weekly
+        self.bucket = TokenBucket(rate, burst=max(rate, 1.0))
+        self.remaining = None
+        self.reset_at = None
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def _slow_down(self):
+        with self.lock:
+            self.throttled += 1
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+
+    def _speed_up(self):
+        with self.lock:
+            if self.bucket.rate < self.max_rate:
+                self.bucket.set_rate(min(self.max_rate, self.bucket.rate + 0.5))
+
+    def _record_headers(self, result):
+        """
+        Pick up X-RateLimit-Remaining / X-RateLimit-Reset from a pybliometrics object.
+        Objects served from the pybliometrics file cache carry no headers.
+        """
+        try:
+            remaining = result.get_key_remaining_quota()
+            reset = result.get_key_reset_time()
+        except (AttributeError, KeyError):
+            return
+        with self.lock:
+            if remaining is not None:
+                self.remaining = int(remaining)
+            if reset is not None:
+                self.reset_at = datetime.datetime.strptime(reset, "%Y-%m-%d %H:%M:%S")
+
+    def _seconds_until_reset(self):
+        if self.reset_at is None:
+            return None
+        return (self.reset_at - datetime.datetime.now()).total_seconds()
+
+    def call(self, fn):
+        """
+        Run `fn` (a pybliometrics request) under this API's rate limit.
+
+        Args:
+            fn (callable): Zero-argument callable performing the request.
+
+        Returns:
+            The value returned by `fn`.
+
+        Raises:
+            QuotaExhausted: If the weekly quota is spent and resets after `max_wait`.
+            Scopus429Error: If throttling persists for longer than `max_wait`.
+        """
+        waited = 0.0
+        delay = 1.0
+        while True:
+            reset_in = self._seconds_until_reset()
+            if self.remaining == 0 and reset_in is not None and reset_in > self.max_wait:
+                raise QuotaExhausted(f"{self.api} weekly quota exhausted until {self.reset_at}.")
+            self.bucket.acquire()
+            try:
+                result = fn()
+            except Scopus429Error:
+                self._slow_down()
+                if waited >= self.max_wait:
+                    raise
+                pause = delay + random.uniform(0, delay)
+                time.sleep(pause)
+                waited += pause
+                delay = min(delay * 2, 30.0)
+                continue
+            self._speed_up()
+            self._record_headers(result)
+            return result
+
+    def status(self):
+        """
+        Snapshot of the quota state for display.
+        """
+        with self.lock:
+            return {
+                "remaining": self.remaining,
+                "weekly": self.weekly,
+                "reset_at": self.reset_at,
+                "rate": round(self.bucket.rate, 2),
+                "throttled": self.throttled,
+            }
+
+
+QUOTAS = {api: ElsevierQuota(api, limits["rate"], limits["weekly"]) for api, limits in ELSEVIER_LIMITS.items()}
+
+
+def get_quota(api):
+    """
+    Return the process-wide quota manager for `api` ("ScopusSearch" or "SerialTitle").
+    """
+    return QUOTAS[api]
+
+
+def quota_status():
+    return {api: quota.status() for api, quota in QUOTAS.items()}
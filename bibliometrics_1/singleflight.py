@@ -0,0 +1,120 @@
+#Request coalescing: concurrent lookups for the same key share one in-flight fetch
+import hashlib
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+
+try:  # File locks are POSIX only; elsewhere coalescing stays within the process
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Set to a shared directory to also coalesce across processes (e.g. several Streamlit servers)
+LOCK_DIR_ENV = "BIBLIOMETRICS_SINGLEFLIGHT_DIR"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Run at most one fetch per key at a time. Threads asking for a key that is
+    already being fetched wait for that fetch and receive its result (or error).
+
+    With `lock_dir` set, the fetch additionally runs under an exclusive file lock
+    and its result is written next to the lock for `result_ttl` seconds, so a
+    process that queued behind another process's fetch reads the result instead
+    of fetching again. Results the caller marks as not cacheable (transient
+    failures) are shared with concurrent waiters but never written.
+    """
+
+    def __init__(self, lock_dir=None, result_ttl=60.0):
+        self.lock_dir = Path(lock_dir) if lock_dir and fcntl is not None else None
+        self.result_ttl = result_ttl
+        self._calls = {}
+        self._lock = threading.Lock()
+        if self.lock_dir is not None:
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+
+    def do(self, key, fn, cacheable=None):
+        """
+        Return `fn()`, sharing the call with any concurrent caller using the same key.
+
+        Args:
+            key (tuple): Hashable key identifying the lookup, e.g. ("snip", issn, year).
+            fn (callable): Zero-argument callable performing the fetch.
+            cacheable (callable, optional): `cacheable(result)` is False for results
+                other processes must not reuse. Defaults to keeping every result.
+
+        Returns:
+            The fetch result. Exceptions raised by `fn` propagate to every waiter.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn, cacheable)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def _run(self, key, fn, cacheable):
+        if self.lock_dir is None:
+            return fn()
+
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        lock_path = Path(self.lock_dir, f"{digest}.lock")
+        result_path = Path(self.lock_dir, f"{digest}.pkl")
+        with open(lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    if time.time() - result_path.stat().st_mtime < self.result_ttl:
+                        with open(result_path, "rb") as fh:
+                            return pickle.load(fh)
+                except (OSError, pickle.UnpicklingError, EOFError):
+                    pass
+                result = fn()
+                if cacheable is not None and not cacheable(result):
+                    return result
+                tmp_path = result_path.with_suffix(f".{os.getpid()}.tmp")
+                try:
+                    with open(tmp_path, "wb") as fh:
+                        pickle.dump(result, fh)
+                    os.replace(tmp_path, result_path)
+                except (OSError, pickle.PicklingError, TypeError):
+                    if tmp_path.exists():
+                        tmp_path.unlink()
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_single_flight = SingleFlight(lock_dir=os.environ.get(LOCK_DIR_ENV))
+
+
+def get_single_flight():
+    """
+    Return the process-wide `SingleFlight` shared by all Streamlit sessions.
+    """
+    return _single_flight
@@ -1,94 +1,264 @@
+import hashlib
 import json
+import logging
+import os
+import shutil
+import tempfile
+import time
 from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from typing import Dict
 
+import joblib
 import mlflow
 import numpy as np
 import optuna
 import pandas as pd
-from imblearn.over_sampling import RandomOverSampler
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import SGDClassifier
 from sklearn.metrics import log_loss
 
-from config.config import logger
+from config import config
 from bibliometrics_1 import data, evaluate, predict, utils
 
+logger = logging.getLogger(__name__)
 
-def train(args: Namespace, df: pd.DataFrame, trial: optuna.trial._trial.Trial = None) -> Dict:
-    """Train model on data.
+# Arguments that change the feature matrices or the splits; everything else can reuse a cached set
+FEATURE_ARGS = (
+    "shuffle", "subset", "lower", "stem", "min_freq", "analyzer", "ngram_max_range", "train_size", "seed",
+)
+
+
+def oversample_indices(y: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Row indices that oversample every class up to the majority class count.
+    Equivalent to `RandomOverSampler(sampling_strategy="all")`, but only the
+    index array is materialized, never a resampled copy of the feature matrix.
     Args:
-        args (Namespace): arguments to use for training.
-        df (pd.DataFrame): data for training.
+        y (np.ndarray): encoded labels.
+        rng (np.random.Generator): random generator.
+    Returns:
+        np.ndarray: indices into `y` (original rows plus resampled minority rows).
+    """
+    classes, counts = np.unique(y, return_counts=True)
+    target = counts.max()
+    indices = [np.arange(len(y))]
+    for _class, count in zip(classes, counts):
+        if count < target:
+            indices.append(rng.choice(np.flatnonzero(y == _class), size=target - count, replace=True))
+    return np.concatenate(indices)
+
+
+def fit_model(
+    args: Namespace,
+    model: SGDClassifier,
+    X_train,
+    y_train: np.ndarray,
+    X_val,
+    y_val: np.ndarray,
+    trial: optuna.trial._trial.Trial = None,
+) -> SGDClassifier:
+    """Mini-batch training over shuffled, class-balanced index batches.
+    Args:
+        args (Namespace): arguments (num_epochs, batch_size, eval_interval, eval_sample_size).
+        model (SGDClassifier): model to train with `partial_fit`.
+        X_train: sparse training features.
+        y_train (np.ndarray): training labels.
+        X_val: sparse validation features.
+        y_val (np.ndarray): validation labels.
         trial (optuna.trial._trial.Trial, optional): optimization trial. Defaults to None.
     Raises:
         optuna.TrialPruned: early stopping of trial if it's performing poorly.
     Returns:
-        Dict: artifacts from the run.
+        SGDClassifier: the trained model.
     """
+    rng = np.random.default_rng(getattr(args, "seed", 42))
+    batch_size = getattr(args, "batch_size", 32768)
+    eval_interval = getattr(args, "eval_interval", 10)
+    eval_sample_size = getattr(args, "eval_sample_size", 5000)
+    classes = np.unique(y_train)
 
-    # Setup
-    utils.set_seeds()
+    # Losses are tracked on fixed subsamples instead of the full train/val sets
+    train_eval = rng.choice(len(y_train), size=min(eval_sample_size, len(y_train)), replace=False)
+    val_eval = rng.choice(len(y_val), size=min(eval_sample_size, len(y_val)), replace=False)
+    X_train_eval, y_train_eval = X_train[train_eval], y_train[train_eval]
+    X_val_eval, y_val_eval = X_val[val_eval], y_val[val_eval]
+
+    if not trial:
+        config.configure_mlflow()
+    sample_indices = oversample_indices(y_train, rng)
+    for epoch in range(args.num_epochs):
+        rng.shuffle(sample_indices)
+        for start in range(0, len(sample_indices), batch_size):
+            # Sorted rows make the CSR row gather sequential; SGD order within a batch barely matters
+            batch = np.sort(sample_indices[start : start + batch_size])
+            model.partial_fit(X_train[batch], y_train[batch], classes=classes)
+
+        if epoch % eval_interval and epoch != args.num_epochs - 1:
+            continue
+        train_loss = log_loss(y_train_eval, model.predict_proba(X_train_eval), labels=classes)
+        val_loss = log_loss(y_val_eval, model.predict_proba(X_val_eval), labels=classes)
+        logger.info(
+            f"Epoch: {epoch:02d} | "
+            f"train_loss: {train_loss:.5f}, "
+            f"val_loss: {val_loss:.5f}"
+        )
+
+        # Log
+        if not trial:
+            mlflow.log_metrics({"train_loss": train_loss, "val_loss": val_loss}, step=epoch)
+
+        # Pruning (for optimization in next section)
+        if trial:  # pragma: no cover, optuna pruning
+            trial.report(val_loss, epoch)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+
+    return model
+
+
+def _save_csr(path: Path, matrix: sparse.csr_matrix) -> None:
+    for name in ("data", "indices", "indptr"):
+        np.save(Path(path, f"{name}.npy"), getattr(matrix, name))
+    Path(path, "shape.json").write_text(json.dumps(matrix.shape))
+
+
+def _load_csr(path: Path) -> sparse.csr_matrix:
+    arrays = [np.load(Path(path, f"{name}.npy"), mmap_mode="r") for name in ("data", "indices", "indptr")]
+    shape = tuple(json.loads(Path(path, "shape.json").read_text()))
+    return sparse.csr_matrix(tuple(arrays), shape=shape, copy=False)
+
+
+def feature_cache_key(args: Namespace, df: pd.DataFrame) -> str:
+    """Cache key for the feature matrices: the feature arguments plus a fingerprint of the data.
+    Args:
+        args (Namespace): arguments to use for training.
+        df (pd.DataFrame): raw data for training.
+    Returns:
+        str: hex digest.
+    """
+    params = {name: getattr(args, name, None) for name in FEATURE_ARGS}
+    fingerprint = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(fingerprint.tobytes())
+    return digest.hexdigest()
+
+
+def compute_features(args: Namespace, df: pd.DataFrame) -> Dict:
+    """Preprocess, split and vectorize the data.
+    Args:
+        args (Namespace): arguments to use for training.
+        df (pd.DataFrame): data for training.
+    Returns:
+        Dict: feature matrices, labels, fitted label encoder and vectorizer, and the test frame.
+    """
     if args.shuffle:
         df = df.sample(frac=1).reset_index(drop=True)
     df = df[: args.subset]  # None = all samples
     df = data.preprocess(df, lower=args.lower, stem=args.stem, min_freq=args.min_freq)
     label_encoder = data.LabelEncoder().fit(df.tag)
-    X_train, X_val, X_test, y_train, y_val, y_test = data.get_data_splits(
-        X=df.text.to_numpy(), y=label_encoder.encode(df.tag)
+    y = label_encoder.encode(df.tag)
+    train_idx, val_idx, test_idx = data.get_data_splits(
+        y, train_size=getattr(args, "train_size", 0.7), seed=getattr(args, "seed", 42)
     )
-    test_df = pd.DataFrame({"text": X_test, "tag": label_encoder.decode(y_test)})
+    text = df.text.to_numpy()
+    test_df = df.iloc[test_idx].reset_index(drop=True)  # test rows only, for slicing
 
     # Tf-idf
     vectorizer = TfidfVectorizer(
         analyzer=args.analyzer, ngram_range=(2, args.ngram_max_range)
     )  # char n-grams
-    X_train = vectorizer.fit_transform(X_train)
-    X_val = vectorizer.transform(X_val)
-    X_test = vectorizer.transform(X_test)
+    return {
+        "X_train": vectorizer.fit_transform(text[train_idx]).tocsr(),
+        "X_val": vectorizer.transform(text[val_idx]).tocsr(),
+        "X_test": vectorizer.transform(text[test_idx]).tocsr(),
+        "y_train": y[train_idx],
+        "y_val": y[val_idx],
+        "y_test": y[test_idx],
+        "label_encoder": label_encoder,
+        "vectorizer": vectorizer,
+        "test_df": test_df,
+    }
+
 
-    # Oversample
-    oversample = RandomOverSampler(sampling_strategy="all")
-    X_over, y_over = oversample.fit_resample(X_train, y_train)
+def get_features(args: Namespace, df: pd.DataFrame, cache_dir: Path = None) -> Dict:
+    """Feature matrices for `args`, computed once per feature configuration and reused
+    from disk (memory-mapped) by later runs and by every Optuna trial that repeats it.
+    Args:
+        args (Namespace): arguments to use for training.
+        df (pd.DataFrame): raw data for training.
+        cache_dir (Path, optional): cache root. Defaults to config.FEATURES_DIR.
+    Returns:
+        Dict: see `compute_features`.
+    """
+    cache_dir = Path(cache_dir or config.FEATURES_DIR)
+    entry = Path(cache_dir, feature_cache_key(args, df))
+    if not entry.exists():
+        features = compute_features(args, df)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(dir=cache_dir, prefix=".tmp-"))
+        for split in ("X_train", "X_val", "X_test"):
+            Path(tmp_dir, split).mkdir()
+            _save_csr(Path(tmp_dir, split), features[split])
+        for split in ("y_train", "y_val", "y_test"):
+            np.save(Path(tmp_dir, f"{split}.npy"), features[split])
+        joblib.dump(
+            {name: features[name] for name in ("label_encoder", "vectorizer", "test_df")},
+            Path(tmp_dir, "objects.joblib"),
+        )
+        try:
+            os.rename(tmp_dir, entry)  # atomic; a concurrent worker may have won the race
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
 
-    # Model
+    features = joblib.load(Path(entry, "objects.joblib"))
+    for split in ("X_train", "X_val", "X_test"):
+        features[split] = _load_csr(Path(entry, split))
+    for split in ("y_train", "y_val", "y_test"):
+        features[split] = np.load(Path(entry, f"{split}.npy"), mmap_mode="r")
+    return features
+
+
+def train(args: Namespace, df: pd.DataFrame, trial: optuna.trial._trial.Trial = None) -> Dict:
+    """Train model on data.
+    Args:
+        args (Namespace): arguments to use for training.
+        df (pd.DataFrame): data for training.
+        trial (optuna.trial._trial.Trial, optional): optimization trial. Defaults to None.
+    Raises:
+        optuna.TrialPruned: early stopping of trial if it's performing poorly.
+    Returns:
+        Dict: artifacts from the run.
+    """
+
+    # Setup
+    utils.set_seeds()
+    features = get_features(args, df)
+    label_encoder, vectorizer, test_df = (
+        features["label_encoder"], features["vectorizer"], features["test_df"]
+    )
+    X_train, X_val, X_test = features["X_train"], features["X_val"], features["X_test"]
+    y_train, y_val, y_test = features["y_train"], features["y_val"], features["y_test"]
+
+    # Model (class balancing happens through oversampled indices in fit_model)
     model = SGDClassifier(
-        loss="log",
+        loss="log_loss",
         penalty="l2",
         alpha=args.alpha,
-        max_iter=1,
         learning_rate="constant",
         eta0=args.learning_rate,
         power_t=args.power_t,
-        warm_start=True,
+        n_jobs=getattr(args, "n_jobs", -1),  # one-vs-all classes are fit in parallel
     )
 
     # Training
-    for epoch in range(args.num_epochs):
-        model.fit(X_over, y_over)
-        train_loss = log_loss(y_train, model.predict_proba(X_train))
-        val_loss = log_loss(y_val, model.predict_proba(X_val))
-        if not epoch % 10:
-            logger.info(
-                f"Epoch: {epoch:02d} | "
-                f"train_loss: {train_loss:.5f}, "
-                f"val_loss: {val_loss:.5f}"
-            )
-
-        # Log
-        if not trial:
-            mlflow.log_metrics({"train_loss": train_loss, "val_loss": val_loss}, step=epoch)
-
-        # Pruning (for optimization in next section)
-        if trial:  # pragma: no cover, optuna pruning
-            trial.report(val_loss, epoch)
-            if trial.should_prune():
-                raise optuna.TrialPruned()
+    model = fit_model(args, model, X_train, y_train, X_val, y_val, trial=trial)
 
     # Threshold
-    y_pred = model.predict(X_val)
     y_prob = model.predict_proba(X_val)
-    args.threshold = np.quantile([y_prob[i][j] for i, j in enumerate(y_pred)], q=0.25)  # Q1
+    y_pred = y_prob.argmax(axis=1)  # column of the predicted class, as in model.predict
+    args.threshold = np.quantile(y_prob[np.arange(len(y_pred)), y_pred], q=0.25)  # Q1
 
     # Evaluation
     other_index = label_encoder.class_to_index["other"]
@@ -132,4 +302,79 @@ def objective(args: Namespace, df: pd.DataFrame, trial: optuna.trial._trial.Tria
     trial.set_user_attr("recall", overall_performance["recall"])
     trial.set_user_attr("f1", overall_performance["f1"])
 
-    return overall_performance["f1"]
\ No newline at end of file
+    return overall_performance["f1"]
+
+
+def _optimize_worker(args: Namespace, df: pd.DataFrame, study_name: str, storage: str, num_trials: int) -> int:
+    """Run `num_trials` trials of a shared study in this process.
+    Returns:
+        int: number of trials run.
+    """
+    study = optuna.load_study(study_name=study_name, storage=_rdb_storage(storage))
+    study.optimize(
+        lambda trial: objective(Namespace(**vars(args)), df, trial),  # fresh args per trial
+        n_trials=num_trials,
+    )
+    return num_trials
+
+
+def _rdb_storage(storage: str) -> optuna.storages.RDBStorage:
+    # SQLite serializes writers; wait for the lock instead of failing the trial
+    engine_kwargs = {"connect_args": {"timeout": 60}} if storage.startswith("sqlite") else {}
+    return optuna.storages.RDBStorage(url=storage, engine_kwargs=engine_kwargs)
+
+
+def optimize(
+    args: Namespace,
+    df: pd.DataFrame,
+    study_name: str = "optimization",
+    num_trials: int = 20,
+    num_workers: int = None,
+    storage: str = None,
+) -> optuna.study.Study:
+    """Run an Optuna study with trials spread over worker processes.
+    Workers share the study through `storage` (SQLite by default) and the
+    on-disk feature cache, so repeated (analyzer, ngram_max_range) pairs are
+    vectorized once.
+    Args:
+        args (Namespace): base arguments; tuned parameters are overwritten per trial.
+        df (pd.DataFrame): data for training.
+        study_name (str, optional): study name. Defaults to "optimization".
+        num_trials (int, optional): total number of trials. Defaults to 20.
+        num_workers (int, optional): worker processes. Defaults to the number of cores.
+        storage (str, optional): Optuna storage URL. Defaults to config.OPTUNA_STORAGE.
+    Returns:
+        optuna.study.Study: the study, with throughput recorded in its user attributes.
+    """
+    storage = config.ensure_sqlite_dir(storage or config.OPTUNA_STORAGE)
+    num_workers = max(1, min(num_workers or os.cpu_count() or 1, num_trials))
+    pruner = optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=5)
+    study = optuna.create_study(
+        study_name=study_name,
+        storage=_rdb_storage(storage),
+        direction="maximize",
+        pruner=pruner,
+        load_if_exists=True,
+    )
+
+    # Split trials across workers as evenly as possible
+    per_worker = [num_trials // num_workers + (i < num_trials % num_workers) for i in range(num_workers)]
+    start = time.perf_counter()
+    if num_workers == 1:
+        _optimize_worker(args, df, study_name, storage, num_trials)
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            futures = [
+                pool.submit(_optimize_worker, args, df, study_name, storage, n) for n in per_worker
+            ]
+            for future in futures:
+                future.result()
+    elapsed = time.perf_counter() - start
+
+    trials_per_minute = 60 * num_trials / elapsed
+    study.set_user_attr("trials_per_minute", trials_per_minute)
+    logger.info(
+        f"{num_trials} trials on {num_workers} workers in {elapsed:.1f}s "
+        f"({trials_per_minute:.2f} trials/min)"
+    )
+    return study
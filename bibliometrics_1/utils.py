@@ -1,20 +1,47 @@
 from itertools import combinations
+import logging
 import os
+import random
+from pathlib import Path
 import numpy as np
 import pandas as pd
 import streamlit as st
-import networkx as nx
-from pybliometrics.scopus import SerialTitle, ScopusSearch, init, create_config
+from bibliometrics_1.perf import get_recorder, timed
+from bibliometrics_1.quota import TRANSIENT_ERRORS, get_quota
+from bibliometrics_1.singleflight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+def set_seeds(seed=42):
+    """
+    Set seeds for reproducibility.
+    """
+    np.random.seed(seed)
+    random.seed(seed)
 
 class ConfigManager:
     @staticmethod
     def setup_pybliometrics(config_path, scopus_api_key):
+        if not scopus_api_key:
+            st.warning("No SCOPUS_API_KEY provided. Check your configuration.")
+        ConfigManager.init_pybliometrics(config_path, scopus_api_key)
+
+    @staticmethod
+    @st.cache_resource(show_spinner=False)
+    def init_pybliometrics(config_path, scopus_api_key):
+        """
+        Write the pybliometrics config (only if the key changed) and initialise
+        pybliometrics. Cached as a resource, so it runs once per process and key
+        rather than on every script rerun.
+        """
+        from pybliometrics.scopus import create_config, init
+        config_path = Path(config_path)
         if scopus_api_key:
             os.environ["SCOPUS_API_KEY"] = scopus_api_key
-            create_config(config_dir=config_path, keys=[scopus_api_key])
-        else:
-            st.warning("No SCOPUS_API_KEY provided. Check your configuration.")
+            if not config_path.exists() or scopus_api_key not in config_path.read_text():
+                create_config(config_dir=config_path, keys=[scopus_api_key])
         init(config_path=config_path)
+        return True
 
     @staticmethod
     def get_openai_headers(api_key):
@@ -25,32 +52,60 @@ class ConfigManager:
     
 class SNIPManager:
     snip_cache = {}  # Class-level cache for SNIP values
+    pending = set()  # (ISSN, year) keys whose last lookup failed transiently; retried on the next call
 
     @staticmethod
+    @timed("get_snip")
     def get_snip(journal_issn, pub_year):
         key = (journal_issn, pub_year)
         if key in SNIPManager.snip_cache:  # Corrected reference to class-level snip_cache
+            get_recorder().add(cache_hits=1)
             return SNIPManager.snip_cache[key]
+        get_recorder().add(cache_misses=1)
         if pd.isna(journal_issn) or str(journal_issn).strip() == "" or pd.isna(pub_year):
             SNIPManager.snip_cache[key] = np.nan  # Corrected reference to class-level snip_cache
             return np.nan
+        snip, cacheable = get_single_flight().do(
+            ("snip", str(journal_issn), pub_year),
+            lambda: SNIPManager.fetch_snip(journal_issn, pub_year),
+            cacheable=lambda result: result[1],  # transient failures are retried, not shared for result_ttl
+        )
+        if cacheable:
+            SNIPManager.snip_cache[key] = snip  # Corrected reference to class-level snip_cache
+            SNIPManager.pending.discard(key)
+        else:
+            SNIPManager.pending.add(key)
+        return snip
+
+    @staticmethod
+    def fetch_snip(journal_issn, pub_year):
+        """
+        Look up the SNIP for one (ISSN, year) from the SerialTitle API.
+
+        Returns:
+            tuple: (snip, cacheable). Transient failures return (np.nan, False).
+        """
+        from pybliometrics.scopus import SerialTitle
         try:
-            st_obj = SerialTitle(str(journal_issn), refresh=True, view='ENHANCED')
+            st_obj = get_quota("SerialTitle").call(
+                lambda: SerialTitle(str(journal_issn), refresh=True, view='ENHANCED')
+            )
             if st_obj.sniplist and len(st_obj.sniplist) > 0:
                 for yr, snip in st_obj.sniplist:
                     if yr == pub_year:
-                        SNIPManager.snip_cache[key] = snip  # Corrected reference to class-level snip_cache
-                        return snip
+                        return snip, True
                 latest_snip = max(st_obj.sniplist, key=lambda x: x[0])[1]
-                SNIPManager.snip_cache[key] = latest_snip  # Corrected reference to class-level snip_cache
-                return latest_snip
+                return latest_snip, True
             else:
-                SNIPManager.snip_cache[key] = np.nan  # Corrected reference to class-level snip_cache
-                return np.nan
+                return np.nan, True
+        except TRANSIENT_ERRORS as e:
+            # Rate limits, server errors and timeouts are not misses; leave them uncached so a later call retries
+            logger.info(f"SNIP lookup for ISSN {journal_issn} failed, will retry: {e!r}", extra={"sample_key": "snip_transient"})
+            return np.nan, False
         except Exception as e:
-            # st.error(f"Error retrieving SNIP for ISSN {journal_issn}: {e}")
-            SNIPManager.snip_cache[key] = np.nan  # Corrected reference to class-level snip_cache
-            return np.nan
+            # Unknown ISSN (Scopus404Error) or unparsable record: a true miss
+            logger.info(f"No SNIP for ISSN {journal_issn}: {e!r}", extra={"sample_key": "snip_miss"})
+            return np.nan, True
         
 class NetworkBuilder:
     @staticmethod
@@ -65,6 +120,7 @@ class NetworkBuilder:
         return name  # Assume format is already "Firstname Lastname"
     
     @staticmethod
+    @timed("build_coauthor_network")
     def build_coauthor_network(df):
         """
         Build a coauthor network from a DataFrame containing author names.
@@ -79,6 +135,8 @@ class NetworkBuilder:
         if 'author_names' not in df.columns:
             raise ValueError("The DataFrame must contain an 'author_names' column.")
         
+        import networkx as nx
+        get_recorder().add(rows=len(df))
         G = nx.Graph()
 
         for authors in df['author_names']:
@@ -1,11 +1,23 @@
 # config.py
+"""
+Paths, storage URLs and logging. Importing this module only defines constants:
+logging is configured the first time `logger` is used (or `setup_logging` is
+called) and MLflow when `configure_mlflow` is called.
+"""
+import atexit
+import copy
+import datetime
+import json
 import logging
+import logging.config
+import os
+import queue
 import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
-import mlflow
-from rich.logging import RichHandler
-
 # Development Directories
 BASE_DIR = Path(__file__).parent.parent.absolute()
 CONFIG_DIR = Path(BASE_DIR, "config")
@@ -16,15 +28,31 @@ DATA_DIR = Path("/data/DATASCI")
 RAW_DATA = Path(DATA_DIR, "raw")
 INTERMEDIATE_DIR = Path(DATA_DIR, "intermediate")
 RESULTS_DIR = Path(DATA_DIR, "results")
+LAB_NOTEBOOK_DIR = Path(DATA_DIR, "lab_notebook")
+FEATURES_DIR = Path(INTERMEDIATE_DIR, "features")  # cached vectorized feature matrices
+PREPROCESSED_DIR = Path(INTERMEDIATE_DIR, "preprocessed")  # cached cleaned training text
+SPLITS_DIR = Path(INTERMEDIATE_DIR, "splits")  # persisted train/val/test indices
+JOURNAL_INDEX_DIR = Path(INTERMEDIATE_DIR, "journal_index")  # offline SNIP index from bulk source lists
 
 #Assets
 #Add assets here as needed.
 EXAMPLE_OUTPUT = Path(INTERMEDIATE_DIR, "Example_Output.csv")
 
-# MLFlow model registry
-mlflow.set_tracking_uri("http://localhost:5000")
+# MLFlow model registry (local SQLite store; set MLFLOW_TRACKING_URI to use a server)
+MLFLOW_TRACKING_URI = os.environ.get("MLFLOW_TRACKING_URI", f"sqlite:///{Path(LAB_NOTEBOOK_DIR, 'mlflow.db')}")
+
+# Optuna study storage, shared by parallel trial workers
+OPTUNA_STORAGE = os.environ.get("OPTUNA_STORAGE", f"sqlite:///{Path(LAB_NOTEBOOK_DIR, 'optuna.db')}")
 
 # Logger
+# Set to also write one JSON object per record to this file ("1" for logs/events.jsonl)
+LOG_JSON_ENV = "BIBLIOMETRICS_LOG_JSON"
+# Records logged with extra={"sample_key": ...}: the first LOG_SAMPLE_BURST per key
+# and LOG_SAMPLE_PERIOD seconds pass, then one in LOG_SAMPLE_EVERY; errors always pass
+LOG_SAMPLE_BURST = 10
+LOG_SAMPLE_EVERY = 100
+LOG_SAMPLE_PERIOD = 60.0
+
 logging_config = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -66,6 +94,198 @@ logging_config = {
         "propagate": True,
     },
 }
-logging.config.dictConfig(logging_config)
-logger = logging.getLogger()
-logger.handlers[0] = RichHandler(markup=True)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    One JSON object per record, for log shippers and `jq`.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key in ("sample_key", "suppressed"):
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Thin out high-frequency records, e.g. one warning per failed DOI of a large upload.
+
+    Only records logged with `extra={"sample_key": key}` are sampled, per key:
+    the first `burst` in each `period` seconds pass, then one in `every`. The
+    next record passed after some were dropped says how many.
+    """
+
+    def __init__(self, burst=LOG_SAMPLE_BURST, every=LOG_SAMPLE_EVERY, period=LOG_SAMPLE_PERIOD):
+        super().__init__()
+        self.burst = burst
+        self.every = every
+        self.period = period
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, "sample_key", None)
+        if key is None or record.levelno >= logging.ERROR:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            start, seen, dropped = self._counts.get(key, (now, 0, 0))
+            if now - start >= self.period:
+                start, seen = now, 0
+            seen += 1
+            passed = seen <= self.burst or (seen - self.burst) % self.every == 0
+            self._counts[key] = (start, seen, 0 if passed else dropped + 1)
+        if passed and dropped:
+            record.suppressed = dropped
+            record.msg = f"{record.msg} ({dropped} similar messages suppressed)"
+        return passed
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    `QueueHandler` that keeps a record's traceback apart from its message, so the
+    text files still print it and the JSON-lines file stores it under "exception".
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # Arguments and exc_info may hold objects that must not cross to the listener thread
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+_listener = None
+_mlflow_configured = False
+_setup_lock = threading.Lock()
+
+
+def setup_logging():
+    """
+    Configure the root logger once per process and return it.
+
+    The handlers of `logging_config` (Rich console, rotating info and error files,
+    and the JSON-lines file if $BIBLIOMETRICS_LOG_JSON is set) run on a
+    `QueueListener` thread. Callers only enqueue the record, so a log call from
+    a training loop or an enrichment thread never waits for disk I/O or Rich.
+
+    Returns:
+        logging.Logger: The root logger.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return logging.getLogger()
+        from rich.logging import RichHandler  # ~0.2s; only paid once something logs
+
+        LOGS_DIR.mkdir(parents=True, exist_ok=True)
+        # Copied one level down: the console handler holds sys.stdout, which deepcopy cannot copy
+        config = dict(logging_config, formatters=dict(logging_config["formatters"]),
+                      handlers=dict(logging_config["handlers"]),
+                      root=dict(logging_config["root"], handlers=list(logging_config["root"]["handlers"])))
+        json_path = os.environ.get(LOG_JSON_ENV)
+        if json_path:
+            config["formatters"]["json"] = {"()": JsonLinesFormatter}
+            config["handlers"]["json"] = {
+                "class": "logging.handlers.RotatingFileHandler",
+                "filename": Path(LOGS_DIR, "events.jsonl") if json_path == "1" else Path(json_path),
+                "maxBytes": 10485760,
+                "backupCount": 10,
+                "formatter": "json",
+                "level": logging.INFO,
+                "mode": "a+",
+            }
+            config["root"]["handlers"].append("json")
+        logging.config.dictConfig(config)
+        root = logging.getLogger()
+        handlers = list(root.handlers)
+        handlers[0] = RichHandler(markup=True)
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+
+        queue_handler = LogQueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(SamplingFilter())
+        root.addHandler(queue_handler)
+        _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_restart_listener_in_child)
+        return root
+
+
+def _stop_listener():
+    # Flushes the queue; registered with atexit so records logged just before exit are written
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def _restart_listener_in_child():
+    # A forked worker (e.g. an Optuna trial process) inherits the queue but not the listener thread
+    global _listener
+    if _listener is None:
+        return
+    queue_handler = next((h for h in logging.getLogger().handlers if isinstance(h, QueueHandler)), None)
+    if queue_handler is None:
+        return
+    queue_handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(queue_handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def ensure_sqlite_dir(uri):
+    """
+    Create the directory of a `sqlite:///` database URL; SQLite creates the file
+    but not missing parent directories. Other URLs are left alone.
+
+    Returns:
+        str: `uri`, unchanged.
+    """
+    if uri.startswith("sqlite:///"):
+        Path(uri[len("sqlite:///"):]).parent.mkdir(parents=True, exist_ok=True)
+    return uri
+
+
+def configure_mlflow():
+    """
+    Point MLflow at MLFLOW_TRACKING_URI unless a tracking URI was already set
+    (e.g. by a benchmark or notebook). Done on first use instead of at import.
+
+    Returns:
+        module: mlflow.
+    """
+    global _mlflow_configured
+    import mlflow
+
+    with _setup_lock:
+        if not _mlflow_configured:
+            if not getattr(mlflow, "is_tracking_uri_set", lambda: False)():
+                mlflow.set_tracking_uri(ensure_sqlite_dir(MLFLOW_TRACKING_URI))
+            _mlflow_configured = True
+    return mlflow
+
+
+def __getattr__(name):
+    # `from config.config import logger` (notebooks) configures logging on first use;
+    # app modules log through logging.getLogger(__name__) and entry points call setup_logging
+    if name == "logger":
+        return setup_logging()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -11,6 +11,8 @@ docs_packages = ["mkdocs==1.3.1", "mkdocstrings==0.18.1"]
 
 style_packages = ["black==22.6.0", "flake8==5.0.2", "isort==5.10.1"]
 
+test_packages = ["pytest"]
+
 dev_packages = ["mlflow", "pip-tools", "pandas"]
 
 # Define our package
@@ -24,5 +26,9 @@ setup(
     python_requires=">=3.7",
     packages=find_namespace_packages(),
     install_requires=[required_packages],
-    extras_require={"dev": docs_packages + style_packages + dev_packages, "docs": docs_packages},
+    extras_require={
+        "dev": docs_packages + style_packages + dev_packages + test_packages,
+        "docs": docs_packages,
+        "test": test_packages,
+    },
 )
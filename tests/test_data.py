@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from bibliometrics_1.data import LabelEncoder, get_data_splits, get_split_indices
+
+
+@pytest.fixture
+def labels():
+    # Classes of 20, 10 and 1 rows
+    return np.array([0] * 20 + [1] * 10 + [2], dtype=np.int32)
+
+
+def test_label_encoder_round_trip(tmp_path):
+    encoder = LabelEncoder().fit(["tag b", "tag a", "tag b", "other"])
+    assert encoder.classes == ["other", "tag a", "tag b"]
+    ids = encoder.encode(["tag b", "other", "tag a"])
+    assert ids.dtype == np.int32
+    assert encoder.decode(ids).tolist() == ["tag b", "other", "tag a"]
+    encoder.save(tmp_path / "label_encoder.json")
+    loaded = LabelEncoder.load(tmp_path / "label_encoder.json")
+    assert loaded.class_to_index == encoder.class_to_index
+    np.testing.assert_array_equal(loaded.encode(["tag b", "other", "tag a"]), ids)
+
+
+def test_label_encoder_keeps_given_ids():
+    encoder = LabelEncoder({"b": 0, "a": 1})
+    assert encoder.encode(["a", "b", "a"]).tolist() == [1, 0, 1]
+    assert encoder.decode([1, 0]).tolist() == ["a", "b"]
+    assert encoder.encode([]).size == 0
+
+
+@pytest.mark.parametrize("encoder, y", [
+    (LabelEncoder({"b": 0, "a": 1}), ["c"]),
+    (LabelEncoder({"b": 0, "a": 1}), ["a", "zz", "0"]),  # before, after and between the known labels
+    (LabelEncoder(), ["a"]),
+])
+def test_label_encoder_rejects_unseen_labels(encoder, y):
+    with pytest.raises(ValueError, match="Unknown labels"):
+        encoder.encode(y)
+
+
+def test_split_indices_are_a_stratified_partition(labels):
+    train, val, test = get_split_indices(labels, train_size=0.7, seed=0)
+    np.testing.assert_array_equal(np.sort(np.concatenate([train, val, test])), np.arange(len(labels)))
+    assert np.bincount(labels[train]).tolist() == [14, 7, 1]  # a single-row class goes to train
+    assert np.bincount(labels[val], minlength=3).tolist() == [3, 2, 0]
+    assert np.bincount(labels[test], minlength=3).tolist() == [3, 1, 0]
+    assert all((np.diff(split) > 0).all() for split in (train, val, test))
+
+
+def test_split_indices_depend_on_seed(labels):
+    first = get_split_indices(labels, seed=0)
+    assert all((a == b).all() for a, b in zip(first, get_split_indices(labels, seed=0)))
+    assert not all(np.array_equal(a, b) for a, b in zip(first, get_split_indices(labels, seed=1)))
+
+
+def test_data_splits_are_persisted_and_reused(tmp_path, labels):
+    splits = get_data_splits(labels, seed=0, cache_dir=tmp_path)
+    assert all(isinstance(split, np.memmap) for split in splits)
+    for split, expected in zip(splits, get_split_indices(labels, seed=0)):
+        np.testing.assert_array_equal(split, expected)
+    entries = list(tmp_path.iterdir())
+    assert len(entries) == 1
+    mtimes = [path.stat().st_mtime_ns for path in entries[0].iterdir()]
+
+    again = get_data_splits(labels.copy(), seed=0, cache_dir=tmp_path)
+    assert list(tmp_path.iterdir()) == entries
+    assert [path.stat().st_mtime_ns for path in entries[0].iterdir()] == mtimes
+    assert all(np.array_equal(a, b) for a, b in zip(splits, again))
+
+
+def test_data_splits_keyed_by_labels_and_parameters(tmp_path, labels):
+    get_data_splits(labels, seed=0, cache_dir=tmp_path)
+    get_data_splits(labels, seed=1, cache_dir=tmp_path)
+    get_data_splits(labels, train_size=0.5, seed=0, cache_dir=tmp_path)
+    get_data_splits(labels[::-1], seed=0, cache_dir=tmp_path)
+    get_data_splits(labels.astype(np.int64), seed=0, cache_dir=tmp_path)
+    assert len(list(tmp_path.iterdir())) == 5
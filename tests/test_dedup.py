@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from bibliometrics_1.dedup import deduplicate, find_duplicates, minhash_signatures, normalize_doi, normalize_title
+
+TITLE = "Graphene oxide membranes for selective ion transport in water"
+
+
+def test_normalize_doi_variants():
+    dois = normalize_doi(["https://doi.org/10.1000/ABC", "doi:10.1000/abc.", " 10.1000/abc ", "10.1/abc", "no doi", None])
+    assert dois[:3].tolist() == ["10.1000/abc"] * 3
+    assert dois[3:].isna().all()
+
+
+def test_normalize_title():
+    assert normalize_title(["Café: A Study!", "  CAFE a   study ", None]).tolist() == ["cafe a study", "cafe a study", ""]
+
+
+def test_minhash_signatures():
+    titles = normalize_title([TITLE, TITLE.upper(), "", "an unrelated paper on soil bacteria"])
+    signatures, has_shingles = minhash_signatures(titles)
+    assert signatures.shape == (4, 32)
+    assert has_shingles.tolist() == [True, True, False, True]
+    assert (signatures[0] == signatures[1]).all()
+    assert (signatures[0] == signatures[3]).mean() < 0.5
+
+
+def test_duplicates_by_doi_and_title():
+    df = pd.DataFrame({
+        "doi": ["10.1000/a", None, "https://doi.org/10.1000/A", None],
+        "title": ["Short", TITLE, "Other wording", TITLE + "."],
+        "Year": [2020, 2021, 2020, 2021],
+    })
+    labels = find_duplicates(df)
+    assert labels[0] == labels[2]
+    assert labels[1] == labels[3]
+    assert labels[0] != labels[1]
+
+
+def test_same_title_in_other_year_is_not_a_duplicate():
+    df = pd.DataFrame({"doi": [None, None], "title": [TITLE, TITLE], "Year": [2020, 2021]})
+    assert len(set(find_duplicates(df))) == 2
+
+
+def test_conflicting_dois_in_one_title_cluster_are_split():
+    # The row without a DOI matches both, but rows with different DOIs never merge
+    df = pd.DataFrame({"doi": ["10.1000/a", None, "10.1000/b"], "title": [TITLE] * 3, "Year": [2020] * 3})
+    labels = find_duplicates(df)
+    assert labels[0] != labels[2]
+    assert labels[1] in (labels[0], labels[2])
+
+
+def test_missing_columns_and_small_frames():
+    assert len(set(find_duplicates(pd.DataFrame({"title": [TITLE, TITLE]})))) == 1
+    assert len(set(find_duplicates(pd.DataFrame({"doi": ["10.1000/a", "10.1000/b"]})))) == 2
+    assert find_duplicates(pd.DataFrame({"doi": ["10.1000/a"]})).tolist() == [0]
+    assert find_duplicates(pd.DataFrame({"doi": []})).size == 0
+
+
+def test_deduplicate_fills_missing_fields_from_cluster():
+    df = pd.DataFrame(
+        {"doi": ["10.1000/A", "doi:10.1000/a", "10.1000/b"], "SNIP": [np.nan, 1.5, 0.7], "journal": ["J", "K", None]},
+        index=[5, 9, 11],
+    )
+    result = deduplicate(df)
+    assert result.index.tolist() == [5, 11]
+    assert result.loc[5, "SNIP"] == 1.5
+    assert result.loc[5, "journal"] == "J"  # present values are kept
+    assert pd.isna(result.loc[11, "journal"])
+
+
+def test_deduplicate_without_duplicates_returns_input():
+    df = pd.DataFrame({"doi": ["10.1000/a", "10.1000/b"], "title": ["One paper", "Another paper"]})
+    assert deduplicate(df) is df
@@ -0,0 +1,108 @@
+import threading
+from urllib.parse import urlsplit
+
+import pytest
+
+from benchmarks.mock_services import MockServices, ServiceProfile
+from bibliometrics_1.http_client import HttpClient, ResponseTooLarge, TokenBucket
+
+FAST = ServiceProfile(latency=0.0, jitter=0.0)
+CHAT = {"json": {"messages": [{"role": "user", "content": "Query:\n\ngraphene\n\n"}]}}
+
+
+def make_client(services, rate=1000.0, burst=1000, concurrency=4, **kwargs):
+    limits = {"rate": rate, "burst": burst, "concurrency": concurrency}
+    host = urlsplit(services.base_url).hostname
+    # Short backoff keeps the retry tests fast
+    return HttpClient(host_limits={host: limits, "default": limits}, http2=False, backoff_base=0.01, **kwargs)
+
+
+def get_concurrently(client, urls):
+    workers = [threading.Thread(target=client.get, args=(url,)) for url in urls]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+@pytest.mark.parametrize("rate, burst", [(0, 1), (-1.0, 1), (1.0, 0)])
+def test_token_bucket_rejects_invalid_limits(rate, burst):
+    with pytest.raises(ValueError):
+        TokenBucket(rate, burst)
+
+
+def test_token_bucket_rejects_more_tokens_than_capacity():
+    bucket = TokenBucket(rate=10.0, burst=2)
+    with pytest.raises(ValueError):
+        bucket.acquire(3)
+    with pytest.raises(ValueError):
+        bucket.set_rate(0)
+
+
+def test_sequential_requests_reuse_one_connection():
+    with MockServices(profiles={"crossref": FAST}) as services:
+        client = make_client(services)
+        for i in range(20):
+            assert client.get(f"{services.base_url}/works/10.1000/reuse.{i}").status_code == 200
+        client.close()
+        assert services.connections == 1
+
+
+def test_concurrency_cap_per_host():
+    # Slow responses keep every allowed request in flight at once
+    with MockServices(profiles={"crossref": ServiceProfile(latency=0.1, jitter=0.0)}) as services:
+        client = make_client(services, concurrency=3)
+        get_concurrently(client, [f"{services.base_url}/works/10.1000/cap.{i}" for i in range(12)])
+        client.close()
+        assert services.peak_in_flight == 3
+        assert services.connections <= 3
+
+
+def test_token_bucket_paces_requests():
+    rate, burst, requests = 20.0, 2, 12
+    with MockServices(profiles={"crossref": FAST}) as services:
+        client = make_client(services, rate=rate, burst=burst)
+        get_concurrently(client, [f"{services.base_url}/works/10.1000/rate.{i}" for i in range(requests)])
+        client.close()
+        arrivals = sorted(t for t, _ in services.arrivals)
+    assert len(arrivals) == requests
+    # Any window of w seconds admits at most burst + rate * w requests (one of slack for timer granularity)
+    for i in range(requests):
+        for j in range(i, requests):
+            assert j - i + 1 <= burst + rate * (arrivals[j] - arrivals[i]) + 1
+
+
+@pytest.mark.parametrize("query", ["", "?chunked=1"], ids=["declared", "streamed"])
+def test_oversize_response_raises(query):
+    with MockServices() as services:
+        client = make_client(services, max_bytes=1000)
+        with pytest.raises(ResponseTooLarge):
+            client.get(f"{services.base_url}/bytes/20000{query}")
+        assert len(client.get(f"{services.base_url}/bytes/1000{query}").content) == 1000
+        client.close()
+
+
+@pytest.mark.parametrize("method, service, retry, served", [
+    ("GET", "crossref", None, 3),
+    ("POST", "openai", None, 1),
+    ("POST", "openai", True, 3),
+])
+def test_5xx_retried_only_for_idempotent_methods(method, service, retry, served):
+    path = "/works/10.1000/retry" if service == "crossref" else "/v1/chat/completions"
+    kwargs = CHAT if method == "POST" else {}
+    with MockServices(profiles={service: ServiceProfile(latency=0.0, jitter=0.0, error_rate=1.0)}) as services:
+        client = make_client(services, max_retries=2)
+        response = client.request(method, f"{services.base_url}{path}", retry=retry, **kwargs)
+        client.close()
+        assert response.status_code == 503
+        assert services.summary()[service] == {"503": served}
+
+
+def test_429_retried_for_post():
+    # The mock's bucket holds one token: the second request is throttled once, then served
+    with MockServices(profiles={"openai": ServiceProfile(latency=0.0, jitter=0.0, rate_limit=1.0)}) as services:
+        client = make_client(services, max_retries=2)
+        for _ in range(2):
+            assert client.post(f"{services.base_url}/v1/chat/completions", **CHAT).status_code == 200
+        client.close()
+        assert services.summary()["openai"]["429"] >= 1
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bibliometrics_1.indicators import AuthorIndicators, paper_keys, split_authors
+
+
+@pytest.fixture
+def papers():
+    return pd.DataFrame({
+        "author_names": ["Smith, Jane; Bo Li", "Jane Smith; Ana Ruiz; Bo Li", "Jane Smith", "", None],
+        "citedby_count": [10, 3, 1, 5, 2],
+        "SNIP": [1.0, np.nan, 2.0, 0.5, np.nan],
+        "Year": [2019, 2020, 2021, 2021, 2022],
+    })
+
+
+def by_author(table):
+    return table.set_index("author")
+
+
+def test_split_authors_normalizes_and_skips_empty_lists():
+    paper, author, names = split_authors(["Smith, Jane; Jane Smith ; Bo Li", "", None, " ; Ana Ruiz;"])
+    assert list(names) == ["Jane Smith", "Bo Li", "Ana Ruiz"]
+    # A name listed twice on one paper counts once
+    assert sorted(zip(paper.tolist(), names[author].tolist())) == [(0, "Bo Li"), (0, "Jane Smith"), (3, "Ana Ruiz")]
+
+
+def test_split_authors_keeps_known_codes():
+    _, _, names = split_authors(["Ana Ruiz; Bo Li"])
+    _, author, extended = split_authors(["Cy Park; Bo Li"], names)
+    assert list(extended) == ["Ana Ruiz", "Bo Li", "Cy Park"]
+    assert sorted(author.tolist()) == [1, 2]
+
+
+def test_paper_keys_unique_for_identical_rows(papers):
+    keys = paper_keys(pd.concat([papers, papers.iloc[:1]]))
+    assert len(set(keys.tolist())) == len(papers) + 1
+
+
+def test_indicators(papers):
+    table = by_author(AuthorIndicators(papers).indicators())
+    assert list(table.index) == ["Jane Smith", "Bo Li", "Ana Ruiz"]
+    jane = table.loc["Jane Smith"]
+    assert (jane["papers"], jane["citations"], jane["h_index"]) == (3, 14, 2)
+    assert jane["mean_snip"] == pytest.approx(1.5)
+    assert (jane["coauthors"], jane["collaborations"]) == (2, 3)
+    assert (jane["first_year"], jane["last_year"]) == (2019, 2021)
+    assert table.loc["Ana Ruiz", "h_index"] == 1
+    assert np.isnan(table.loc["Ana Ruiz", "mean_snip"])
+
+
+def test_indicators_year_window(papers):
+    engine = AuthorIndicators(papers)
+    table = by_author(engine.indicators(start=2020, end=2021))
+    assert table.loc["Jane Smith", "papers"] == 2
+    assert table.loc["Jane Smith", "coauthors"] == 2
+    assert table.loc["Bo Li", "citations"] == 3
+    assert list(engine.indicators(min_papers=2)["author"]) == ["Jane Smith", "Bo Li"]
+
+
+def test_papers_without_authors():
+    engine = AuthorIndicators(pd.DataFrame({"author_names": ["", None], "citedby_count": [1, 2], "Year": [2020, 2021]}))
+    assert engine.indicators().empty
+    assert engine.indicators(start=2020).empty
+    assert AuthorIndicators().indicators().empty
+    assert AuthorIndicators().sliding(3).empty
+
+
+def test_sliding_windows(papers):
+    table = AuthorIndicators(papers).sliding(2)
+    assert sorted(table["window_end"].unique()) == [2019, 2020, 2021, 2022]
+    window = table[table["window_end"] == 2020].set_index("author")
+    assert window.loc["Jane Smith", "papers"] == 2
+    assert (window["window_start"] == 2019).all()
+
+
+def test_updated_matches_rebuild(papers):
+    engine = AuthorIndicators(papers.iloc[:3])
+    added = pd.concat([papers, pd.DataFrame({"author_names": ["Cy Park; Bo Li"], "citedby_count": [4], "Year": [2022]})])
+    updated = engine.updated(added.sample(frac=1, random_state=0))
+    assert len(updated) == len(added)
+    pd.testing.assert_frame_equal(updated.indicators(), AuthorIndicators(added).indicators())
+    pd.testing.assert_frame_equal(updated.indicators(start=2021), AuthorIndicators(added).indicators(start=2021))
+    # The original engine is unchanged
+    assert len(engine) == 3
+    assert "Cy Park" not in set(engine.indicators()["author"])
+
+
+def test_updated_without_new_papers_or_after_removal(papers):
+    engine = AuthorIndicators(papers)
+    assert engine.updated(papers.iloc[::-1]) is engine
+    shrunk = engine.updated(papers.iloc[1:])
+    pd.testing.assert_frame_equal(shrunk.indicators(), AuthorIndicators(papers.iloc[1:]).indicators())
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from bibliometrics_1.journal_index import build_index, get_journal_index, issn_to_int
+
+
+@pytest.fixture
+def source_list(tmp_path):
+    path = tmp_path / "ext_list.csv"
+    path.write_text(
+        "Source Title,Print-ISSN,E-ISSN,2021 SNIP,2022 SNIP\n"
+        "Journal A,0028-0836,1476-4687,1.5,2.5\n"
+        "Journal B,1573-040X,,0.8,\n"
+    )
+    return path
+
+
+def test_issn_to_int_formats():
+    codes = issn_to_int(["0028-0836", "00280836", 280836, "1573-040x 0011-3215", "not an issn", None])
+    assert codes[0] == codes[1] == codes[2]
+    assert codes[3] == issn_to_int(["1573-040X"])[0]
+    assert list(codes[4:]) == [-1, -1]
+
+
+def test_lookup_exact_years(tmp_path, source_list):
+    index = build_index([source_list], index_dir=tmp_path / "index")
+    snip, found = index.lookup(["0028-0836", "1476-4687", "1573-040X"], [2022, 2021, 2021])
+    np.testing.assert_allclose(snip, [2.5, 1.5, 0.8])
+    assert found.all()
+
+
+def test_lookup_unlisted_year_is_a_miss(tmp_path, source_list):
+    # Years after the list was built (or with an empty cell) must go to the API, not reuse the latest SNIP
+    index = build_index([source_list], index_dir=tmp_path / "index")
+    snip, found = index.lookup(["0028-0836", "1573-040X", "0028-0836", "9999-9999"], [2024, 2022, 2019, 2021])
+    assert not found.any()
+    assert np.isnan(snip).all()
+
+
+def test_rebuild_keeps_previous_version(tmp_path, source_list):
+    index_dir = tmp_path / "index"
+    first = build_index([source_list], index_dir=index_dir).path.name
+    source_list.write_text("Print-ISSN,2023 SNIP\n0028-0836,3.5\n")
+    second = build_index([source_list], index_dir=index_dir).path.name
+    source_list.write_text("Print-ISSN,2023 SNIP\n0028-0836,4.5\n")
+    third = build_index([source_list], index_dir=index_dir).path.name
+    versions = {path.name for path in index_dir.iterdir() if path.is_dir()}
+    assert versions == {second, third}
+    assert first not in versions
+    assert get_journal_index(index_dir).path.name == third
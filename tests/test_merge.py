@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+
+from bibliometrics_1.merge import FIELD_PRIORITY, flatten_crossref, flatten_scopus, merge_sources
+
+CROSSREF = [
+    {
+        "DOI": "10.1000/b",
+        "title": ["B from CrossRef"],
+        "container-title": ["Journal B"],
+        "ISSN": ["1234-5678"],
+        "issued": {"date-parts": [[2021, 3]]},
+        "created": {"date-time": "2021-02-01T00:00:00Z"},
+        "author": [{"given": "Ann", "family": "Lee"}, {"family": "Kim"}],
+        "is-referenced-by-count": 7,
+    },
+    {"DOI": "10.1000/c", "title": [], "author": [], "issued": {"date-parts": [[None]]}},
+]
+
+
+@pytest.fixture
+def scopus():
+    df = pd.DataFrame({
+        "doi": ["10.1000/a", "10.1000/b"],
+        "title": ["A from Scopus", None],
+        "publication_date": ["2020-05-01", None],
+        "citedby_count": ["3", None],
+        "author_names": ["Xu Yan", None],
+        "eid": ["2-s2.0-1", "2-s2.0-2"],
+    })
+    return flatten_scopus(df, index=list(df["doi"]))
+
+
+@pytest.fixture
+def crossref():
+    return flatten_crossref(CROSSREF, index=[record["DOI"] for record in CROSSREF])
+
+
+def test_flatten_scopus_types(scopus):
+    assert scopus["citedby_count"].dtype == "Int64"
+    assert scopus["citedby_count"].tolist()[0] == 3
+    assert pd.isna(scopus.loc["10.1000/b", "publication_date"])
+    assert scopus["journal_issn"].isna().all()  # missing columns are added
+
+
+def test_flatten_crossref(crossref):
+    assert crossref.loc["10.1000/b", "journal_issn"] == "12345678"
+    assert crossref.loc["10.1000/b", "issued"] == pd.Timestamp(2021, 3, 1)
+    assert pd.isna(crossref.loc["10.1000/c", "issued"])
+    assert pd.isna(crossref.loc["10.1000/c", "title"])
+    assert list(flatten_crossref([]).columns) == list(crossref.columns)
+
+
+def test_merge_follows_field_priority(scopus, crossref):
+    merged = merge_sources({"scopus": scopus, "crossref": crossref})
+    assert merged.index.tolist() == ["10.1000/a", "10.1000/b", "10.1000/c"]
+    assert merged["title"].tolist()[:2] == ["A from Scopus", "B from CrossRef"]
+    assert merged["title_source"].tolist()[:2] == ["scopus", "crossref"]
+    assert merged["author_names"].tolist()[:2] == ["Xu Yan", "Ann Lee, Kim"]
+    assert merged["citation_count"].tolist()[:2] == [3, 7]
+    assert merged.loc["10.1000/b", "publication_date"] == pd.Timestamp(2021, 3, 1)
+    assert merged.loc["10.1000/a", "eid"] == "2-s2.0-1"  # uncovered columns of the first source pass through
+
+
+def test_merge_leaves_unfilled_fields_without_source(scopus, crossref):
+    merged = merge_sources({"scopus": scopus, "crossref": crossref})
+    # CrossRef's empty author list is no value, so nothing supplied it
+    assert pd.isna(merged.loc["10.1000/c", "author_names"])
+    assert pd.isna(merged.loc["10.1000/c", "author_names_source"])
+    assert merged.loc["10.1000/c", "doi_source"] == "crossref"
+
+
+@pytest.mark.parametrize("missing", ["scopus", "crossref"])
+def test_merge_with_a_missing_source(scopus, crossref, missing):
+    sources = {"scopus": scopus, "crossref": crossref}
+    present = sources[{"scopus": "crossref", "crossref": "scopus"}[missing]]
+    sources[missing] = None
+    merged = merge_sources(sources)
+    assert merged.index.equals(present.index)
+    assert set(FIELD_PRIORITY) <= set(merged.columns)
+    assert not (merged["title_source"] == missing).any()
+
+
+def test_merge_without_sources():
+    merged = merge_sources({"scopus": None, "crossref": None})
+    assert merged.empty
+    assert list(merged.columns) == list(FIELD_PRIORITY)
+
+
+def test_merge_without_provenance(scopus, crossref):
+    merged = merge_sources({"scopus": scopus, "crossref": crossref}, provenance=False)
+    assert not any(column.endswith("_source") for column in merged.columns)